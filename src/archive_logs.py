@@ -0,0 +1,38 @@
+import sys
+import os
+import argparse
+
+# --- PATH FIX ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.services.session_manager import SessionManager
+
+
+def print_partitions(recorder: SessionManager):
+    for p in recorder.get_partition_summary():
+        where = p['archive_path'] or 'live'
+        print(f"   {p['month']}  {p['rows'] or 0:>8} rows  {where}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Move old monthly audit log partitions into compact read-only archive files.")
+    parser.add_argument('--db', default='aura_logs.db', help='SQLite log (default: ./aura_logs.db)')
+    parser.add_argument('--keep-months', type=int, default=3, help='live months to keep, current included')
+    parser.add_argument('--dir', default=None, help='archive directory (default: archive/ next to the DB)')
+    parser.add_argument('--no-vacuum', action='store_true', help='skip shrinking the main DB afterwards')
+    parser.add_argument('--list', action='store_true', help='only list the partitions')
+    args = parser.parse_args()
+
+    recorder = SessionManager(args.db)
+    print("--- AURA LOG PARTITIONS ---")
+    if not args.list:
+        archived = recorder.archive_partitions(args.keep_months, args.dir, vacuum=not args.no_vacuum)
+        for a in archived:
+            print(f"   [ARCHIVE] {a['month']}: {a['rows']} rows -> {a['path']} ({a['bytes'] / 1e6:.1f} MB)")
+        if not archived:
+            print(f"   Nothing older than the last {args.keep_months} months to archive.")
+    print_partitions(recorder)
@@ -0,0 +1,475 @@
+import sys, os
+import time
+import queue
+import uuid
+import socket
+import secrets
+import argparse
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing.managers import BaseManager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Callable
+
+# Robust Path Setup
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path: sys.path.append(project_root)
+
+DEFAULT_PORT = 50055
+
+
+class WorkQueue:
+    """
+    The coordinator's ledger of work units (one Drive file each).
+    Lives in the coordinator process and is proxied to workers over TCP.
+
+    pending -> leased (worker, deadline) -> done
+    A lease expires unless the worker heartbeats; expired units go back to
+    the front of the queue (redelivery). A redelivered unit only goes to a
+    worker holding nothing else, which gets nothing more until it is back:
+    if it is what took its last worker down, it takes no other unit with it,
+    and after MAX_DELIVERIES it is failed (poisoned). Only the first
+    completion of a unit counts, so a slow worker finishing after
+    redelivery is ignored.
+    """
+
+    LEASE_SECONDS = 60.0
+    MAX_DELIVERIES = 3
+
+    def __init__(self, units: List[Dict[str, Any]], lease_seconds: float = None):
+        self.lease_seconds = lease_seconds or self.LEASE_SECONDS
+        self._lock = threading.Lock()
+        self._pending = deque(units)
+        self._units = {u['id']: u for u in units}
+        self._leases: Dict[str, Dict[str, Any]] = {}
+        self._deliveries: Dict[str, int] = {}
+        self._done = set()
+        self._redelivered, self._poisoned = 0, 0
+        self._workers: Dict[str, Dict[str, Any]] = {}
+        self.results: "queue.Queue" = queue.Queue()   # coordinator-side only
+
+    # --- Worker API (called through the proxy) ---
+
+    def lease(self, worker_id: str, max_units: int) -> Optional[List[Dict[str, Any]]]:
+        """Up to max_units units; [] = nothing free right now; None = audit finished."""
+        with self._lock:
+            self._reap_locked()
+            self._seen(worker_id)
+            if not self._pending and not self._leases:
+                return None
+            mine = [uid for uid, lease in self._leases.items() if lease['worker'] == worker_id]
+            if any(self._deliveries[uid] > 1 for uid in mine):
+                return []   # holding a redelivered unit: it runs alone
+            batch, passed = [], []
+            deadline = time.monotonic() + self.lease_seconds
+            while self._pending and len(batch) < max_units:
+                unit = self._pending.popleft()
+                if unit['id'] in self._done: continue
+                suspect = self._deliveries.get(unit['id'], 0) > 0
+                if suspect and (mine or batch):
+                    passed.append(unit)   # left for an idle worker
+                    continue
+                self._leases[unit['id']] = {'worker': worker_id, 'deadline': deadline}
+                self._deliveries[unit['id']] = self._deliveries.get(unit['id'], 0) + 1
+                batch.append(unit)
+                if suspect: break
+            self._pending.extendleft(reversed(passed))
+            return batch
+
+    def lease_period(self) -> float:
+        """Seconds a lease lasts without a heartbeat (workers beat 4x per period)."""
+        return self.lease_seconds
+
+    def heartbeat(self, worker_id: str, unit_ids: List[str]) -> List[str]:
+        """Extends the worker's leases. Returns the ids it no longer owns (drop them)."""
+        with self._lock:
+            self._seen(worker_id)
+            lost, deadline = [], time.monotonic() + self.lease_seconds
+            for uid in unit_ids:
+                lease = self._leases.get(uid)
+                if lease and lease['worker'] == worker_id:
+                    lease['deadline'] = deadline
+                else:
+                    lost.append(uid)
+            return lost
+
+    def complete(self, worker_id: str, unit_id: str, result: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._seen(worker_id)
+            if unit_id in self._done or unit_id not in self._units:
+                return False
+            self._done.add(unit_id)
+            self._leases.pop(unit_id, None)
+            self._workers[worker_id]['completed'] += 1
+        self.results.put((self._units[unit_id], result, worker_id))
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'total': len(self._units), 'done': len(self._done),
+                'leased': len(self._leases), 'pending': len(self._pending),
+                'redelivered': self._redelivered, 'poisoned': self._poisoned,
+                'workers': {w: dict(info) for w, info in self._workers.items()},
+            }
+
+    # --- Coordinator side ---
+
+    def reap(self):
+        with self._lock:
+            self._reap_locked()
+
+    def finished(self) -> bool:
+        with self._lock:
+            return len(self._done) == len(self._units)
+
+    def _seen(self, worker_id: str):
+        info = self._workers.setdefault(worker_id, {'completed': 0, 'last_seen': 0.0})
+        info['last_seen'] = time.time()
+
+    def _reap_locked(self):
+        now = time.monotonic()
+        for uid in [u for u, lease in self._leases.items() if lease['deadline'] < now]:
+            lease = self._leases.pop(uid)
+            if self._deliveries.get(uid, 0) >= self.MAX_DELIVERIES:
+                print(f"   [CLUSTER] {self._units[uid]['name']} lost {self.MAX_DELIVERIES} workers; failing it.")
+                self._done.add(uid)
+                self._poisoned += 1
+                self.results.put((self._units[uid], {'status': 'FAILED', 'reason': 'Worker lost (lease expired)'}, lease['worker']))
+            else:
+                print(f"   [CLUSTER] Lease on {self._units[uid]['name']} expired ({lease['worker']}); redelivering.")
+                self._pending.appendleft(self._units[uid])
+                self._redelivered += 1
+
+
+class ClusterManager(BaseManager):
+    pass
+
+
+def serve_queue(work: WorkQueue, host: str, port: int, authkey: bytes):
+    """Serves `work` from THIS process (so results land here) on a background thread."""
+    ClusterManager.register('get_queue', callable=lambda: work)
+    manager = ClusterManager(address=(host, port), authkey=authkey)
+    server = manager.get_server()
+    threading.Thread(target=server.serve_forever, name='aura-cluster', daemon=True).start()
+    return server
+
+
+def connect_queue(host: str, port: int, authkey: bytes, retries: int = 30):
+    ClusterManager.register('get_queue')
+    for attempt in range(retries):
+        try:
+            manager = ClusterManager(address=(host, port), authkey=authkey)
+            manager.connect()
+            return manager.get_queue()
+        except (ConnectionRefusedError, OSError):
+            if attempt == retries - 1: raise
+            time.sleep(1)
+
+
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+
+def cluster_authkey() -> Optional[bytes]:
+    """The shared secret from AURA_CLUSTER_KEY, or None when unset (never a built-in default)."""
+    key = os.getenv('AURA_CLUSTER_KEY')
+    return key.encode() if key else None
+
+
+def coordinator_authkey(host: str) -> bytes:
+    """
+    The manager protocol exchanges pickles: whoever holds the key can run code
+    on the coordinator (and its Drive / Sheets token). Without AURA_CLUSTER_KEY
+    a random key is generated; when listening beyond loopback it is printed
+    so remote workers can be started with it.
+    """
+    key = cluster_authkey()
+    if key: return key
+    token = secrets.token_urlsafe(32)
+    if host not in LOOPBACK_HOSTS:
+        print(f"   [CLUSTER] No AURA_CLUSTER_KEY set; generated one for this run.")
+        print(f"   [CLUSTER] On each worker: export AURA_CLUSTER_KEY={token}")
+    return token.encode()
+
+
+# --- Worker ---
+
+def _default_analyzer() -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Per-thread VisionEngine (needs this machine's own assets/config/token.json)."""
+    from src.audit_folder import get_thread_safe_brain
+
+    def analyze(unit: Dict[str, Any]) -> Dict[str, Any]:
+        data = get_thread_safe_brain().analyze_file(unit['id'], unit.get('thumbnailLink'))
+        if data.get('status') == 'FAILED' and data.get('reason') == 'Download Error':
+            time.sleep(0.5)
+            data = get_thread_safe_brain().analyze_file(unit['id'], unit.get('thumbnailLink'))
+        # Only ship image bytes that may end up in the review queue; clean reads stay here
+        if data.get('status') == 'SUCCESS': data.pop('payload', None)
+        return data
+    return analyze
+
+
+def run_worker(host: str, port: int, authkey: bytes = None, threads: int = None,
+               analyzer: Callable[[Dict[str, Any]], Dict[str, Any]] = None, worker_id: str = None):
+    """
+    Pulls leases, runs OCR locally, streams each result back as soon as it is ready.
+    A heartbeat thread keeps every unit in hand leased; units the coordinator
+    has taken back are dropped without reporting.
+    """
+    from src.services.resource_governor import ResourceGovernor
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+    governor = ResourceGovernor(fixed_workers=threads)
+    governor.configure_libraries()
+    analyze = analyzer or _default_analyzer()
+    authkey = authkey or cluster_authkey()
+    if not authkey:
+        raise SystemExit("[WORKER] Set AURA_CLUSTER_KEY to the key the coordinator uses (it prints one if unset).")
+    work = connect_queue(host, port, authkey)
+    beat_every = work.lease_period() / 4
+    print(f"[WORKER {worker_id}] Connected to {host}:{port} with {governor.limit} threads.")
+
+    in_hand, in_hand_lock, stop = set(), threading.Lock(), threading.Event()
+
+    def heartbeat():
+        hb = connect_queue(host, port, authkey)  # own connection
+        while not stop.wait(beat_every):
+            with in_hand_lock: ids = list(in_hand)
+            if not ids: continue
+            for uid in hb.heartbeat(worker_id, ids):
+                with in_hand_lock: in_hand.discard(uid)
+
+    def process(unit):
+        try:
+            data = analyze(unit)
+        except Exception as e:
+            data = {'status': 'FAILED', 'reason': f'Worker error: {e}'}
+        data.pop('timings', None)
+        with in_hand_lock:
+            still_ours = unit['id'] in in_hand
+            in_hand.discard(unit['id'])
+        if still_ours:
+            work.complete(worker_id, unit['id'], data)
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    done = 0
+    try:
+        with ThreadPoolExecutor(max_workers=governor.limit) as pool:
+            while True:
+                with in_hand_lock: free = governor.limit * 2 - len(in_hand)  # keep one batch queued
+                if free <= 0:
+                    time.sleep(0.05)
+                    continue
+                batch = work.lease(worker_id, free)
+                if batch is None: break
+                if not batch:
+                    time.sleep(0.5)
+                    continue
+                with in_hand_lock: in_hand.update(u['id'] for u in batch)
+                for unit in batch:
+                    pool.submit(process, unit)
+                done += len(batch)
+    finally:
+        stop.set()
+    print(f"[WORKER {worker_id}] Queue drained after {done} units.")
+
+
+# --- Coordinator ---
+
+def _spawn_local_workers(n: int, host: str, port: int, authkey: bytes, threads: int = None, analyzer=None):
+    procs = []
+    for i in range(n):
+        p = multiprocessing.Process(
+            target=run_worker, args=(host, port, authkey, threads, analyzer, f"local-{i}"), daemon=True
+        )
+        p.start()
+        procs.append(p)
+    return procs
+
+
+def drain_results(work: WorkQueue, on_result: Callable, progress_every: float = 10.0):
+    """Feeds results to on_result (in THIS thread) until every unit is done."""
+    last = time.monotonic()
+    while not work.finished() or not work.results.empty():
+        try:
+            unit, data, worker_id = work.results.get(timeout=1.0)
+        except queue.Empty:
+            work.reap()   # all workers may be dead: nobody else will expire their leases
+            continue
+        on_result(unit, data, worker_id)
+        if time.monotonic() - last > progress_every:
+            last = time.monotonic()
+            s = work.stats()
+            print(f"   [CLUSTER] {s['done']}/{s['total']} done, {s['leased']} leased, {len(s['workers'])} workers.")
+
+
+def run_coordinator(sheet_id: str, folder_link: str, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                    resume: bool = True, local_workers: int = 0, worker_threads: int = None):
+    """
+    Lists the folder, serves the files as work units, and records every result
+    centrally through AuditSession.record_result: one SessionManager, one
+    UTR registry, one ledger, so duplicate checks stay exact across machines.
+    """
+    from src.audit_folder import AuditSession
+    session = AuditSession(sheet_id)
+    intern_name, folder_id, run_id, files = session.begin_audit(folder_link, resume)
+    authkey = coordinator_authkey(host)
+
+    from src.services.scheduler import AuditScheduler
+    from src.services.metrics import QUEUE_DEPTH
+    work = WorkQueue(AuditScheduler().order(files))   # priority order; deadlines are not enforced here
+    QUEUE_DEPTH.set(len(files))   # record_result counts it down
+    server = serve_queue(work, host, port, authkey)
+    print(f"\n--- PHASE 3: CLUSTER AUDIT ({len(files)} units on {host}:{port}) ---")
+    if host not in LOOPBACK_HOSTS:
+        print(f"   Start workers with: python src/audit_cluster.py worker --host <this-machine> --port {port}")
+    procs = _spawn_local_workers(local_workers, '127.0.0.1', port, authkey, worker_threads)
+
+    def record(unit, data, worker_id):
+        if run_id: session.recorder.mark_file_inflight(run_id, unit['id'])
+        try:
+            session.record_result(unit, data, intern_name, folder_id, run_id)
+        except Exception as e:
+            print(f"[CRITICAL ERROR] Could not record {unit['name']} from {worker_id}: {e}")
+
+    try:
+        drain_results(work, record)
+    finally:
+        server.stop_event.set()
+        for p in procs: p.join(timeout=10)
+
+    for worker_id, info in sorted(work.stats()['workers'].items()):
+        print(f"   [CLUSTER] {worker_id}: {info['completed']} files")
+    try:
+        return session.finish_audit(intern_name, run_id)
+    finally:
+        session.close()
+
+
+# --- Cluster Check ---
+
+def _check_analyze(unit: Dict[str, Any]) -> Dict[str, Any]:
+    """Stand-in OCR for check_cluster: a short 'read', or a hard crash on the poison unit."""
+    if unit.get('poison'):
+        os._exit(1)   # like a decoder segfault: the whole worker process goes
+    time.sleep(0.05 + (hash(unit['id']) % 10) / 100.0)
+    return {'status': 'SUCCESS', 'amount': 1.0, 'utr': unit['id']}
+
+
+def check_cluster(workers: int = 3, units: int = 60, lease_seconds: float = 2.0) -> bool:
+    """
+    Coordinator plus `workers` local worker processes on loopback, stand-in OCR:
+      - one healthy worker is killed mid-run: its leases expire and are redelivered
+      - one unit kills every worker it reaches: failed after MAX_DELIVERIES
+    Dead workers are restarted, as a supervisor would. Every other unit must
+    come back SUCCESS exactly once.
+    """
+    print(f"--- CLUSTER CHECK ({workers} workers, {units} units, {lease_seconds:.0f}s leases) ---")
+    batch = [{'id': f"u{i:03d}", 'name': f"receipt_{i:03d}.jpg"} for i in range(units)]
+    batch.insert(5, {'id': 'poison', 'name': 'poison.jpg', 'poison': True})
+    work = WorkQueue(batch, lease_seconds=lease_seconds)
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    authkey = secrets.token_urlsafe(16).encode()
+    server = serve_queue(work, '127.0.0.1', port, authkey)
+
+    procs: Dict[str, multiprocessing.Process] = {}
+    spawned, deaths = [0], [0]
+    def spawn():
+        worker_id = f"local-{spawned[0]}"
+        spawned[0] += 1
+        procs[worker_id] = multiprocessing.Process(
+            target=run_worker, args=('127.0.0.1', port, authkey, 2, _check_analyze, worker_id), daemon=True)
+        procs[worker_id].start()
+    for _ in range(workers): spawn()
+
+    stop = threading.Event()
+    def supervise():
+        while not stop.wait(0.2):
+            for worker_id, p in list(procs.items()):
+                if p.exitcode is not None and p.exitcode != 0:
+                    del procs[worker_id]
+                    deaths[0] += 1
+                    spawn()
+    threading.Thread(target=supervise, daemon=True).start()
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    orphaned: List[str] = []
+    def record(unit, data, worker_id):
+        results.setdefault(unit['id'], []).append(data)
+        if orphaned or len(results) < units // 4: return
+        # A healthy worker with leases in hand (not the one holding the poison unit)
+        with work._lock:
+            held: Dict[str, List[str]] = {}
+            for uid, lease in work._leases.items():
+                held.setdefault(lease['worker'], []).append(uid)
+        for victim, uids in held.items():
+            if victim in procs and procs[victim].is_alive() and 'poison' not in uids:
+                print(f"   [CHECK] Killing {victim} with {len(uids)} leases in hand.")
+                orphaned.extend(uids)
+                procs[victim].kill()
+                break
+
+    t = time.perf_counter()
+    try:
+        drain_results(work, record, progress_every=5.0)
+    finally:
+        stop.set()
+        server.stop_event.set()
+        for p in procs.values(): p.join(timeout=10)
+
+    s = work.stats()
+    clean = [uid for uid, got in results.items() if uid != 'poison' and [r['status'] for r in got] == ['SUCCESS']]
+    poison = results.get('poison', [{}])
+    checks = [
+        ("every healthy unit SUCCESS exactly once", len(clean) == units),
+        ("killed worker's leases redelivered and read",
+         # one of them may have finished between the snapshot and the kill
+         bool(orphaned) and all(uid in clean for uid in orphaned)
+         and any(work._deliveries[uid] > 1 for uid in orphaned)),
+        (f"poison unit failed after {WorkQueue.MAX_DELIVERIES} deliveries",
+         s['poisoned'] == 1 and poison[0].get('reason', '').startswith('Worker lost')),
+        (f"poison took only its own workers ({WorkQueue.MAX_DELIVERIES} + 1 killed)",
+         deaths[0] == WorkQueue.MAX_DELIVERIES + 1),
+    ]
+    print(f"   {s['done']}/{s['total']} done in {time.perf_counter() - t:.1f}s, {s['redelivered']} redeliveries, "
+          f"{deaths[0]} worker deaths, {len(s['workers'])} workers seen")
+    for label, ok in checks:
+        print(f"   [{'OK' if ok else 'FAIL'}] {label}")
+    return all(ok for _, ok in checks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AURA distributed audit (coordinator / worker).")
+    sub = parser.add_subparsers(dest='role', required=True)
+
+    c = sub.add_parser('coordinator', help='list the folder, hand out work, record results')
+    c.add_argument('--sheet', required=True, help='Master Ledger Sheet ID')
+    c.add_argument('--folder', required=True, help='Target Drive folder link')
+    c.add_argument('--host', default='127.0.0.1',
+                   help='interface to listen on; use 0.0.0.0 for remote workers (they need AURA_CLUSTER_KEY)')
+    c.add_argument('--port', type=int, default=DEFAULT_PORT)
+    c.add_argument('--local-workers', type=int, default=0, help='also run N worker processes on this machine')
+    c.add_argument('--worker-threads', type=int, default=None)
+    c.add_argument('--no-resume', action='store_true')
+
+    w = sub.add_parser('worker', help='OCR units leased from a coordinator')
+    w.add_argument('--host', required=True)
+    w.add_argument('--port', type=int, default=DEFAULT_PORT)
+    w.add_argument('--threads', type=int, default=None)
+
+    k = sub.add_parser('check', help='local coordinator + workers with stand-in OCR: '
+                                     'lease expiry, redelivery, poisoning')
+    k.add_argument('--local-workers', type=int, default=3)
+    k.add_argument('--units', type=int, default=60)
+
+    args = parser.parse_args()
+    if args.role == 'check':
+        sys.exit(0 if check_cluster(args.local_workers, args.units) else 1)
+    elif args.role == 'coordinator':
+        run_coordinator(args.sheet, args.folder, args.host, args.port, not args.no_resume,
+                        args.local_workers, args.worker_threads)
+    else:
+        run_worker(args.host, args.port, threads=args.threads)
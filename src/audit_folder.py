@@ -2,7 +2,10 @@ import sys, os, re
 import time
 import datetime
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import statistics
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable
 
 # Robust Path Setup
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -17,10 +20,19 @@ from src.services.vision_engine import VisionEngine
 from src.services.sheet_manager import SheetManager
 from src.services.session_manager import SessionManager
 from src.services.reporter import ReportGenerator  # <--- NEW IMPORT
+from src.services.resource_governor import ResourceGovernor
+from src.services.async_drive import DriveIOEngine
+from src.services.scheduler import AuditScheduler
+from src.services.sampling import StratifiedSampler
+from src.services.blob_store import BlobStore
+from src.services.resource_governor import get_memory_budget
+from src.services.metrics import (REGISTRY, FILES, FILE_SECONDS, FILES_INFLIGHT, QUEUE_DEPTH, WORKER_CRASHES,
+                                  BYTES_FETCHED, LEDGER_ROWS, SPECULATIVE, MetricsSnapshotter, start_metrics_server)
 
 # Thread-Safe Locks
 print_lock = threading.Lock()
 stats_lock = threading.Lock()
+writeback_lock = threading.Lock()
 
 # Thread-Local Storage
 thread_local = threading.local()
@@ -30,22 +42,161 @@ def get_thread_safe_brain():
         thread_local.brain = VisionEngine()
     return thread_local.brain
 
-class AuditSession:
-    def __init__(self, sheet_id: str):
-        print("\n[INIT] Booting AURA System on M4 Silicon...")
-        self.memory = SheetManager(sheet_id)
+class AuditRuntime:
+    """
+    The long-lived half of an audit: ledger index, Drive / Sheets clients,
+    SQLite recorder, governor, the OCR thread pool (each thread keeps its own
+    VisionEngine) and the async I/O engine with its open connections.
+    The CLI builds one per audit; the GUI builds one at launch and reuses it,
+    so back-to-back audits start on warm engines.
+    """
+
+    LEDGER_TTL = float(os.getenv('AURA_LEDGER_TTL', '600'))   # seconds before the ledger is re-synced
+
+    def __init__(self, sheet_id: str, ledger_sources: list = None, log: Callable[[str], None] = print):
+        # Where runtime messages go: the terminal for the CLI, the GUI log for the app
+        self.log = log
+        self.log("\n[INIT] Booting AURA System on M4 Silicon...")
+        # ledger_sources: extra yearly tabs / regional spreadsheets (see SheetManager)
+        self.memory = SheetManager(sheet_id, sources=ledger_sources)
         self.drive = DriveManager() 
         self.recorder = SessionManager()
         self.reporter = ReportGenerator() # <--- NEW INSTANCE
+        # Images of flagged files, kept for the review workstation (no second download)
+        self.blobs = BlobStore()
+        # Sizes the worker pool and caps cv2 / tesseract threads per worker
+        self.governor = ResourceGovernor(log=log)
+        self.governor.configure_libraries()
+        # Downloads + listings on one asyncio thread; worker threads only do OCR
+        self.async_io = os.getenv('AURA_ASYNC_IO', '1') != '0'
+        # Pool sized to the governor's cap; slot() admits only `limit` at a time
+        self.executor = ThreadPoolExecutor(max_workers=self.governor.max_workers, thread_name_prefix='aura-ocr')
+        # Live metrics on localhost (AURA_METRICS_PORT) + periodic snapshots into aura_logs.db
+        self._register_gauges()
+        start_metrics_server()
+        self.snapshotter = MetricsSnapshotter(self.recorder).start()
+
+        self._io_engine = None
+        self._ledger_synced_at = None
+        self._lock = threading.Lock()
+
+    def _register_gauges(self):
+        """Scrape-time gauges: read from the live objects only when /metrics is hit."""
+        budget = get_memory_budget()
+        REGISTRY.gauge_fn('aura_workers_limit', 'Worker slots the governor currently admits',
+                          lambda: self.governor.limit)
+        REGISTRY.gauge_fn('aura_workers_active', 'Workers holding a governor slot',
+                          lambda: self.governor.snapshot()['active'])
+        REGISTRY.gauge_fn('aura_pixel_budget_used_bytes', 'Decoded pixels in flight', lambda: budget.used_bytes)
+        REGISTRY.gauge_fn('aura_ledger_outbox_depth', 'Verified rows waiting for Master Ledger write-back',
+                          self.recorder.count_pending_ledger_rows)
+        REGISTRY.gauge_fn('aura_review_queue_depth', 'Flagged files waiting for manual review',
+                          self.recorder.count_open_reviews)
+
+    def io_engine(self) -> DriveIOEngine:
+        """Created on first use and kept open: listings and downloads reuse its connections."""
+        with self._lock:
+            if self._io_engine is None:
+                thumbs = VisionEngine.thumbnail_url if VisionEngine.PROGRESSIVE else None
+                self._io_engine = DriveIOEngine(self.drive.creds, thumbnail_url=thumbs)
+            return self._io_engine
+
+    def ensure_ledger(self):
+        """Re-syncs the Master Ledger only when the in-RAM index is older than LEDGER_TTL."""
+        with self._lock:
+            if self._ledger_synced_at and time.monotonic() - self._ledger_synced_at < self.LEDGER_TTL:
+                return
+            self.memory.load_ledger()
+            self._ledger_synced_at = time.monotonic()
+            try:
+                self.memory.export_shared_index(self.recorder.ledger_index_path)
+            except Exception as e:
+                self.log(f"   [WARN] Shared ledger index not written: {e}")
+
+    def warm_up(self):
+        """
+        Ledger index, I/O engine and one VisionEngine per admitted worker thread,
+        built before the first audit. The barrier makes each warm-up task land
+        on its own pool thread.
+        """
+        t0 = time.perf_counter()
+        self.ensure_ledger()
+        if self.async_io: self.io_engine()
+        n = self.governor.limit
+        barrier = threading.Barrier(n)
+
+        def warm(first: bool):
+            brain = get_thread_safe_brain()
+            if first: brain.warm_up()
+            try:
+                barrier.wait(timeout=60)
+            except threading.BrokenBarrierError:
+                pass
+
+        for future in [self.executor.submit(warm, i == 0) for i in range(n)]:
+            future.result()
+        self.log(f"   [WARM] {n} OCR workers ready in {time.perf_counter() - t0:.1f}s.")
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.snapshotter.stop()
+        with self._lock:
+            if self._io_engine is not None:
+                self._io_engine.close()
+                self._io_engine = None
+
+
+class AuditSession:
+    # Straggler control: once the queue has drained, a file running SPECULATE_FACTOR x the
+    # median file time gets a speculative copy (cheap recipe) on an idle worker and the
+    # first result is kept. Past FILE_BUDGET_S the audit stops waiting and leaves it pending.
+    SPECULATE_FACTOR = float(os.getenv('AURA_SPECULATE_FACTOR', '4'))
+    SPECULATE_MIN_S = 5.0           # never speculate on files faster than this
+    SPECULATE_MIN_SAMPLES = 5       # finished files needed before the median means anything
+    FILE_BUDGET_S = float(os.getenv('AURA_FILE_BUDGET_S', '300'))
+    WATCH_INTERVAL_S = 0.5
+
+    def __init__(self, sheet_id: str, ledger_sources: list = None, runtime: AuditRuntime = None,
+                 scheduler: AuditScheduler = None, log: Callable[[str], None] = print):
+        # Every line of the session goes through log(): print for the CLI, the GUI's callback for the app
+        self.log = log
+        # A shared runtime (GUI) outlives the session; a private one (CLI) is closed with it
+        self._owns_runtime = runtime is None
+        self.runtime = runtime or AuditRuntime(sheet_id, ledger_sources, log=log)
+        self.memory = self.runtime.memory
+        self.drive = self.runtime.drive
+        self.recorder = self.runtime.recorder
+        self.reporter = self.runtime.reporter
+        self.blobs = self.runtime.blobs
+        self.governor = self.runtime.governor
+        self.async_io = self.runtime.async_io
+        # Set by the GUI's stop button: unstarted files stay pending for a resume
+        self.stop_event = threading.Event()
+        # File order + optional deadline (AURA_SCHEDULE / AURA_DEADLINE_MIN by default)
+        self.scheduler = scheduler or AuditScheduler()
+        self._outcomes = {}       # file id -> (status, amount) of every recorded file
+        self._claimed = set()     # file ids whose result is taken (first copy wins) or abandoned
+        self._closed = False      # report is out: late results are dropped
+        self._started = {}        # file id -> monotonic start of its first copy's analysis
+        self._copies = {}         # file id -> (cancel event, slot releases) shared by its running copies
+        self._fetched = {}        # file id -> (bytes, fidelity) its first copy fetched, for a twin to reuse
+        self._durations = deque(maxlen=200)   # recent per-file analysis seconds (straggler median)
+        self.pending_items = []   # files the deadline (or a stop) left unprocessed
+        self.sample_estimate = None   # set by sample_audit
         
         # Session State
         self.session_stats = {
-            'SUCCESS': 0, 'DUPLICATE': 0, 'MANUAL_REVIEW': 0, 'FAILED': 0,
+            'SUCCESS': 0, 'DUPLICATE': 0, 'MANUAL_REVIEW': 0, 'FAILED': 0, 'SKIPPED': 0,
             'total_amt': 0.0, 'count': 0, 
+            'bytes_fetched': 0, 'thumbnail': 0, 'original': 0,  # progressive download accounting
+
             'date': datetime.datetime.now().strftime("%Y-%m-%d")
         }
         self.flagged_items = [] # <--- Stores details of bad files
 
+    def close(self):
+        if self._owns_runtime: self.runtime.close()
+
     def extract_folder_id(self, url: str) -> str:
         patterns = [r'folders\/([a-zA-Z0-9\-_]+)', r'id=([a-zA-Z0-9\-_]+)']
         for p in patterns:
@@ -53,100 +204,497 @@ class AuditSession:
             if match: return match.group(1)
         return url
 
-    def process_single_file(self, file_meta: dict, intern_name: str, folder_id: str):
+    def process_single_file(self, file_meta: dict, intern_name: str, folder_id: str, run_id: str = None,
+                            payload: bytes = None, download_seconds: float = 0.0,
+                            fidelity: str = 'original', fetch_original=None, speculative: bool = False):
+        """
+        speculative=True: a straggler's twin, read with the cheap recipe from the
+        bytes the first copy already fetched (a fresh download only when it has none).
+        """
+        if not self._may_start():
+            return False
+        file_id = file_meta['id']
+        cancel, releases = self._copy_state(file_id)
+        started = time.perf_counter()
+        FILES_INFLIGHT.inc()
         try:
             local_brain = get_thread_safe_brain()
-            
-            # 1. Vision Analysis
-            data = local_brain.analyze_file(file_meta['id'])
-            
-            # Retry on Download Error
-            if data.get('status') == 'FAILED' and data.get('reason') == 'Download Error':
-                time.sleep(0.5) 
-                data = local_brain.analyze_file(file_meta['id'])
-            
-            # 2. Duplicate Check
-            if data.get('utr') and self.memory.is_duplicate(data['utr']):
+
+            # 1. Vision Analysis (admission-controlled: the governor decides how many run at once)
+            with self.governor.slot() as release:
+                if cancel.is_set(): return False   # settled or abandoned while queued
+                with stats_lock: releases.append(release)
+                began = time.monotonic()
+                if not speculative:
+                    self._started[file_id] = began
+                    if run_id: self.recorder.mark_file_inflight(run_id, file_id)
+                def keep(fetched: bytes, fetched_fidelity: str):
+                    with stats_lock:
+                        if not cancel.is_set(): self._fetched[file_id] = (fetched, fetched_fidelity)
+                if speculative:
+                    with stats_lock: payload, fidelity = self._fetched.get(file_id, (None, 'original'))
+                    fetch_original = lambda: local_brain.download_bytes(file_id)
+                elif payload is not None:
+                    keep(payload, fidelity)
+                    if fetch_original: fetch_original = self._kept(fetch_original, keep)
+
+                if payload is not None:
+                    data = local_brain.analyze_bytes(payload, download_seconds, fidelity, fetch_original,
+                                                     fast=speculative, cancel=cancel)
+                    payload = None  # drop the compressed bytes before logging / write-back
+                else:
+                    data = local_brain.analyze_file(file_id, file_meta.get('thumbnailLink'), fast=speculative,
+                                                    cancel=cancel, on_payload=None if speculative else keep)
+
+                # Retry on Download Error
+                if data.get('status') == 'FAILED' and data.get('reason') == 'Download Error':
+                    time.sleep(0.5)
+                    data = local_brain.analyze_file(file_id, file_meta.get('thumbnailLink'), fast=speculative,
+                                                    cancel=cancel, on_payload=None if speculative else keep)
+            # A stopped copy's partial timings would skew the pool model
+            if not cancel.is_set(): self.governor.record(data.get('timings'))
+            won = self.record_result(file_meta, data, intern_name, folder_id, run_id)
+            if speculative:
+                SPECULATIVE.inc('won' if won else 'lost')
+            if won:
+                with stats_lock: self._durations.append(time.monotonic() - began)
+                FILE_SECONDS.observe(time.perf_counter() - started + download_seconds)
+            return won
+
+        except Exception as e:
+            WORKER_CRASHES.inc()
+            with print_lock:
+                self.log(f"[CRITICAL ERROR] Thread crashed on {file_meta['name']}: {e}")
+            return False
+        finally:
+            FILES_INFLIGHT.dec()
+
+    @staticmethod
+    def _kept(fetch, keep):
+        """fetch_original that also hands the original it got to keep()."""
+        def run():
+            fetched = fetch()
+            if fetched: keep(fetched, 'original')
+            return fetched
+        return run
+
+    def _copy_state(self, file_id: str):
+        """(cancel event, slot releases) shared by the copies of a file; pre-cancelled once it is settled."""
+        with stats_lock:
+            if file_id in self._claimed:
+                settled = threading.Event()
+                settled.set()
+                return settled, []
+            if file_id not in self._copies:
+                self._copies[file_id] = (threading.Event(), [])
+            return self._copies[file_id]
+
+    def _settle(self, file_id: str, abandon: bool = False):
+        """
+        A file has its result (or is given up on): every other copy stops at its
+        next stage boundary and the kept bytes go. abandon=True also hands back
+        the copies' governor slots right away, so a stuck file no longer holds
+        one while its thread winds down.
+        """
+        with stats_lock:
+            self._fetched.pop(file_id, None)
+            cancel, releases = self._copies.pop(file_id, (None, []))
+            releases = list(releases)
+        if cancel is not None: cancel.set()
+        if abandon:
+            for release in releases: release()
+
+    def _may_start(self) -> bool:
+        """False once stopped, or when one more file would overrun the scheduler's deadline."""
+        if self.stop_event.is_set(): return False
+        return not self.scheduler.expired(self.governor.cpu_s or 0.0)
+
+    def record_result(self, file_meta: dict, data: dict, intern_name: str, folder_id: str, run_id: str = None):
+        """
+        The central half of a file: duplicate checks, logging + checkpoint,
+        stats and write-back. Runs wherever the SessionManager / ledger live
+        (the coordinator in cluster mode, see audit_cluster.py).
+        Returns False (and records nothing) when the file already has a result:
+        a straggler and its speculative twin race, the first one in wins.
+        """
+        with stats_lock:
+            if self._closed or file_meta['id'] in self._claimed:
+                return False
+            self._claimed.add(file_meta['id'])
+        self._settle(file_meta['id'])
+
+        # 2. Duplicate Check (Master Ledger first, then the local UTR registry
+        #    which also catches in-flight and not-yet-synced duplicates)
+        extract_status = data.get('status')   # what the text alone said; kept for re-scoring
+        payload = data.pop('payload', None)
+        # Re-audit / resume: this file's own verified row is in the ledger by now, it is no duplicate of itself
+        own_utr = bool(data.get('utr')) and self.recorder.utr_owner(data['utr']) == file_meta['id']
+        if data.get('utr') and not own_utr and self.memory.is_duplicate(data['utr']):
+            data['status'] = 'DUPLICATE'
+        elif data.get('utr'):
+            first_seen = self.recorder.claim_utr(data['utr'], file_meta['id'], file_meta['name'], folder_id)
+            if first_seen:
                 data['status'] = 'DUPLICATE'
+                data['duplicate_of'] = first_seen['file_name']
+            elif data.get('status') == 'SUCCESS':
+                # Borderline: one OCR slip away from a ledger entry -> human decides
+                near = self.memory.find_near_duplicate(data['utr'])
+                if near:
+                    data['status'] = 'MANUAL_REVIEW'
+                    data['reason'] = f"Near-duplicate of {near['utr']} (distance {near['distance']})"
 
-            # 3. Logging
+        # 3. Logging (+ checkpoint in the same transaction when part of a run)
+        #    Flagged files keep their image for the review queue
+        reason = data.get('reason')
+        if data.get('status') == 'DUPLICATE' and not reason:
+            reason = f"Duplicate of {data['duplicate_of']}" if data.get('duplicate_of') else "UTR already in Master Ledger"
+        blob = None
+        if payload and data.get('status') in self.recorder.REVIEW_STATUSES:
+            try:
+                blob = self.blobs.put(payload)
+            except OSError as e:
+                with print_lock:
+                    self.log(f"   [WARN] Could not cache image of {file_meta['name']} for review: {e}")
+        payload = None
+        ledger_row = None
+        if data.get('status') == 'SUCCESS':
+            ledger_row = self.recorder.make_ledger_row(
+                file_meta['id'], data['utr'], data.get('amount'), data.get('timestamp'), intern_name
+            )
+        if run_id:
+            self.recorder.complete_run_file(
+                run_id=run_id, file_id=file_meta['id'],
+                intern_name=intern_name, folder_id=folder_id, file_name=file_meta['name'],
+                utr=data.get('utr'), amount=data.get('amount'), status=data.get('status'),
+                ledger_row=ledger_row, fidelity=data.get('fidelity'), bytes_fetched=data.get('bytes_fetched'),
+                extract_status=extract_status, ocr_text=data.get('extracted_text'), reason=reason, blob=blob
+            )
+        else:
             self.recorder.log_transaction(
                 intern_name=intern_name, folder_id=folder_id, file_name=file_meta['name'],
-                utr=data.get('utr'), amount=data.get('amount'), status=data.get('status')
+                utr=data.get('utr'), amount=data.get('amount'), status=data.get('status'),
+                fidelity=data.get('fidelity'), bytes_fetched=data.get('bytes_fetched'), file_id=file_meta['id'],
+                extract_status=extract_status, ocr_text=data.get('extracted_text'), reason=reason, blob=blob
             )
+            if ledger_row: self.recorder.enqueue_ledger_row(ledger_row)
+
+        # 4. Update Stats & Collect Flags (Thread-Safe)
+        with stats_lock: self._outcomes[file_meta['id']] = (data.get('status', 'FAILED'), data.get('amount', 0))
+        FILES.inc(data.get('status', 'FAILED'))
+        QUEUE_DEPTH.dec()
+        if data.get('fidelity') in ('thumbnail', 'original'):
+            BYTES_FETCHED.inc(data['fidelity'], by=data.get('bytes_fetched') or 0)
+        self._tally(file_meta['name'], data.get('status', 'FAILED'), data.get('amount', 0), data.get('reason'),
+                    data.get('fidelity'), data.get('bytes_fetched'))
+
+        self._print_log_threadsafe(data.get('status'), data.get('utr'), data.get('amount'), file_meta['name'])
 
-            # 4. Update Stats & Collect Flags (Thread-Safe)
-            with stats_lock:
-                status = data.get('status', 'FAILED')
-                amt = data.get('amount', 0)
-                if status in self.session_stats:
-                    self.session_stats[status] += 1
-                self.session_stats['count'] += 1
-                if status == 'SUCCESS':
-                    self.session_stats['total_amt'] += amt
-                
-                # Capture Bad Files for Report
-                if status in ['DUPLICATE', 'MANUAL_REVIEW', 'FAILED']:
-                    self.flagged_items.append({
-                        'file_name': file_meta['name'],
-                        'status': status,
-                        'amount': amt
-                    })
-
-            self._print_log_threadsafe(data.get('status'), data.get('utr'), data.get('amount'), file_meta['name'])
-            return True
+        # 5. Write-Back once a full chunk is waiting (one API call per chunk, not per file)
+        if ledger_row and self.recorder.count_pending_ledger_rows() >= self.memory.WRITEBACK_CHUNK:
+            self.flush_ledger_writeback(blocking=False)
+        return True
 
+    def flush_ledger_writeback(self, blocking: bool = True):
+        """Drains the local outbox into the Master Ledger, one chunk per API call."""
+        if not writeback_lock.acquire(blocking=blocking):
+            return  # another thread is already flushing
+        try:
+            while True:
+                batch = self.recorder.claim_ledger_batch(self.memory.WRITEBACK_CHUNK)
+                if not batch: break
+                reconcile = any(r['attempts'] > 0 for r in batch)
+                sent = self.memory.append_verified_rows(batch, reconcile=reconcile)
+                self.recorder.mark_ledger_rows_sent(sent)
+                LEDGER_ROWS.inc('sent', by=len(sent))
+                if len(sent) < len(batch):
+                    LEDGER_ROWS.inc('deferred', by=len(batch) - len(sent))
+                    break  # Sheets is down; rows stay queued for next flush
+                with print_lock:
+                    self.log(f"   [LEDGER] Wrote back {len(sent)} verified receipts.")
         except Exception as e:
             with print_lock:
-                print(f"[CRITICAL ERROR] Thread crashed on {file_meta['name']}: {e}")
-            return False
+                self.log(f"   [WARN] Ledger write-back deferred: {e}")
+        finally:
+            writeback_lock.release()
+
+    def _tally(self, file_name: str, status: str, amt: float, reason: str = None,
+               fidelity: str = None, bytes_fetched: int = None):
+        with stats_lock:
+            amt = amt or 0
+            if fidelity in ('thumbnail', 'original'):
+                self.session_stats[fidelity] += 1
+                self.session_stats['bytes_fetched'] += bytes_fetched or 0
+            if status in self.session_stats:
+                self.session_stats[status] += 1
+            self.session_stats['count'] += 1
+            if status == 'SUCCESS':
+                self.session_stats['total_amt'] += amt
+            
+            # Capture Bad Files for Report
+            if status in ['DUPLICATE', 'MANUAL_REVIEW', 'FAILED']:
+                self.flagged_items.append({
+                    'file_name': file_name,
+                    'status': status,
+                    'amount': amt,
+                    'reason': reason
+                })
+
+    def _prepare_run(self, folder_id: str, intern_name: str, resume: bool):
+        """
+        Returns (run_id, files_to_process).
+        On resume: skips 'done' files, requeues 'in_flight' ones and replays
+        the finished results into session_stats / flagged_items.
+        Otherwise any run still open for the folder is superseded first, so a
+        later resume can never pick up a run this one replaced.
+        """
+        run = self.recorder.find_resumable_run(folder_id) if resume else None
+        if run:
+            run_id = run['run_id']
+            requeued = self.recorder.requeue_inflight(run_id)
+            done = self.recorder.get_run_files(run_id, 'done')
+            for row in done:
+                self._tally(row['name'], row['status'] or 'FAILED', row['amount'])
+            files = self.recorder.get_run_files(run_id, 'pending')
+            self.log(f"   [RESUME] Run {run_id[:8]} from {run['started_at'][:19]}: "
+                  f"{len(done)} done, {requeued} requeued, {len(files)} remaining.")
+            return run_id, files
 
-    def start_audit(self, folder_link: str):
-        start_time = time.time()
-        self.memory.load_ledger()
+        superseded = self.recorder.supersede_runs(folder_id)
+        if superseded:
+            self.log(f"   [CHECKPOINT] Closed {superseded} unfinished run(s) of this folder; starting fresh.")
+        files = self._fetch_files_recursive(folder_id)
+        self.log(f"   [TARGET ACQUIRED] Found {len(files)} potential receipts.")
+        run_id = self.recorder.start_run(folder_id, intern_name)
+        self.recorder.register_run_files(run_id, files)
+        return run_id, files
+
+    def begin_audit(self, folder_link: str, resume: bool = True):
+        """Phases 1-2: ledger, identity, run checkpoint. Returns (intern_name, folder_id, run_id, files)."""
+        self.runtime.ensure_ledger()
         
         folder_id = self.extract_folder_id(folder_link)
         try:
             folder_meta = self.drive.service.files().get(fileId=folder_id, fields="name").execute()
             intern_name = folder_meta.get('name', 'Unknown_Intern')
-            print(f"\n--- PHASE 2: INTERCEPTING DRIVE FOLDER [{folder_id}] ---")
-            print(f"   [IDENTITY] Audit Target: {intern_name}")
+            self.log(f"\n--- PHASE 2: INTERCEPTING DRIVE FOLDER [{folder_id}] ---")
+            self.log(f"   [IDENTITY] Audit Target: {intern_name}")
         except Exception: 
             intern_name = "Unknown_Intern"
 
-        files = self._fetch_files_recursive(folder_id)
-        print(f"   [TARGET ACQUIRED] Found {len(files)} potential receipts.")
-        print("\n--- PHASE 3: EXECUTING PARALLEL AUDIT (5 THREADS) ---")
-        
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [
-                executor.submit(self.process_single_file, file, intern_name, folder_id) 
-                for file in files
-            ]
-            for future in as_completed(futures): pass 
+        run_id, files = self._prepare_run(folder_id, intern_name, resume)
+        return intern_name, folder_id, run_id, files
+
+    def finish_audit(self, intern_name: str, run_id: str) -> str:
+        """Phase 4: write-back, checkpoint close-out and the WhatsApp report."""
+        # Abandoned stragglers may still finish in the background: their results no longer count
+        with stats_lock:
+            self._closed = True
+            self._fetched.clear()
+        self.flush_ledger_writeback()
+
+        fetched = self.session_stats['thumbnail'] + self.session_stats['original']
+        if fetched:
+            self.log(f"   [TRANSFER] {self.session_stats['bytes_fetched'] / 1e6:.1f} MB downloaded; "
+                  f"{self.session_stats['thumbnail']}/{fetched} files resolved from thumbnails.")
+
+        # Crashed threads leave files 'in_flight'; keep the run open so they get retried
+        if self.sample_estimate:
+            self.recorder.requeue_inflight(run_id)
+            remaining = self.sample_estimate['population'] - self.sample_estimate['drawn']
+            self.log(f"   [CHECKPOINT] Sample done; {remaining} files not audited. "
+                  f"A full audit of this folder resumes run {run_id[:8]}.")
+        elif self.pending_items and (self.stop_event.is_set() or self.scheduler.expired()):
+            self.recorder.requeue_inflight(run_id)
+            why = 'Audit stopped' if self.stop_event.is_set() else 'Deadline reached'
+            self.log(f"   [CHECKPOINT] {why} with {len(self.pending_items)} files pending. "
+                  f"Re-run to resume run {run_id[:8]}.")
+        elif self.recorder.requeue_inflight(run_id):
+            self.log(f"   [CHECKPOINT] Some files did not finish. Re-run to resume run {run_id[:8]}.")
+        else:
+            self.recorder.finish_run(run_id)
 
-        duration = time.time() - start_time
-        
         # FINAL REPORT GENERATION
-        print("\n" + "="*40)
+        self.log("\n" + "="*40)
         report_text = self.reporter.generate_whatsapp_report(
-            intern_name, self.session_stats, self.flagged_items
+            intern_name, self.session_stats, self.flagged_items, self.pending_items, self.sample_estimate
         )
-        print(report_text)
-        print("="*40)
+        self.log(report_text)
+        self.log("="*40)
+        return report_text
+
+    def start_audit(self, folder_link: str, resume: bool = True):
+        self.scheduler.start_clock()
+        intern_name, folder_id, run_id, files = self.begin_audit(folder_link, resume)
+        files = self.scheduler.order(files)
+        self.log(f"\n--- PHASE 3: EXECUTING PARALLEL AUDIT ({self.governor.limit} THREADS, AUTO-TUNED) ---")
+        
+        try:
+            self._process_files(files, intern_name, folder_id, run_id)
+            self.pending_items = [f for f in files if f['id'] not in self._outcomes]
+
+            return self.finish_audit(intern_name, run_id)
+        finally:
+            self.close()
+
+    def sample_audit(self, folder_link: str, margin: float = 0.03, amount_margin: float = 0.10,
+                     confidence: float = 0.95, seed: int = None):
+        """
+        Quick health check: audits a stratified random sample (sub-folder x file
+        type x size band), growing it batch by batch until the duplicate / failure
+        rates are within +-margin and the verified total within +-amount_margin
+        (relative) at `confidence`. Always a fresh run: sampled files are really
+        audited (logged, written back), and a later full audit resumes the rest.
+        """
+        intern_name, folder_id, run_id, files = self.begin_audit(folder_link, resume=False)
+        sampler = StratifiedSampler(files, margin, amount_margin, confidence, seed)
+        self.log(f"\n--- PHASE 3: SAMPLING AUDIT ({len(files)} files, {len(sampler.strata)} strata, "
+              f"target ±{margin:.0%} at {confidence:.0%}) ---")
+
+        try:
+            estimate = None
+            while not sampler.exhausted() and self._may_start():
+                batch = sampler.next_batch(sampler.suggest_batch(estimate))
+                self._process_files(batch, intern_name, folder_id, run_id)
+                for f in batch:
+                    if f['id'] in self._outcomes: sampler.record(f['id'], *self._outcomes[f['id']])
+                estimate = sampler.estimate()
+                if estimate['n']:
+                    dup, fail = estimate['rates']['DUPLICATE'], estimate['rates']['FAILED']
+                    self.log(f"   [SAMPLE] {estimate['n']}/{len(files)} files: duplicates {dup['rate']:.1%} ±{dup['margin']:.1%}, "
+                          f"failed {fail['rate']:.1%} ±{fail['margin']:.1%}, verified "
+                          f"₹{estimate['verified_total']['value']:,.0f} ±{estimate['verified_total']['margin']:,.0f}")
+                    if sampler.precise_enough(estimate): break
+
+            self.sample_estimate = estimate if estimate and estimate['n'] < len(files) else None
+            return self.finish_audit(intern_name, run_id)
+        finally:
+            self.close()
+
+    def _process_files(self, files, intern_name, folder_id, run_id):
+        """Runs `files` (in order) through the pool; returns when all are recorded or abandoned."""
+        QUEUE_DEPTH.set(len(files))
+        executor = self.runtime.executor
+        if self.async_io:
+            tasks = self._dispatch_async_downloads(executor, files, intern_name, folder_id, run_id)
+        else:
+            tasks = {
+                executor.submit(self.process_single_file, file, intern_name, folder_id, run_id): file
+                for file in files
+            }
+        self._await_files(tasks, intern_name, folder_id, run_id)
+        QUEUE_DEPTH.set(0)   # files the deadline / stop left behind are no longer queued
+
+    def _dispatch_async_downloads(self, executor, files, intern_name, folder_id, run_id):
+        """
+        Streams every download through the DriveIOEngine and submits OCR as each
+        payload lands. A failed async fetch falls back to the threaded download
+        path (payload=None), which has its own retry. Thumbnails that don't
+        resolve a file pull the original through the same engine.
+        Stops starting downloads once stopped or past the deadline.
+        Returns {future: file_meta} once every download is handed off.
+        """
+        tasks = {}
+        io_engine = self.runtime.io_engine()
+
+        def on_ready(file_meta, payload, seconds, error, release, fidelity):
+            def fetch_original():
+                try:
+                    return io_engine.fetch(file_meta['id'])
+                except Exception as e:
+                    with print_lock:
+                        self.log(f"   [IO] Original fetch failed for {file_meta['name']}: {e}")
+                    return None
+
+            def work():
+                try:
+                    return self.process_single_file(
+                        file_meta, intern_name, folder_id, run_id, payload, seconds,
+                        fidelity, fetch_original
+                    )
+                finally:
+                    release()
+            if error:
+                with print_lock:
+                    self.log(f"   [IO] Async fetch failed for {file_meta['name']} ({error}); retrying on worker.")
+            tasks[executor.submit(work)] = file_meta
+
+        io_engine.download_all(files, on_ready, should_stop=lambda: not self._may_start())
+        return tasks
+
+    def _straggler_cutoff(self):
+        """Seconds after which a running file counts as a straggler; None until enough files finished."""
+        with stats_lock: recent = list(self._durations)
+        if len(recent) < self.SPECULATE_MIN_SAMPLES: return None
+        return max(self.SPECULATE_MIN_S, self.SPECULATE_FACTOR * statistics.median(recent))
+
+    def _await_files(self, tasks: dict, intern_name, folder_id, run_id):
+        """
+        Waits for every file of `tasks` ({future: file_meta}) with straggler control,
+        so the audit's wall time follows the median file rather than the worst one:
+          - at the tail (fewer files left than worker slots) a file running past
+            _straggler_cutoff() gets one speculative copy on an idle worker;
+            record_result keeps whichever copy finishes first
+          - a file past FILE_BUDGET_S is abandoned: left pending (the run stays
+            open for a resume), its governor slot handed back at once and its
+            thread stopped at the next stage boundary
+        """
+        pending = set(tasks)
+        twins = set()   # file ids that already have a speculative copy
+        while pending:
+            _, pending = wait(pending, timeout=self.WATCH_INTERVAL_S, return_when=FIRST_COMPLETED)
+            # Either copy recording the file settles it; the other one is not waited for
+            with stats_lock: settled = set(self._claimed)
+            pending = {f for f in pending if tasks[f]['id'] not in settled}
+            if not pending: break
+
+            now = time.monotonic()
+            cutoff = self._straggler_cutoff()
+            idle = self.governor.limit - len(pending)
+            for future in list(pending):
+                if future not in pending: continue
+                file_meta = tasks[future]
+                began = self._started.get(file_meta['id'])
+                if began is None: continue   # still queued
+                elapsed = now - began
+                if elapsed > self.FILE_BUDGET_S:
+                    with stats_lock: self._claimed.add(file_meta['id'])   # a late result is dropped
+                    self._settle(file_meta['id'], abandon=True)
+                    pending = {f for f in pending if tasks[f]['id'] != file_meta['id']}
+                    SPECULATIVE.inc('abandoned')
+                    with print_lock:
+                        self.log(f"   [STRAGGLER] Gave up on {file_meta['name']} after {elapsed:.0f}s; left pending.")
+                elif cutoff and idle > 0 and elapsed > cutoff and file_meta['id'] not in twins:
+                    twins.add(file_meta['id'])
+                    idle -= 1
+                    twin = self.runtime.executor.submit(self.process_single_file, file_meta, intern_name,
+                                                        folder_id, run_id, speculative=True)
+                    tasks[twin] = file_meta
+                    pending.add(twin)
+                    SPECULATIVE.inc('launched')
+                    with print_lock:
+                        self.log(f"   [STRAGGLER] {file_meta['name']} at {elapsed:.0f}s (cutoff {cutoff:.0f}s); "
+                              f"speculative cheap re-run started.")
 
     def _fetch_files_recursive(self, folder_id):
+        if self.async_io:
+            try:
+                return self.runtime.io_engine().list_tree(folder_id)
+            except Exception as e:
+                self.log(f"   [IO] Async listing failed ({e}); falling back to sequential listing.")
+        return self._fetch_files_sequential(folder_id)
+
+    def _fetch_files_sequential(self, folder_id):
         results = []
         page_token = None
         query = f"'{folder_id}' in parents and trashed = false"
         try:
             while True:
                 response = self.drive.service.files().list(
-                    q=query, fields="nextPageToken, files(id, name, mimeType)", pageToken=page_token
+                    q=query, fields="nextPageToken, files(id, name, mimeType, thumbnailLink, size, modifiedTime, parents)", pageToken=page_token
                 ).execute()
                 for item in response.get('files', []):
                     if item['mimeType'] == 'application/vnd.google-apps.folder':
-                        results.extend(self._fetch_files_recursive(item['id']))
+                        results.extend(self._fetch_files_sequential(item['id']))
                     elif any(m in item['mimeType'] for m in ['image/', 'pdf']):
                         results.append(item)
                 page_token = response.get('nextPageToken')
@@ -155,22 +703,29 @@ class AuditSession:
         return results
 
     def _print_log_threadsafe(self, status, utr, amount, filename):
-        RESET, RED, GREEN, YELLOW, BLUE = "\033[0m", "\033[91m", "\033[92m", "\033[93m", "\033[94m"
+        RESET, RED, GREEN, YELLOW, BLUE, GREY = "\033[0m", "\033[91m", "\033[92m", "\033[93m", "\033[94m", "\033[90m"
         color = RESET
         if status == 'SUCCESS': color = GREEN
         elif status == 'DUPLICATE': color = RED
         elif status == 'MANUAL_REVIEW': color = YELLOW
         elif status == 'FAILED': color = BLUE
+        elif status == 'SKIPPED': color = GREY
         
         clean_fname = (filename[:18] + '..') if len(filename) > 20 else filename
         safe_utr = str(utr) if utr else "N/A"
         safe_amt = str(amount) if amount else "0"
         
         with print_lock:
-            print(f"{color}[{status}]    {safe_utr:<15} ₹{safe_amt:<9} {clean_fname}{RESET}")
+            self.log(f"{color}[{status}]    {safe_utr:<15} ₹{safe_amt:<9} {clean_fname}{RESET}")
 
 if __name__ == "__main__":
     print("--- AURA DEV CONSOLE (DAY 9 - REPORTING ENGINE) ---")
     s_id = input("Enter Master Ledger Sheet ID: ").strip()
     f_link = input("Enter Target Drive Folder Link: ").strip()
-    if s_id and f_link: AuditSession(s_id).start_audit(f_link)
\ No newline at end of file
+    sample = input("Sample only (quick health check)? [y/N]: ").strip().lower() == 'y'
+    if s_id and f_link:
+        session = AuditSession(s_id)
+        if sample:
+            session.sample_audit(f_link)
+        else:
+            session.start_audit(f_link)
\ No newline at end of file
@@ -0,0 +1,55 @@
+import sys
+import os
+import json
+import time
+
+# --- PATH FIX ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.services.extraction_engine import ExtractionEngine
+
+CORPUS_PATH = os.path.join(current_dir, 'golden', 'extraction_corpus.json')
+
+
+def check_corpus(engine: ExtractionEngine, cases) -> int:
+    """Returns the number of cases where the engine disagrees with the golden output."""
+    mismatches = 0
+    for case in cases:
+        got = engine.extract(case['text'])
+        got.pop('extracted_text')
+        if got != case['expected']:
+            mismatches += 1
+            print(f"[MISMATCH] {case['id']}\n   expected: {case['expected']}\n   got:      {got}")
+    return mismatches
+
+
+def bench(engine: ExtractionEngine, cases, rounds: int = 50) -> float:
+    """Mean microseconds per text over the whole corpus."""
+    texts = [case['text'] for case in cases]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            engine.extract(text)
+    return (time.perf_counter() - start) / (rounds * len(texts)) * 1e6
+
+
+if __name__ == "__main__":
+    print("--- EXTRACTION ENGINE BENCH ---")
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        cases = json.load(f)['cases']
+
+    engine = ExtractionEngine()
+    bad = check_corpus(engine, cases)
+    if bad:
+        print(f"[FAIL] {bad}/{len(cases)} golden cases changed. Fix the rules before shipping.")
+        sys.exit(1)
+    print(f"[OK] {len(cases)} golden cases identical.")
+    print(f"   Stock rules: {bench(engine, cases):.1f} us / text")
+
+    packs = [r.strip() for r in os.getenv('AURA_RULE_PACKS', '').split(',') if r.strip()]
+    if packs:
+        packed = ExtractionEngine.with_packs(packs)
+        print(f"   With packs {packed.pack_names}: {bench(packed, cases):.1f} us / text")
@@ -0,0 +1,124 @@
+import sys
+import os
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional
+
+# --- PATH FIX ---
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.services.extraction_engine import ExtractionEngine, get_default_engine
+from src.services.session_manager import SessionManager
+from src.services.resource_governor import detect_cores
+from src.services.utr_index import MappedLedger
+
+# Per-process engine, compiled once by the pool initializer, and the
+# Master Ledger snapshot it maps (every worker shares the same pages)
+_engine: Optional[ExtractionEngine] = None
+_ledger: Optional[MappedLedger] = None
+
+
+def _init_worker(pack_refs: Optional[List[str]], ledger: Optional[MappedLedger] = None):
+    global _engine, _ledger
+    _engine = ExtractionEngine.with_packs(pack_refs) if pack_refs is not None else get_default_engine()
+    _ledger = ledger
+
+
+def _score_chunk(table: str, rows: List[Tuple[int, bytes]]) -> Tuple[str, List[Dict[str, Any]]]:
+    """Decompress + extract. Rows travel compressed, so the pipe carries a quarter of the text."""
+    out = []
+    for row_id, blob in rows:
+        data = _engine.extract(SessionManager.unpack_text(blob))
+        out.append({'id': row_id, 'status': data['status'], 'utr': data['utr'],
+                    'amount': data['amount'], 'timestamp': data['timestamp'],
+                    'in_ledger': bool(_ledger is not None and data['utr'] and data['utr'] in _ledger)})
+    return table, out
+
+
+def rescore(recorder: SessionManager, workers: int = None, chunk_size: int = 1000,
+            pack_refs: List[str] = None, folder_id: str = None, since_day: str = None,
+            writeback: bool = False, dry_run: bool = False, ledger_path: str = None) -> Dict[str, int]:
+    """
+    Re-runs the current extraction rules over every stored OCR text.
+    Reads, scoring and writes overlap: a few chunks are in the pool while the
+    finished ones are applied (one transaction each) in id order.
+    ledger_path: Master Ledger snapshot (aura_ledger.idx, written by every audit's
+    ledger sync); newly verified rows whose UTR is in it become duplicates.
+    """
+    workers = workers or detect_cores()
+    ledger = None
+    if ledger_path and os.path.exists(ledger_path):
+        ledger = MappedLedger(ledger_path)
+        age_h = (time.time() - os.path.getmtime(ledger_path)) / 3600
+        print(f"   [MEMORY] Ledger snapshot: {len(ledger)} UTRs, {age_h:.1f}h old ({ledger_path})")
+    elif ledger_path:
+        print(f"   [WARN] No ledger snapshot at {ledger_path}; the Master Ledger is not checked.")
+    totals: Dict[str, int] = {}
+    start = time.perf_counter()
+
+    def apply(future):
+        table, results = future.result()
+        counts = recorder.apply_rescores(table, results, writeback=writeback, dry_run=dry_run)
+        for k, v in counts.items():
+            totals[k] = totals.get(k, 0) + v
+        if totals['scored'] % (chunk_size * 20) < chunk_size:
+            rate = totals['scored'] / max(time.perf_counter() - start, 1e-6)
+            print(f"   [RESCORE] {totals['scored']} rows ({rate:.0f}/s), {totals['changed']} changed")
+
+    # The snapshot pickles as its path: each worker maps the file, nothing is copied
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pack_refs, ledger)) as pool:
+        in_flight = deque()
+        for table, chunk in recorder.iter_rescore_chunks(chunk_size, folder_id, since_day):
+            in_flight.append(pool.submit(_score_chunk, table, chunk))
+            if len(in_flight) >= workers * 2:
+                apply(in_flight.popleft())
+        while in_flight:
+            apply(in_flight.popleft())
+
+    if ledger is not None: ledger.close()
+    totals['seconds'] = round(time.perf_counter() - start, 2)
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-score past audits from their stored OCR text (no downloads, no tesseract).")
+    parser.add_argument('--db', default='aura_logs.db', help='SQLite log (default: ./aura_logs.db)')
+    parser.add_argument('--folder', default=None, help='only rows from this Drive folder ID')
+    parser.add_argument('--since', default=None, help='only months from this day on (YYYY-MM-DD)')
+    parser.add_argument('--packs', default=None,
+                        help='comma separated rule packs (default: AURA_RULE_PACKS)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk', type=int, default=1000, help='rows per read / transaction')
+    parser.add_argument('--ledger', default=None,
+                        help='Master Ledger snapshot (default: aura_ledger.idx next to the db)')
+    parser.add_argument('--no-ledger', action='store_true', help='do not check the Master Ledger snapshot')
+    parser.add_argument('--writeback', action='store_true',
+                        help='queue newly verified receipts for Master Ledger write-back')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='report what would change, write nothing (each chunk rolls back, '
+                             'so duplicates between re-scored rows are under-counted)')
+    args = parser.parse_args()
+
+    packs = [p.strip() for p in args.packs.split(',') if p.strip()] if args.packs is not None else None
+    print(f"--- AURA RE-SCORE {'(DRY RUN) ' if args.dry_run else ''}---")
+    recorder = SessionManager(args.db)
+    ledger_path = None if args.no_ledger else (args.ledger or recorder.ledger_index_path)
+    result = rescore(recorder, args.workers, args.chunk, packs, args.folder, args.since,
+                     args.writeback, args.dry_run, ledger_path)
+    if not result.get('scored'):
+        print("   No stored OCR text to re-score.")
+        sys.exit(0)
+    print(f"   Scored {result['scored']} rows in {result['seconds']}s: {result['changed']} changed "
+          f"({result['promoted']} newly verified, {result['demoted']} no longer verified, "
+          f"{result['duplicates']} now duplicates).")
+    if result['promoted'] and not args.writeback:
+        print("   [NOTE] Newly verified rows were not queued for the ledger (use --writeback).")
+    if result['already_written']:
+        print(f"   [WARN] {result['already_written']} demoted receipts are already in the Master Ledger; "
+              "review them by hand.")
@@ -0,0 +1,513 @@
+import os
+import sys
+import ssl
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from urllib.parse import urlsplit, urljoin, urlencode, quote
+from typing import Dict, Any, Optional, List, Callable, Tuple
+
+# PATH FIX
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+if project_root not in sys.path: sys.path.append(project_root)
+
+from src.services.metrics import DRIVE_REQUESTS, DOWNLOAD_SECONDS, STAGE_OVERRUNS
+from src.services.resource_governor import STAGE_BUDGETS, MemoryBudget, get_memory_budget
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, body: bytes = b''):
+        super().__init__(f"HTTP {status}: {body[:200]!r}")
+        self.status = status
+        self.body = body
+
+
+class _Connection:
+    """One keep-alive HTTP/1.1 connection."""
+    __slots__ = ('reader', 'writer', 'reused')
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader, self.writer, self.reused = reader, writer, False
+
+    def close(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class AsyncHTTPPool:
+    """
+    Minimal asyncio HTTP/1.1 client with per-host keep-alive pools.
+    Stdlib only (no aiohttp dependency), which is all the Drive REST API needs:
+    GET with bearer auth, Content-Length or chunked bodies, redirects.
+      - `per_host` caps concurrent requests (and open sockets) per host
+      - `total` caps requests across all hosts
+    """
+
+    MAX_REDIRECTS = 3
+    READ_LIMIT = 1 << 20        # StreamReader buffer; header lines stay far below it
+
+    def __init__(self, per_host: int = 64, total: int = 256, ssl_context: ssl.SSLContext = None):
+        self.per_host = per_host
+        self._total = asyncio.Semaphore(total)
+        self._hosts: Dict[Tuple[str, str, int], Dict[str, Any]] = {}
+        self._ssl = ssl_context or ssl.create_default_context()
+        self.stats = {'requests': 0, 'connections': 0, 'reused': 0, 'bytes': 0}
+
+    def _host(self, key: Tuple[str, str, int]) -> Dict[str, Any]:
+        pool = self._hosts.get(key)
+        if pool is None:
+            pool = {'sem': asyncio.Semaphore(self.per_host), 'idle': deque()}
+            self._hosts[key] = pool
+        return pool
+
+    async def _connect(self, scheme: str, host: str, port: int) -> _Connection:
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=self._ssl if scheme == 'https' else None, limit=self.READ_LIMIT
+        )
+        self.stats['connections'] += 1
+        return _Connection(reader, writer)
+
+    async def request(self, method: str, url: str, headers: Dict[str, str] = None) -> Tuple[int, Dict[str, str], bytes]:
+        for _ in range(self.MAX_REDIRECTS + 1):
+            status, resp_headers, body = await self._request_once(method, url, headers or {})
+            if status in (301, 302, 303, 307, 308) and 'location' in resp_headers:
+                target = urljoin(url, resp_headers['location'])
+                headers = self.redirect_headers(url, target, headers or {})
+                url = target
+                continue
+            return status, resp_headers, body
+        raise HTTPError(status, b'too many redirects')
+
+    @staticmethod
+    def redirect_headers(url: str, target: str, headers: Dict[str, str]) -> Dict[str, str]:
+        """Headers for following a redirect: credentials never go to another scheme / host / port (as urllib, requests)."""
+        old, new = urlsplit(url), urlsplit(target)
+        if (old.scheme, old.hostname, old.port) == (new.scheme, new.hostname, new.port):
+            return headers
+        return {k: v for k, v in headers.items() if k.lower() not in ('authorization', 'cookie')}
+
+    async def _request_once(self, method: str, url: str, headers: Dict[str, str]):
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'https'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        pool = self._host(key)
+
+        lines = [f'{method} {target} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: keep-alive']
+        lines += [f'{k}: {v}' for k, v in headers.items()]
+        raw = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        async with self._total, pool['sem']:
+            # A pooled socket may have been closed by the server while idle:
+            # retry exactly once on a fresh connection in that case.
+            for attempt in range(2):
+                conn = pool['idle'].pop() if pool['idle'] else None
+                if conn is None:
+                    conn = await self._connect(*key)
+                else:
+                    conn.reused = True
+                    self.stats['reused'] += 1
+                try:
+                    conn.writer.write(raw)
+                    await conn.writer.drain()
+                    status, resp_headers, body, keep = await self._read_response(conn.reader, method)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    conn.close()
+                    if conn.reused and attempt == 0: continue
+                    raise ConnectionError(f"{parts.hostname}: {e}") from e
+                except BaseException:
+                    conn.close()
+                    raise
+                if keep:
+                    pool['idle'].append(conn)
+                else:
+                    conn.close()
+                self.stats['requests'] += 1
+                self.stats['bytes'] += len(body)
+                return status, resp_headers, body
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader, method: str):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed before response')
+        version, status = status_line.split(None, 2)[:2]
+        status = int(status)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''): break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';', 1)[0].strip(), 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''): pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body, keep = await reader.read(), False
+        return status, headers, body, keep
+
+    async def close(self):
+        for pool in self._hosts.values():
+            while pool['idle']:
+                pool['idle'].pop().close()
+
+
+class AsyncDriveClient:
+    """
+    Drive v3 over AsyncHTTPPool: media downloads and folder listings.
+    Auth comes from the same google.oauth2 credentials DriveManager uses;
+    refreshes (blocking) run in the default executor, never on the loop.
+    """
+
+    API_ROOT = 'https://www.googleapis.com/drive/v3'
+    FOLDER_MIME = 'application/vnd.google-apps.folder'
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    MAX_RETRIES = 4
+
+    def __init__(self, creds=None, api_root: str = None, per_host: int = 64, total: int = 256):
+        self.creds = creds
+        self.api_root = (api_root or self.API_ROOT).rstrip('/')
+        self.http = AsyncHTTPPool(per_host=per_host, total=total)
+        self._refresh_lock = asyncio.Lock()
+
+    async def _auth_headers(self, force_refresh: bool = False) -> Dict[str, str]:
+        if self.creds is None: return {}
+        if force_refresh or not self.creds.valid:
+            async with self._refresh_lock:
+                if force_refresh or not self.creds.valid:
+                    from google.auth.transport.requests import Request
+                    await asyncio.get_running_loop().run_in_executor(None, self.creds.refresh, Request())
+        return {'Authorization': f'Bearer {self.creds.token}'}
+
+    async def _get(self, url: str) -> bytes:
+        refreshed = False
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                # Per attempt: a stalled socket (listing or media) is dropped and retried, never waited on forever
+                status, _, body = await asyncio.wait_for(
+                    self.http.request('GET', url, await self._auth_headers()), STAGE_BUDGETS['download'])
+            except (ConnectionError, OSError, asyncio.TimeoutError):
+                DRIVE_REQUESTS.inc('async_get', 'network_error')
+                if attempt == self.MAX_RETRIES: raise
+                await asyncio.sleep(min(8.0, 0.25 * 2 ** attempt))
+                continue
+            DRIVE_REQUESTS.inc('async_get', 'ok' if status == 200 else str(status))
+            if status == 200:
+                return body
+            if status == 401 and not refreshed and self.creds is not None:
+                refreshed = True
+                await self._auth_headers(force_refresh=True)
+                continue
+            if status in self.RETRY_STATUSES and attempt < self.MAX_RETRIES:
+                await asyncio.sleep(min(8.0, 0.25 * 2 ** attempt))
+                continue
+            raise HTTPError(status, body)
+        raise HTTPError(0, b'retries exhausted')
+
+    async def get_media(self, file_id: str) -> bytes:
+        return await self._get(f"{self.api_root}/files/{quote(file_id, safe='')}?alt=media")
+
+    async def get_thumbnail(self, thumbnail_url: str) -> bytes:
+        """Drive-rendered rendition (thumbnailLink resized, see VisionEngine.thumbnail_url)."""
+        return await self._get(thumbnail_url)
+
+    async def list_children(self, folder_id: str) -> List[Dict[str, Any]]:
+        items, page_token = [], None
+        while True:
+            params = {
+                'q': f"'{folder_id}' in parents and trashed = false",
+                'fields': 'nextPageToken, files(id, name, mimeType, thumbnailLink, size, modifiedTime, parents)',
+                'pageSize': 1000,
+            }
+            if page_token: params['pageToken'] = page_token
+            page = json.loads(await self._get(f"{self.api_root}/files?{urlencode(params)}"))
+            items.extend(page.get('files', []))
+            page_token = page.get('nextPageToken')
+            if not page_token: return items
+
+    async def list_tree(self, folder_id: str) -> List[Dict[str, Any]]:
+        """Recursive listing; sibling sub-folders are listed concurrently."""
+        children = await self.list_children(folder_id)
+        files = [c for c in children if c['mimeType'] != self.FOLDER_MIME
+                 and any(m in c['mimeType'] for m in ['image/', 'pdf'])]
+        subfolders = [c['id'] for c in children if c['mimeType'] == self.FOLDER_MIME]
+        for nested in await asyncio.gather(*(self.list_tree(f) for f in subfolders)):
+            files.extend(nested)
+        return files
+
+    async def close(self):
+        await self.http.close()
+
+
+class DriveIOEngine:
+    """
+    The 'Courier' of AURA.
+    Owns one event loop on one background thread. Hundreds of Drive fetches
+    run concurrently on it; each finished payload is handed to a callback
+    (normally: submit OCR to the CPU pool). Payloads downloaded but not yet
+    released are held in bytes against the shared MemoryBudget's payload cap,
+    so a slow OCR pool throttles downloads whatever the file sizes, without
+    taking decoder room away from that pool.
+    """
+
+    ESTIMATE_BYTES = 1024 * 1024    # hold taken for a file whose listing has no size
+    STOP_CHECK_S = 0.5              # a download waiting for hold room re-checks should_stop this often
+
+    def __init__(self, creds=None, concurrency: int = None, budget: MemoryBudget = None, api_root: str = None,
+                 thumbnail_url: Callable[[str], str] = None):
+        self.creds = creds
+        # Progressive mode: fetch the resized thumbnail first when the listing has one
+        self.thumbnail_url = thumbnail_url
+        self.api_root = api_root
+        self.concurrency = concurrency or int(os.getenv('AURA_IO_CONCURRENCY', '128'))
+        self.budget = budget or get_memory_budget()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='aura-io', daemon=True)
+        self._thread.start()
+        self.client: AsyncDriveClient = self._call(self._make_client())
+
+    async def _make_client(self) -> AsyncDriveClient:
+        return AsyncDriveClient(self.creds, api_root=self.api_root,
+                                per_host=self.concurrency, total=self.concurrency)
+
+    def _call(self, coro):
+        """Runs a coroutine on the I/O loop and blocks the calling thread for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    # --- Blocking API (for worker threads) ---
+
+    def list_tree(self, folder_id: str) -> List[Dict[str, Any]]:
+        return self._call(self.client.list_tree(folder_id))
+
+    def fetch(self, file_id: str) -> bytes:
+        return self._call(self._budgeted(self.client.get_media(file_id)))
+
+    @staticmethod
+    async def _budgeted(coro):
+        """Cancels a download that runs past the download budget (asyncio.TimeoutError)."""
+        try:
+            return await asyncio.wait_for(coro, STAGE_BUDGETS['download'])
+        except asyncio.TimeoutError:
+            STAGE_OVERRUNS.inc('download')
+            raise asyncio.TimeoutError(f"over the {STAGE_BUDGETS['download']:.0f}s download budget") from None
+
+    def download_all(self, files: List[Dict[str, Any]],
+                     on_ready: Callable[..., None], should_stop: Callable[[], bool] = None):
+        """
+        Downloads every file and calls on_ready(file_meta, payload, seconds, error, release, fidelity)
+        on the I/O thread as each one lands. fidelity is 'thumbnail' or 'original'.
+        The consumer must call release() once it is done with the payload.
+        Files not yet started when should_stop() turns true are skipped.
+        Blocks until every download is handed off.
+        """
+        self._call(self._download_all(files, on_ready, should_stop))
+
+    async def _download_all(self, files, on_ready, should_stop=None):
+        """
+        One dispatcher walks `files` in the scheduler's order: a fetch slot first,
+        then hold room for the payload (woken by drop() / resize_hold(), never
+        polled), then the fetch runs as its own task. should_stop() is checked
+        before every wait, so a stop never waits for room.
+        """
+        budget = self.budget
+        fetch_slots = asyncio.Semaphore(self.concurrency)
+        room = asyncio.Event()
+        wake = lambda: self.loop.call_soon_threadsafe(room.set)
+        stopped = lambda: bool(should_stop and should_stop())
+
+        async def fetch(meta, estimate):
+            try:
+                t0 = time.perf_counter()
+                payload, error, fidelity = None, None, 'original'
+                if self.thumbnail_url and meta.get('thumbnailLink'):
+                    try:
+                        payload = await self._budgeted(
+                            self.client.get_thumbnail(self.thumbnail_url(meta['thumbnailLink'])))
+                        fidelity = 'thumbnail'
+                    except Exception:
+                        payload = None
+                if payload is None:
+                    try:
+                        payload = await self._budgeted(self.client.get_media(meta['id']))
+                    except Exception as e:
+                        error = e
+            finally:
+                fetch_slots.release()
+            seconds = time.perf_counter() - t0
+            DOWNLOAD_SECONDS.observe(seconds, f'async_{fidelity}')
+            held = len(payload) if payload else 0
+            budget.resize_hold(held - estimate)
+
+            released = []
+            def release():
+                # Thread-safe (called from an OCR worker); only the first call counts
+                if not released:
+                    released.append(True)
+                    budget.drop(held)
+            try:
+                on_ready(meta, payload, seconds, error, release, fidelity)
+            except Exception:
+                release()
+                raise
+
+        tasks = []
+        budget.add_listener(wake)
+        try:
+            for meta in files:
+                if stopped(): break
+                await fetch_slots.acquire()
+                # Held at the listed size (an upper bound for a thumbnail), corrected once the bytes are in
+                estimate = int(meta['size']) if meta.get('size') else self.ESTIMATE_BYTES
+                holding = False
+                while not stopped():
+                    room.clear()
+                    if budget.try_hold(estimate):
+                        holding = True
+                        break
+                    try:
+                        # The timeout only re-checks should_stop (a deadline moves without any drop)
+                        await asyncio.wait_for(room.wait(), self.STOP_CHECK_S)
+                    except asyncio.TimeoutError:
+                        pass
+                if not holding:
+                    fetch_slots.release()
+                    break
+                tasks.append(asyncio.ensure_future(fetch(meta, estimate)))
+            await asyncio.gather(*tasks)
+        finally:
+            budget.remove_listener(wake)
+
+    def close(self):
+        try:
+            self._call(self.client.close())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+            self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- Local stand-in for tests / benchmarks ---
+
+async def start_standin_server(files: Dict[str, bytes], latency: float = 0.02, folders: Dict[str, List[Dict[str, Any]]] = None):
+    """
+    Tiny Drive look-alike on 127.0.0.1: serves /drive/v3/files/<id>?alt=media
+    (Content-Length bodies, keep-alive) and /drive/v3/files?q='<folder>' in parents...
+    Returns (server, api_root).
+    """
+    folders = folders or {'root': [{'id': fid, 'name': f'{fid}.jpg', 'mimeType': 'image/jpeg', 'size': str(len(body))}
+                                   for fid, body in files.items()]}
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line: break
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''): pass
+                target = request_line.split()[1].decode()
+                await asyncio.sleep(latency)
+                path, _, query = target.partition('?')
+                if 'alt=media' in query:
+                    body = files.get(path.rsplit('/', 1)[-1])
+                else:
+                    from urllib.parse import parse_qs
+                    q = parse_qs(query).get('q', [''])[0]
+                    folder = q.split("'")[1] if "'" in q else ''
+                    body = json.dumps({'files': folders.get(folder, [])}).encode()
+                status = b'200 OK' if body is not None else b'404 Not Found'
+                body = body if body is not None else b'not found'
+                writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f'http://127.0.0.1:{port}/drive/v3'
+
+
+if __name__ == "__main__":
+    print("--- ASYNC DRIVE I/O DIAGNOSTICS (local stand-in) ---")
+    N, SIZE, LATENCY = 1000, 200_000, 0.05
+    payloads = {f'file{i:04d}': os.urandom(SIZE) for i in range(N)}
+
+    engine = DriveIOEngine(concurrency=200, budget=MemoryBudget(80 * 1024 * 1024))
+    server, api_root = engine._call(start_standin_server(payloads, latency=LATENCY))
+    engine.client.api_root = api_root
+
+    listing = engine.list_tree('root')
+    print(f"[OK] Listed {len(listing)} files.")
+
+    received, lock = {}, threading.Lock()
+    def on_ready(meta, payload, seconds, error, release, fidelity):
+        with lock: received[meta['id']] = payload
+        release()
+
+    start = time.perf_counter()
+    engine.download_all(listing, on_ready)
+    elapsed = time.perf_counter() - start
+    ok = all(received.get(fid) == body for fid, body in payloads.items())
+    mb = N * SIZE / 1e6
+    print(f"[{'OK' if ok else 'FAIL'}] {N} downloads, {mb:.0f} MB in {elapsed:.2f}s "
+          f"({mb / elapsed:.0f} MB/s, {N / elapsed:.0f} files/s, one thread, {LATENCY * 1000:.0f} ms latency each)")
+    print(f"   Pool stats: {engine.client.http.stats}")
+
+    # Backpressure: a slow consumer (releases 20 ms later on another thread) against a 2 MB payload cap
+    engine.budget = MemoryBudget(80 * 1024 * 1024, 2 * 1024 * 1024)
+    order, peak = [], [0]
+    def slow_consumer(meta, payload, seconds, error, release, fidelity):
+        with lock:
+            order.append(meta['id'])
+            peak[0] = max(peak[0], engine.budget.held_bytes)
+        threading.Timer(0.02, release).start()
+    subset = listing[:200]
+    start = time.perf_counter()
+    engine.download_all(subset, slow_consumer)
+    time.sleep(0.1)
+    ok = len(order) == len(subset) and peak[0] <= engine.budget.hold_limit_bytes and engine.budget.held_bytes == 0
+    print(f"[{'OK' if ok else 'FAIL'}] {len(order)} downloads under a 2 MB cap in {time.perf_counter() - start:.2f}s, "
+          f"peak held {peak[0] / 1e6:.1f} MB")
+
+    stopped = []
+    engine.download_all(listing, lambda m, p, s, e, release, f: (stopped.append(m['id']), release()),
+                        should_stop=lambda: len(stopped) >= 10)
+    print(f"[{'OK' if len(stopped) < len(listing) else 'FAIL'}] should_stop halted dispatch after {len(stopped)} files")
+
+    headers = {'Authorization': 'Bearer x', 'Accept': '*/*'}
+    same = AsyncHTTPPool.redirect_headers('https://www.googleapis.com/a', 'https://www.googleapis.com/b', headers)
+    other = AsyncHTTPPool.redirect_headers('https://www.googleapis.com/a', 'https://evil.example/b', headers)
+    ok = 'Authorization' in same and 'Authorization' not in other and 'Accept' in other
+    print(f"[{'OK' if ok else 'FAIL'}] Authorization kept on same-host redirects, dropped cross-host")
+
+    # Client sockets first, so the stand-in's handlers see EOF before the loop stops
+    engine._call(engine.client.close())
+    engine._call(asyncio.sleep(0.1))
+    server.close()
+    engine.close()
@@ -1,74 +1,104 @@
-import threading
+import os
+import re
 import time
+import threading
 import queue
 
+from dotenv import load_dotenv
+
+from src.audit_folder import AuditRuntime, AuditSession
+
+
 class AuditManager:
     """
     Manages the audit process in a background thread to keep the GUI responsive.
     Follows the 'Iron Dome' philosophy: Accuracy > Speed.
+
+    One controller thread lives as long as the app. It builds the AuditRuntime
+    (ledger index, Drive / Sheets clients, OCR pool with its engines, async I/O)
+    right at launch and runs every audit on it, so the second audit starts on
+    warm engines instead of re-authenticating and re-syncing everything.
+    The Master Ledger comes from AURA_SHEET_ID (environment or .env); without it
+    the view asks for the Sheet ID and warm-up waits for the first audit.
+    Audit output reaches the GUI through the session's log callback; process
+    stdout is left alone.
     """
-    def __init__(self, log_callback, finished_callback):
+    _ANSI = re.compile(r'\x1b\[[0-9;]*m')
+
+    def __init__(self, log_callback, finished_callback, sheet_id: str = None):
+        load_dotenv()
         self.log_callback = log_callback  # Function to call with log messages
         self.finished_callback = finished_callback # Function to call when done
+        self.sheet_id = sheet_id or os.getenv('AURA_SHEET_ID')
         self.is_running = False
+        self.runtime = None
         self._stop_event = threading.Event()
+        self._jobs = queue.Queue()
+
+        threading.Thread(target=self._run_forever, name='aura-audit', daemon=True).start()
+        self._jobs.put(('WARM', None))
 
-    def start_audit(self, drive_link):
+    def start_audit(self, drive_link, sheet_id: str = None):
         if self.is_running:
             return
-        
+        if sheet_id: self.sheet_id = sheet_id
+
         self.is_running = True
         self._stop_event.clear()
-        
-        # Start the heavy lifting in a separate thread
-        thread = threading.Thread(target=self._run_audit_process, args=(drive_link,), daemon=True)
-        thread.start()
+        self._jobs.put(('AUDIT', drive_link))
 
     def stop_audit(self):
         self.log_callback("[SYSTEM] Stopping audit process...")
         self._stop_event.set()
 
+    def _log(self, text: str):
+        """Session / runtime log lines, without the CLI's ANSI colours."""
+        for line in self._ANSI.sub('', text).split('\n'):
+            self.log_callback(line)
+
+    def _run_forever(self):
+        while True:
+            job, arg = self._jobs.get()
+            if job == 'WARM':
+                self._warm_up()
+            else:
+                self._run_audit_process(arg)
+
+    def _ensure_runtime(self) -> AuditRuntime:
+        if self.runtime is None:
+            if not self.sheet_id:
+                raise ValueError("No Master Ledger Sheet ID (set AURA_SHEET_ID or enter it when prompted).")
+            self.runtime = AuditRuntime(self.sheet_id, log=self._log)
+        return self.runtime
+
+    def _warm_up(self):
+        if not self.sheet_id:
+            self.log_callback("[INFO] No AURA_SHEET_ID set; engines warm up on the first audit.")
+            return
+        try:
+            self._ensure_runtime().warm_up()
+        except Exception as e:
+            # Not fatal: whatever is missing gets built by the first audit
+            self.log_callback(f"[WARN] Warm-up incomplete: {e}")
+
     def _run_audit_process(self, drive_link):
-        """
-        The actual logic execution. 
-        REPLACE THIS with calls to your src/audit_folder.py logic in the future.
-        """
         try:
-            self.log_callback(f"[INIT] Starting Audit Engine v1.0...")
-            self.log_callback(f"[auth] Authenticating with Google Service Account...")
-            time.sleep(1) # Simulation
-            
-            self.log_callback(f"[drive] Resolving Link: {drive_link}")
             if not drive_link:
                 raise ValueError("No Drive Link provided.")
-            
-            self.log_callback(f"[drive] Connection Established. Scanning folder structure...")
-            time.sleep(1.5) 
-            
-            # Simulated Scanning Loop
-            files = ["IMG_20260214_001.jpg", "IMG_20260214_002.png", "Screenshot_55.pdf"]
-            
-            for i, file in enumerate(files):
-                if self._stop_event.is_set():
-                    self.log_callback("[WARN] Audit aborted by user.")
-                    break
-                
-                self.log_callback(f"\n[SCAN] Processing {file}...")
-                self.log_callback(f"   > Hashing file (SHA-256)...")
-                time.sleep(0.5)
-                self.log_callback(f"   > OCR Extraction (Tesseract)...")
-                time.sleep(0.8)
-                
-                if i == 1:
-                    self.log_callback(f"   [!!!] DUPLICATE DETECTED: Matches Record #882")
-                else:
-                    self.log_callback(f"   [OK] Verified: UTR 445829102 | Amount: ₹500")
-
-            self.log_callback("\n[SUCCESS] Audit Session Complete. Report generated.")
-            
+            started = time.perf_counter()
+            session = AuditSession(self.sheet_id, runtime=self._ensure_runtime(), log=self._log)
+            session.stop_event = self._stop_event
+            session.start_audit(drive_link)
+
+            if self._stop_event.is_set():
+                self.log_callback("[WARN] Audit aborted by user.")
+            else:
+                self.log_callback(f"\n[SUCCESS] Audit Session Complete in "
+                                  f"{time.perf_counter() - started:.1f}s. Report generated.")
+
         except Exception as e:
             self.log_callback(f"\n[ERROR] Critical Failure: {str(e)}")
-        
+
         finally:
             self.is_running = False
-            self.finished_callback()
\ No newline at end of file
+            self.finished_callback()
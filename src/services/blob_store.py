@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import hashlib
+from typing import Optional, Iterable
+
+# PATH FIX
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+if project_root not in sys.path: sys.path.append(project_root)
+
+
+class BlobStore:
+    """
+    The 'Evidence Locker' of AURA.
+    Content-addressed local copies of the images the audit already downloaded,
+    so flagged receipts can be reviewed without fetching them from Drive again.
+
+    A blob is stored once under its SHA-256 (<root>/ab/cdef...), whatever file
+    or run it came from; writes go to a temp file and are renamed into place,
+    so a reader never sees half an image.
+    """
+
+    def __init__(self, root: str = None):
+        # Next to aura_logs.db by default (both live in the working directory)
+        self.root = root or os.path.join(os.getcwd(), os.getenv('AURA_BLOB_DIR', 'aura_blobs'))
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def put(self, payload: bytes) -> str:
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            os.utime(path)   # fresh again: prune() spares it until its review item is committed
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self.path(digest), 'rb') as f:
+                return f.read()
+        except (OSError, TypeError):
+            return None
+
+    def __contains__(self, digest: str) -> bool:
+        return bool(digest) and os.path.exists(self.path(digest))
+
+    def prune(self, keep: Iterable[str], older_than: float = 3600.0) -> int:
+        """
+        Deletes every blob not in `keep` (e.g. the ones no open review item needs).
+        Blobs younger than `older_than` seconds are left alone: a running audit
+        may have stored one whose review item isn't committed yet. Returns bytes freed.
+        """
+        keep = set(keep)
+        cutoff = time.time() - older_than
+        freed = 0
+        for bucket in os.listdir(self.root):
+            folder = os.path.join(self.root, bucket)
+            if not os.path.isdir(folder): continue
+            for name in os.listdir(folder):
+                if bucket + name in keep: continue
+                path = os.path.join(folder, name)
+                try:
+                    st = os.stat(path)
+                    if st.st_mtime > cutoff or name.endswith('.tmp'): continue
+                    os.remove(path)
+                    freed += st.st_size
+                except OSError:
+                    pass
+        return freed
+
+
+if __name__ == "__main__":
+    import tempfile
+    print("--- BLOB STORE DIAGNOSTICS ---")
+    store = BlobStore(tempfile.mkdtemp(prefix='aura_blobs_'))
+    a = store.put(b'receipt-a')
+    b = store.put(b'receipt-b')
+    assert store.put(b'receipt-a') == a and store.get(a) == b'receipt-a'
+    print(f"   Stored 2 blobs under {store.root}; re-put deduplicated.")
+    print(f"   Pruned {store.prune([a], older_than=0)} bytes; kept a: {a in store}, kept b: {b in store}")
@@ -10,6 +10,7 @@ if project_root not in sys.path: sys.path.append(project_root)
 
 from googleapiclient.discovery import build
 from src.services.auth_manager import AuthManager
+from src.services.metrics import DRIVE_REQUESTS
 
 class DriveManager:
     """
@@ -73,6 +74,7 @@ class DriveManager:
                 fileId=folder_id,
                 fields='id, name, owners(displayName, emailAddress)'
             ).execute()
+            DRIVE_REQUESTS.inc('get', 'ok')
             
             # Extract primary owner
             owners = file.get('owners', [])
@@ -84,6 +86,7 @@ class DriveManager:
                 'folder_id': file.get('id')
             }
         except Exception as e:
+            DRIVE_REQUESTS.inc('get', 'error')
             print(f"[ERROR] Could not fetch folder metadata: {e}")
             return {'folder_name': 'Unknown', 'owner_name': 'Unknown', 'folder_id': folder_id}
 
@@ -107,6 +110,7 @@ class DriveManager:
                     fields='nextPageToken, files(id, name, mimeType)',
                     pageToken=page_token
                 ).execute()
+                DRIVE_REQUESTS.inc('list', 'ok')
 
                 for file in response.get('files', []):
                     mime = file.get('mimeType')
@@ -137,6 +141,7 @@ class DriveManager:
                     break
                     
         except Exception as e:
+            DRIVE_REQUESTS.inc('list', 'error')
             print(f"[ERROR] Listing files in {folder_id}: {e}")
             
         return files_found
@@ -0,0 +1,204 @@
+import os
+import re
+import json
+from typing import Dict, Any, List, Optional
+
+# The canonical rule set. VisionEngine.PATTERNS points here, so fixing a
+# regex in one place fixes live audits and bulk re-scoring alike.
+DEFAULT_PATTERNS = {
+    # Paytm-style 'T2402...' order IDs: removed before any amount matching
+    'txn_noise': r'T\d{8,}',
+    'upi_labeled': r'(?i)(?:UPI\s*Ref\.?\s*No|UTR|Transaction\s*ID|Txn\s*ID|Ref\s*No|Reference\s*ID|Bank\s*Ref|Ref\s*Number)[\s:\-\.]*([A-Z0-9]+)',
+    'upi_standalone': r'\b\d{12,25}\b',
+    'amount_strict': r'(?:₹|Rs\.?|INR)\s*[\.\-]?\s*([\d,]+\.?\d{0,2})',
+    # Removed 'T' from fuzzy to prevent Transaction ID matches
+    'amount_fuzzy': r'(?:<|\?|t|R|\|)\s*([\d,]+\.?\d{0,2})\b',
+    'amount_generic': r'\b(\d{1,6}(?:,\d{3})*(?:\.\d{2})?)\b',
+    'date_text': r'(?i)(?:on\s+)?(\d{1,2})[\s\-\/]+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[\s\-\/,]+(\d{4})',
+}
+
+# Literal pre-filters: at least one of these (lower-case) must occur in the text
+# for the rule to have any chance of matching. A case-sensitive literal scan of
+# the lower-cased text is several times cheaper than letting a case-insensitive
+# alternation fail at every position of a long OCR dump.
+DEFAULT_HINTS = {
+    'upi_labeled': ['utr', 'ref', 'transaction', 'txn'],
+    'date_text': ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'],
+}
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules')
+
+
+def validate_amount(val: float) -> bool:
+    """GLOBAL SAFETY CHECK: Rejects improbable donation amounts."""
+    # 1. Must be positive
+    # 2. Must be <= 2,00,000 (2 Lakhs)
+    # 3. Must not look like a year (2025, 2026)
+    if val <= 0: return False
+    if val > 200000: return False
+    if val in [2024, 2025, 2026, 2027]: return False
+    return True
+
+
+class Rule:
+    """One compiled pattern plus its optional literal pre-filter."""
+    __slots__ = ('pattern', 'regex', 'hints')
+
+    def __init__(self, pattern: str, hints: List[str] = None):
+        self.pattern = pattern
+        self.regex = re.compile(pattern)
+        self.hints = re.compile('|'.join(re.escape(h.lower()) for h in hints)) if hints else None
+
+    def possible(self, lowered: Optional[str]) -> bool:
+        return self.hints is None or self.hints.search(lowered) is not None
+
+
+class ExtractionEngine:
+    """
+    The 'Reader' of AURA.
+    Compiles every extraction rule once and evaluates the tiers as a lazy,
+    short-circuiting plan over a single text:
+
+      UTR:    labeled (first hit) -> standalone 12-25 digits (first hit)
+      Amount: strict -> fuzzy -> generic; max valid value of the first
+              non-empty tier, matched on the text with txn_noise removed
+      Date:   first hit of date_text
+
+    The text is lower-cased once and each rule's literal hints are scanned
+    for in it before the regex runs, so rules that cannot match cost a cheap
+    literal scan instead of a failing case-insensitive one. Results are identical to the original
+    multi-pass extractor (see src/bench_extraction.py + the golden corpus).
+
+    Rule packs append patterns to a tier: in first-hit tiers an earlier
+    pattern beats a later one, in amount tiers the values are pooled.
+    """
+
+    TIERS = ('txn_noise', 'upi_labeled', 'upi_standalone',
+             'amount_strict', 'amount_fuzzy', 'amount_generic', 'date_text')
+    AMOUNT_TIERS = ('amount_strict', 'amount_fuzzy', 'amount_generic')
+    _NON_ALNUM = re.compile(r'[^A-Za-z0-9]')
+
+    def __init__(self, patterns: Dict[str, str] = None, packs: List[Dict[str, Any]] = ()):
+        self.rules: Dict[str, List[Rule]] = {tier: [] for tier in self.TIERS}
+        # Hints are only trusted for the stock patterns they were written for
+        stock = patterns is None
+        for tier, pattern in (patterns or DEFAULT_PATTERNS).items():
+            self._add_rule(tier, pattern, DEFAULT_HINTS.get(tier) if stock else None)
+        self.pack_names = []
+        for pack in packs:
+            for tier, extra in pack.get('rules', {}).items():
+                for rule in extra:
+                    if isinstance(rule, str):
+                        self._add_rule(tier, rule)
+                    else:
+                        self._add_rule(tier, rule['pattern'], rule.get('hints'))
+            self.pack_names.append(pack.get('name', '?'))
+        # Only pay for lower() when some rule actually has hints
+        self._needs_lowered = any(r.hints is not None for tier in self.rules.values() for r in tier)
+
+    def _add_rule(self, tier: str, pattern: str, hints: List[str] = None):
+        if tier not in self.rules:
+            raise ValueError(f"Unknown rule tier '{tier}'. Expected one of {self.TIERS}")
+        self.rules[tier].append(Rule(pattern, hints))
+
+    def _first(self, tier: str, text: str, lowered: Optional[str]) -> Optional[re.Match]:
+        for rule in self.rules[tier]:
+            if not rule.possible(lowered): continue
+            m = rule.regex.search(text)
+            if m: return m
+        return None
+
+    def _best_amount(self, tier: str, text: str, lowered: Optional[str]) -> float:
+        best = 0.0
+        for rule in self.rules[tier]:
+            if not rule.possible(lowered): continue
+            for a in rule.regex.findall(text):
+                try:
+                    val = float(a.replace(',', ''))
+                except ValueError:
+                    continue
+                if validate_amount(val) and val > best: best = val
+        return best
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        data = {'amount': 0.0, 'utr': None, 'timestamp': None, 'extracted_text': text}
+        lowered = text.lower() if self._needs_lowered else None
+
+        # --- 1. SANITIZATION ---
+        # re.sub hands back the same object when nothing matched, so the
+        # lower-cased copy is only rebuilt when noise was actually removed
+        clean_text = text
+        for rule in self.rules['txn_noise']:
+            if rule.possible(lowered):
+                clean_text = rule.regex.sub(' ', clean_text)
+        clean_lowered = lowered if clean_text is text or lowered is None else clean_text.lower()
+
+        # --- 2. UTR (original text) ---
+        m = self._first('upi_labeled', text, lowered)
+        if m:
+            data['utr'] = self._NON_ALNUM.sub('', m.group(1))
+        else:
+            m = self._first('upi_standalone', text, lowered)
+            if m: data['utr'] = m.group(0)
+
+        # --- 3. AMOUNT (tiered, first non-empty tier wins) ---
+        for tier in self.AMOUNT_TIERS:
+            best = self._best_amount(tier, clean_text, clean_lowered)
+            if best > 0:
+                data['amount'] = best
+                break
+
+        # --- 4. DATE ---
+        m = self._first('date_text', text, lowered)
+        if m:
+            groups = m.groups()
+            day, month, year = groups[-3], groups[-2], groups[-1]
+            data['timestamp'] = f"{day} {month} {year}"
+
+        # Validation Status
+        if data['utr'] and data['amount'] > 0:
+            data['status'] = 'SUCCESS'
+        elif data['amount'] > 0:
+            data['status'] = 'MANUAL_REVIEW'
+        elif data['utr']:
+            data['status'] = 'PARTIAL_FAIL'
+        else:
+            data['status'] = 'FAILED'
+
+        return data
+
+    # --- Rule Packs ---
+
+    @staticmethod
+    def load_pack(path: str) -> Dict[str, Any]:
+        """
+        Reads a JSON rule pack:
+        {"name": "...", "description": "...",
+         "rules": {"upi_labeled": ["<regex>", {"pattern": "<regex>", "hints": ["imps"]}], ...}}
+        Bare names resolve against src/services/rules/<name>.json.
+        """
+        if os.path.sep not in path and not path.endswith('.json'):
+            path = os.path.join(RULES_DIR, f'{path}.json')
+        with open(path, encoding='utf-8') as f:
+            pack = json.load(f)
+        if not isinstance(pack.get('rules'), dict):
+            raise ValueError(f"Rule pack {path} has no 'rules' object")
+        return pack
+
+    @classmethod
+    def with_packs(cls, pack_refs: List[str], patterns: Dict[str, str] = None) -> 'ExtractionEngine':
+        return cls(patterns=patterns, packs=[cls.load_pack(ref) for ref in pack_refs])
+
+
+_default_engine: Optional[ExtractionEngine] = None
+
+def get_default_engine() -> ExtractionEngine:
+    """
+    Process-wide engine: DEFAULT_PATTERNS plus any packs named in
+    AURA_RULE_PACKS (comma separated names or paths).
+    """
+    global _default_engine
+    if _default_engine is None:
+        refs = [r.strip() for r in os.getenv('AURA_RULE_PACKS', '').split(',') if r.strip()]
+        _default_engine = ExtractionEngine.with_packs(refs)
+    return _default_engine
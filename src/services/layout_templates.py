@@ -0,0 +1,258 @@
+import os
+import json
+import threading
+import cv2
+import pytesseract
+import numpy as np
+from typing import Dict, Any, Optional, List
+
+from src.services.metrics import OCR_SECONDS
+from src.services.resource_governor import STAGE_BUDGETS
+
+class LayoutRecognizer:
+    """
+    The 'Muscle Memory' of the Vision Engine.
+    GPay / PhonePe / Paytm / bank receipts have stable layouts. After a
+    successful full-page read, we remember WHERE the amount, UTR and date
+    sit (relative boxes) and, next time, OCR only those crops with tight
+    per-field configs. Templates live locally in assets/templates/layouts.json.
+    """
+
+    # App identification from the OCR text of a successful full read
+    APP_KEYWORDS = {
+        'gpay': ['google pay', 'gpay', 'g pay'],
+        'phonepe': ['phonepe', 'phone pe'],
+        'paytm': ['paytm'],
+        'bhim': ['bhim'],
+        'bank': ['bank', 'imps', 'neft'],
+    }
+
+    # Per-field tesseract configs: single line + character whitelists
+    FIELD_CONFIGS = {
+        'amount': r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789.,',
+        'utr': r'--oem 3 --psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+        'date': r'--oem 3 --psm 7',
+    }
+    # Horizontal slack (fraction of width) so longer values still fit the box
+    FIELD_PAD_X = {'amount': (0.15, 0.30), 'utr': (0.05, 0.15), 'date': (0.05, 0.25)}
+
+    GRID = (8, 16)              # signature grid (w, h)
+    MATCH_DISTANCE = 0.09       # mean abs diff on the signature
+    INK_DISTANCE = 0.8          # L1 between ink distributions (0..2)
+    MAX_ASPECT_DIFF = 0.15
+    MAX_TEMPLATES = 40
+    LEARN_WIDTH = 900           # px, image_to_data pass used only while learning
+    RETIRE_MISS_RATE = 0.5      # templates failing this often are dropped
+
+    def __init__(self, store_path: str = None):
+        self.store_path = store_path or os.path.join(os.getcwd(), 'assets', 'templates', 'layouts.json')
+        self._lock = threading.Lock()
+        self.templates: List[Dict[str, Any]] = self._load()
+
+    # --- Persistence ---
+
+    def _load(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.store_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+            tmp_path = self.store_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.templates, f)
+            os.replace(tmp_path, self.store_path)
+        except OSError as e:
+            print(f"   [WARN] Could not save layout templates: {e}")
+
+    # --- Recognition ---
+
+    def signature(self, image: np.ndarray) -> np.ndarray:
+        """Coarse luminance grid + header hue histogram. Content-agnostic, layout-sensitive."""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        grid = cv2.resize(gray, self.GRID, interpolation=cv2.INTER_AREA).astype(np.float32).ravel() / 255.0
+
+        header = image[:max(1, image.shape[0] // 7)]
+        hsv = cv2.cvtColor(cv2.resize(header, (64, 16), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2HSV)
+        hue = np.histogram(hsv[:, :, 0], bins=12, range=(0, 180), weights=hsv[:, :, 1].astype(np.float32))[0]
+        hue = hue / (hue.sum() + 1e-6)
+        return np.concatenate([grid, hue.astype(np.float32)])
+
+    def ink_profile(self, image: np.ndarray) -> np.ndarray:
+        """
+        Where the text sits: share of the ink per signature cell. Light
+        screenshots are nearly all background, so their luminance grids sit
+        within MATCH_DISTANCE of each other whatever the layout; this does not.
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        if ink.mean() > 127: ink = 255 - ink   # dark mode: the text is the light side
+        cells = cv2.resize(ink, self.GRID, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        return cells / (cells.sum() + 1e-6)
+
+    def match(self, image: np.ndarray) -> Optional[Dict[str, Any]]:
+        if not self.templates: return None
+        h, w = image.shape[:2]
+        aspect = h / float(w)
+        sig, ink = self.signature(image), None
+
+        best, best_d = None, self.MATCH_DISTANCE
+        with self._lock:
+            for tpl in self.templates:
+                if tpl['samples'] < 1 or abs(tpl['aspect'] - aspect) > self.MAX_ASPECT_DIFF: continue
+                d = float(np.abs(np.asarray(tpl['signature'], dtype=np.float32) - sig).mean())
+                if d >= best_d: continue
+                # Templates stored before ink profiles match on the signature alone until refined
+                if 'ink' in tpl:
+                    if ink is None: ink = self.ink_profile(image)
+                    if float(np.abs(np.asarray(tpl['ink'], dtype=np.float32) - ink).sum()) > self.INK_DISTANCE: continue
+                best, best_d = tpl, d
+        return best
+
+    def read_fields(self, image: np.ndarray, template: Dict[str, Any], reader=None) -> Dict[str, Any]:
+        """
+        OCRs only the template's field boxes.
+        reader(crop, config) -> text replaces pytesseract.image_to_string
+        (VisionEngine passes the shared MosaicOCR, which batches crops across files).
+        Returns the per-field text plus the number of pixels handed to tesseract.
+        """
+        read = reader or self._read_field
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape
+        texts, pixels = {}, 0
+        for field, (x0, y0, x1, y1) in template['fields'].items():
+            crop = gray[int(y0 * h):int(y1 * h), int(x0 * w):int(x1 * w)]
+            if crop.size == 0: continue
+            # Small crops: 2x helps tesseract with thin digits, still tiny next to a full page
+            crop = cv2.resize(crop, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+            pixels += crop.size
+            texts[field] = read(crop, self.FIELD_CONFIGS[field]).strip()
+        return {'texts': texts, 'ocr_pixels': pixels}
+
+    @staticmethod
+    def _read_field(crop: np.ndarray, config: str) -> str:
+        with OCR_SECONDS.time('roi'):
+            return pytesseract.image_to_string(crop, lang='eng', config=config, timeout=STAGE_BUDGETS['ocr'])
+
+    def record_result(self, template: Dict[str, Any], success: bool):
+        with self._lock:
+            template['hits' if success else 'misses'] = template.get('hits' if success else 'misses', 0) + 1
+            uses = template.get('hits', 0) + template.get('misses', 0)
+            if uses >= 10 and template.get('misses', 0) / uses > self.RETIRE_MISS_RATE:
+                print(f"   [LAYOUT] Retiring unreliable '{template['app']}' template.")
+                self.templates.remove(template)
+                self._save()
+
+    # --- Learning ---
+
+    def identify_app(self, text: str) -> str:
+        low = text.lower()
+        for app, words in self.APP_KEYWORDS.items():
+            if any(word in low for word in words): return app
+        return 'generic'
+
+    def wants_sample(self, template: Optional[Dict[str, Any]]) -> bool:
+        """
+        Learning costs one extra image_to_data pass, so it is rationed:
+        refine a template that just missed, or start a new one while there is room.
+        """
+        if template is not None:
+            return True
+        return len(self.templates) < self.MAX_TEMPLATES
+
+    def _locate_fields(self, image: np.ndarray, data: Dict[str, Any]) -> Dict[str, List[float]]:
+        """Finds the words holding the extracted values on one low-res image_to_data pass."""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        scale = min(1.0, self.LEARN_WIDTH / gray.shape[1])
+        if scale < 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        h, w = gray.shape
+        words = pytesseract.image_to_data(gray, lang='eng', config=r'--oem 3 --psm 6',
+                                          output_type=pytesseract.Output.DICT, timeout=STAGE_BUDGETS['ocr'])
+
+        utr = (data.get('utr') or '').upper()
+        amount = data.get('amount') or 0
+        stamp = (data.get('timestamp') or '').split()
+        month = stamp[1] if len(stamp) >= 2 else None
+
+        boxes = {}
+        line_end = {}   # (block, par, line) -> right edge of the last word seen on it
+        for i, raw in enumerate(words['text']):
+            word = raw.strip()
+            if not word: continue
+            line = (words['block_num'][i], words['par_num'][i], words['line_num'][i])
+            label_end = line_end.get(line)
+            line_end[line] = words['left'][i] + words['width'][i]
+            field = None
+            alnum = ''.join(c for c in word.upper() if c.isalnum())
+            digits = word.replace(',', '').lstrip('₹RrSs.')
+            if utr and len(alnum) >= 6 and (alnum in utr or utr in alnum):
+                field = 'utr'
+            elif amount:
+                try:
+                    if abs(float(digits) - amount) < 0.005: field = 'amount'
+                except ValueError:
+                    pass
+            if field is None and month and word[:3].lower() == month[:3].lower():
+                field = 'date'
+            if field is None or field in boxes: continue
+
+            x, y, bw, bh = words['left'][i], words['top'][i], words['width'][i], words['height'][i]
+            pad_l, pad_r = self.FIELD_PAD_X[field]
+            if field == 'date':
+                # the day sits left of the month word; year and time to the right
+                x, bw = max(0, x - 3 * bh), bw + 3 * bh
+            elif label_end is not None:
+                # never pad into the label ('UTR:', 'Rs.') in front of the value
+                pad_l = min(pad_l, max(0.0, (x - label_end) / (2.0 * w)))
+            boxes[field] = [
+                max(0.0, x / w - pad_l), max(0.0, (y - 0.6 * bh) / h),
+                min(1.0, (x + bw) / w + pad_r), min(1.0, (y + 1.6 * bh) / h),
+            ]
+        return boxes
+
+    def learn(self, image: np.ndarray, data: Dict[str, Any], template: Optional[Dict[str, Any]] = None):
+        """Merges one successful full-page read into a (new or existing) template."""
+        boxes = self._locate_fields(image, data)
+        if 'amount' not in boxes or 'utr' not in boxes: return
+
+        h, w = image.shape[:2]
+        sig, ink = self.signature(image), self.ink_profile(image)
+        with self._lock:
+            if template is None:
+                template = {
+                    'app': self.identify_app(data.get('extracted_text', '')),
+                    'aspect': h / float(w), 'signature': sig.tolist(), 'ink': ink.tolist(),
+                    'fields': boxes, 'samples': 1, 'hits': 0, 'misses': 0,
+                }
+                self.templates.append(template)
+                print(f"   [LAYOUT] Learned new '{template['app']}' receipt layout.")
+            else:
+                n = template['samples']
+                template['signature'] = ((np.asarray(template['signature']) * n + sig) / (n + 1)).tolist()
+                template['aspect'] = (template['aspect'] * n + h / float(w)) / (n + 1)
+                template['ink'] = ink.tolist() if 'ink' not in template else \
+                    ((np.asarray(template['ink']) * n + ink) / (n + 1)).tolist()
+                for field, box in boxes.items():
+                    old = template['fields'].get(field)
+                    # Union of boxes: covers the spread of positions seen so far
+                    template['fields'][field] = box if old is None else [
+                        min(old[0], box[0]), min(old[1], box[1]), max(old[2], box[2]), max(old[3], box[3])
+                    ]
+                template['samples'] = n + 1
+            self._save()
+
+
+# One recognizer for all worker threads, so every thread benefits from what any one learned
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_layout_recognizer() -> LayoutRecognizer:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = LayoutRecognizer()
+        return _shared
@@ -0,0 +1,301 @@
+import os
+import sys
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, List, Tuple, Callable
+
+# PATH FIX
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+if project_root not in sys.path: sys.path.append(project_root)
+
+
+class _Metric:
+    TYPE = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, label_values) -> Tuple[str, ...]:
+        if len(label_values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {label_values}")
+        return tuple(str(v) for v in label_values)
+
+    def _labels(self, key: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, key)]
+        if extra: pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(series name, rendered labels, value) for every child."""
+        with self._lock:
+            return [(self.name, self._labels(k), float(v)) for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    TYPE = 'counter'
+
+    def inc(self, *label_values, by: float = 1.0):
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + by
+
+
+class Gauge(_Metric):
+    TYPE = 'gauge'
+
+    def set(self, value: float, *label_values):
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *label_values, by: float = 1.0):
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + by
+
+    def dec(self, *label_values, by: float = 1.0):
+        self.inc(*label_values, by=-by)
+
+
+class CallbackGauge(_Metric):
+    """Read at scrape time only (e.g. the governor's worker limit): zero cost in between."""
+    TYPE = 'gauge'
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], Optional[float]]):
+        super().__init__(name, help_text)
+        self.fn = fn
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        return [] if value is None else [(self.name, '', float(value))]
+
+
+class Histogram(_Metric):
+    TYPE = 'histogram'
+    # Seconds: spans a cached thumbnail (tens of ms) to a stuck tesseract (minutes)
+    DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=None):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+
+    def observe(self, value: float, *label_values):
+        key = self._key(label_values)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket (non-cumulative) counts + the +Inf slot, sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            items = [(k, list(s[0]), s[1], s[2]) for k, s in self._values.items()]
+        out = []
+        for key, counts, total, count in items:
+            running = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                running += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                out.append((f"{self.name}_bucket", self._labels(key, f'le="{le}"'), float(running)))
+            out.append((f"{self.name}_sum", self._labels(key), total))
+            out.append((f"{self.name}_count", self._labels(key), float(count)))
+        return out
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """
+    The 'Flight Recorder' of AURA.
+    In-process counters, gauges and histograms for unattended runs (overnight
+    batches, folder watching). Recording is a dict update under a per-metric
+    lock, about a microsecond, so it stays on in production; formatting only
+    happens when someone scrapes /metrics or a snapshot is taken.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing     # module reloads / repeated setup share one series
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def gauge_fn(self, name: str, help_text: str, fn: Callable[[], Optional[float]]) -> CallbackGauge:
+        with self._lock:
+            # Latest callback wins: a new AuditRuntime re-points the gauges at itself
+            metric = self._metrics[name] = CallbackGauge(name, help_text, fn)
+            return metric
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=None) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.TYPE}")
+            for series, labels, value in m.samples():
+                lines.append(f"{series}{labels} {value:.17g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [sample for m in metrics for sample in m.samples()]
+
+
+REGISTRY = MetricsRegistry()
+
+# --- CATALOGUE (one place for every series name) ---
+
+FILES = REGISTRY.counter('aura_files_total', 'Files audited, by final status', ('status',))
+FILE_SECONDS = REGISTRY.histogram('aura_file_seconds', 'Wall time per file, download to logged result')
+FILES_INFLIGHT = REGISTRY.gauge('aura_files_inflight', 'Files currently inside a worker')
+QUEUE_DEPTH = REGISTRY.gauge('aura_queue_depth', 'Files of the running audit not recorded yet')
+WORKER_CRASHES = REGISTRY.counter('aura_worker_crashes_total', 'Files whose worker raised')
+BYTES_FETCHED = REGISTRY.counter('aura_bytes_fetched_total', 'Bytes downloaded for OCR, by fidelity', ('fidelity',))
+DOWNLOAD_SECONDS = REGISTRY.histogram('aura_download_seconds', 'Drive download latency', ('kind',))
+DECODE_SECONDS = REGISTRY.histogram('aura_decode_seconds', 'Image decode latency',
+                                    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0))
+OCR_SECONDS = REGISTRY.histogram('aura_ocr_seconds', 'Tesseract latency per call', ('mode',))
+DRIVE_REQUESTS = REGISTRY.counter('aura_drive_requests_total', 'Drive API requests, by operation and outcome',
+                                  ('op', 'outcome'))
+DB_WRITE_SECONDS = REGISTRY.histogram('aura_db_write_seconds', 'SQLite write transaction latency', ('op',),
+                                      buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 2.0, 30.0))
+STAGE_OVERRUNS = REGISTRY.counter('aura_stage_overruns_total', 'Stages that ran past their time budget', ('stage',))
+SPECULATIVE = REGISTRY.counter('aura_speculative_total',
+                               'Straggler handling: copies launched / won / lost, files abandoned', ('event',))
+LEDGER_ROWS = REGISTRY.counter('aura_ledger_rows_total', 'Master Ledger write-back rows, by outcome', ('outcome',))
+
+
+# --- EXPOSITION ---
+
+class _Handler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # scrapes every few seconds would flood the audit log
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port: int = None, host: str = '127.0.0.1') -> Optional[ThreadingHTTPServer]:
+    """
+    Serves /metrics on localhost (AURA_METRICS_PORT, default 9464; 0 disables).
+    Idempotent: the GUI's runtime and a CLI session share the one server.
+    """
+    global _server
+    port = port if port is not None else int(os.getenv('AURA_METRICS_PORT', '9464'))
+    if not port: return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _Handler)
+            except OSError as e:
+                print(f"   [METRICS] Port {port} unavailable ({e}); metrics endpoint disabled.")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name='aura-metrics', daemon=True).start()
+            print(f"   [METRICS] Prometheus endpoint on http://{host}:{port}/metrics")
+        return _server
+
+
+class MetricsSnapshotter:
+    """Every `interval` seconds, writes all current samples to SQLite (SessionManager.save_metric_snapshot)."""
+
+    def __init__(self, recorder, interval: float = None, registry: MetricsRegistry = REGISTRY):
+        self.recorder = recorder
+        self.interval = interval if interval is not None else float(os.getenv('AURA_METRICS_SNAPSHOT_S', '60'))
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='aura-metrics-snapshot', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.take()
+
+    def take(self):
+        try:
+            self.recorder.save_metric_snapshot(self.registry.snapshot())
+        except Exception as e:
+            print(f"   [METRICS] Snapshot skipped: {e}")
+
+    def stop(self):
+        """Final snapshot, so a run's end state is always on disk."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+            self.take()
+
+
+if __name__ == "__main__":
+    print("--- METRICS DIAGNOSTICS ---")
+    n = 200_000
+    t = time.perf_counter()
+    for i in range(n):
+        FILES.inc('SUCCESS')
+    per_inc = (time.perf_counter() - t) / n
+    t = time.perf_counter()
+    for i in range(n):
+        OCR_SECONDS.observe(0.2, 'full')
+    per_obs = (time.perf_counter() - t) / n
+    print(f"   counter.inc {per_inc * 1e6:.2f} us, histogram.observe {per_obs * 1e6:.2f} us")
+    print(REGISTRY.render()[:600])
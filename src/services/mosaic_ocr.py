@@ -0,0 +1,305 @@
+import os
+import sys
+import time
+import threading
+import cv2
+import pytesseract
+import numpy as np
+from typing import Dict, Any, Optional, List
+
+# PATH FIX
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+if project_root not in sys.path: sys.path.append(project_root)
+
+from src.services.metrics import OCR_SECONDS, STAGE_OVERRUNS
+from src.services.resource_governor import STAGE_BUDGETS, is_ocr_timeout
+
+
+class _Tile:
+    __slots__ = ('raw', 'pixels', 'config', 'top', 'bottom', 'text', 'conf', 'solo', 'error', 'done')
+
+    def __init__(self, raw: np.ndarray, pixels: np.ndarray, config: str):
+        self.raw = raw          # as handed in (read alone or re-read as is)
+        self.pixels = pixels    # normalized for the mosaic
+        self.config = config
+        self.top = self.bottom = 0
+        self.text, self.conf, self.error = '', None, None
+        self.solo = False       # read on its own already: no re-read
+        self.done = threading.Event()
+
+
+class MosaicOCR:
+    """
+    The 'Typesetter' of AURA.
+    Every tesseract call pays a fixed cost (process start, model load) that
+    dwarfs the work on a small image. Worker threads hand their small reads
+    (layout field crops, downscaled pages) to one shared MosaicOCR; tiles with
+    the same config are stacked into one white canvas with blank gutters and read
+    with a single image_to_data call, and the words go back to their tile by box.
+
+    Tiles are stacked vertically, so a text line can never run across two
+    receipts. Only tiles with the very same config share a canvas (a date
+    crop never joins a page); a canvas of single-line crops (--psm 7) is read
+    as a block of lines (--psm 6). The first thread of a batch waits up to
+    LINGER_S for company, then reads for everyone. Accuracy guards:
+      - calibration: the first CALIBRATE_TILES tiles of each config are also
+        read on their own (that text is returned); the config is batched
+        from then on only if the mosaic agreed on AGREE_MIN of them, and
+        read solo for the rest of the process otherwise
+      - single-line crops are rescaled to LINE_PX high before stacking
+      - a tile that comes back empty or under CONF_FLOOR is re-read on its own
+      - the tile cap halves when too many tiles need that re-read, and grows
+        back while mosaics read cleanly
+      - a mosaic that overruns the OCR budget is killed and its tiles are read
+        on their own, so one pathological crop only costs its own thread
+    """
+
+    ENABLED = os.getenv('AURA_MOSAIC', '1') != '0'
+    SMALL_PAGE_PIXELS = 600_000     # pages up to this many px join a mosaic; larger ones go alone
+    LINGER_S = 0.03                 # how long a batch waits for more tiles
+    GUTTER = 24                     # px of white between tiles (and around the canvas)
+    LINE_PX = 48                    # single-line crops are normalized to this height
+    MAX_CANVAS_PIXELS = 12_000_000
+    MAX_CANVAS_H = 30_000           # tesseract's hard limit is 32767
+    MIN_TILES, MAX_TILES = 2, 48
+    CONF_FLOOR = 55.0               # mean word confidence below this -> solo re-read
+    SHRINK_AT, GROW_AT = 0.20, 0.05 # re-read share that halves / grows the tile cap
+    CALIBRATE_TILES = 16            # tiles per config compared with a solo read
+    AGREE_MIN = 0.95                # share of them the mosaic must match
+
+    def __init__(self, max_tiles: int = 24):
+        self.max_tiles = max_tiles
+        self._cond = threading.Condition()
+        self._open: Dict[str, List[_Tile]] = {}   # tile config -> tiles waiting
+        self.trusted: Dict[str, bool] = {}        # config -> calibration verdict (absent: calibrating)
+        self._checks: Dict[str, List[int]] = {}   # config -> [agreed, compared] while calibrating
+        self.stats = {'calls': 0, 'tiles': 0, 'rereads': 0, 'solo': 0}
+
+    @staticmethod
+    def mosaic_config(config: str) -> str:
+        """The canvas read: stacked single-line crops are one uniform block of lines."""
+        return config.replace('--psm 7', '--psm 6')
+
+    @staticmethod
+    def _same_text(a: str, b: str) -> bool:
+        return a.split() == b.split()
+
+    def _solo(self, pixels: np.ndarray, config: str, stage: str) -> str:
+        with OCR_SECONDS.time(stage):
+            return pytesseract.image_to_string(pixels, lang='eng', config=config, timeout=STAGE_BUDGETS['ocr'])
+
+    def _calibrate(self, config: str, agreed: bool):
+        with self._cond:
+            if config in self.trusted: return
+            check = self._checks.setdefault(config, [0, 0])
+            check[0] += agreed
+            check[1] += 1
+            if check[1] >= self.CALIBRATE_TILES:
+                self.trusted[config] = check[0] >= self.AGREE_MIN * check[1]
+                if not self.trusted[config]:
+                    print(f"   [MOSAIC] {config!r}: mosaic matched solo reads on {check[0]}/{check[1]} tiles; "
+                          f"reading it solo from now on.")
+
+    # --- Public ---
+
+    def read(self, pixels: np.ndarray, config: str = r'--oem 3 --psm 6') -> str:
+        """Drop-in for pytesseract.image_to_string(pixels, lang='eng', config=config) on small grayscale images."""
+        key = config
+        if self.trusted.get(key) is False:
+            with self._cond: self.stats['solo'] += 1
+            return self._solo(pixels, config, 'mosaic_untrusted')
+        tile = _Tile(pixels, self._normalize(pixels, config), config)
+        with self._cond:
+            batch = self._open.setdefault(key, [])
+            batch.append(tile)
+            leader = len(batch) == 1
+            if len(batch) >= self.max_tiles or self._canvas_full(batch):
+                self._cond.notify_all()
+        if leader:
+            self._lead(key)
+        tile.done.wait()
+        if tile.error is not None and (tile.solo or not is_ocr_timeout(tile.error)):
+            raise tile.error
+
+        if tile.error is not None or (not tile.solo and (not tile.text.strip() or
+                                                         (tile.conf is not None and tile.conf < self.CONF_FLOOR))):
+            with self._cond: self.stats['rereads'] += 1
+            return self._solo(tile.raw, config, 'mosaic_reread')
+        if not tile.solo and not self.trusted.get(key):
+            # Still calibrating (or distrusted while this tile was in flight): the solo read is the answer
+            solo = self._solo(tile.raw, config, 'mosaic_calibrate')
+            self._calibrate(key, self._same_text(tile.text, solo))
+            return solo
+        return tile.text
+
+    # --- Batching ---
+
+    def _canvas_full(self, batch: List[_Tile]) -> bool:
+        h = sum(t.pixels.shape[0] + self.GUTTER for t in batch) + self.GUTTER
+        w = max(t.pixels.shape[1] for t in batch) + 2 * self.GUTTER
+        return h >= self.MAX_CANVAS_H or h * w >= self.MAX_CANVAS_PIXELS
+
+    def _lead(self, key: str):
+        deadline = time.monotonic() + self.LINGER_S
+        with self._cond:
+            while True:
+                batch = self._open[key]
+                left = deadline - time.monotonic()
+                if left <= 0 or len(batch) >= self.max_tiles or self._canvas_full(batch): break
+                self._cond.wait(left)
+            # Whatever doesn't fit starts the next batch (its first tile leads it)
+            take = batch[:self.max_tiles]
+            while len(take) > 1 and self._canvas_full(take): take.pop()
+            rest = batch[len(take):]
+            if rest: self._open[key] = rest
+            else: del self._open[key]
+        if rest:
+            threading.Thread(target=self._lead, args=(key,), daemon=True).start()
+
+        try:
+            self._read_mosaic(take, key)
+        except Exception as e:
+            if is_ocr_timeout(e): STAGE_OVERRUNS.inc('ocr')
+            for t in take: t.error = e
+        finally:
+            for t in take: t.done.set()
+
+    # --- Mosaic ---
+
+    def _normalize(self, pixels: np.ndarray, config: str) -> np.ndarray:
+        """Single-line crops: scale to LINE_PX high (clamped) so every line in a mosaic has the same size."""
+        if '--psm 7' not in config: return pixels
+        h = pixels.shape[0]
+        scale = min(max(self.LINE_PX / float(max(h, 1)), 0.5), 3.0)
+        if abs(scale - 1.0) < 0.1: return pixels
+        interp = cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+        return cv2.resize(pixels, None, fx=scale, fy=scale, interpolation=interp)
+
+    def _compose(self, tiles: List[_Tile]) -> np.ndarray:
+        width = max(t.pixels.shape[1] for t in tiles) + 2 * self.GUTTER
+        height = sum(t.pixels.shape[0] + self.GUTTER for t in tiles) + self.GUTTER
+        canvas = np.full((height, width), 255, dtype=np.uint8)
+        y = self.GUTTER
+        for t in tiles:
+            h, w = t.pixels.shape[:2]
+            canvas[y:y + h, self.GUTTER:self.GUTTER + w] = t.pixels
+            t.top, t.bottom = y, y + h
+            y += h + self.GUTTER
+        return canvas
+
+    def _read_mosaic(self, tiles: List[_Tile], config: str):
+        if len(tiles) == 1:
+            # Nobody to share with: plain read, no box bookkeeping
+            t = tiles[0]
+            with OCR_SECONDS.time('mosaic_single'):
+                t.solo = True
+                t.text = pytesseract.image_to_string(t.raw, lang='eng', config=t.config, timeout=STAGE_BUDGETS['ocr'])
+            with self._cond:
+                self.stats['calls'] += 1
+                self.stats['tiles'] += 1
+            return
+
+        canvas = self._compose(tiles)
+        with OCR_SECONDS.time('mosaic'):
+            words = pytesseract.image_to_data(canvas, lang='eng', config=self.mosaic_config(config),
+                                              output_type=pytesseract.Output.DICT, timeout=STAGE_BUDGETS['ocr'])
+
+        # Split by box: a word belongs to the tile holding its vertical centre
+        lines: List[Dict[tuple, List[tuple]]] = [{} for _ in tiles]
+        confs: List[List[float]] = [[] for _ in tiles]
+        bottoms = [t.bottom for t in tiles]
+        for i, text in enumerate(words['text']):
+            if not text or not text.strip(): continue
+            cy = words['top'][i] + words['height'][i] / 2.0
+            k = int(np.searchsorted(bottoms, cy))
+            if k >= len(tiles) or cy < tiles[k].top: continue   # in a gutter: noise
+            line_key = (words['block_num'][i], words['par_num'][i], words['line_num'][i])
+            lines[k].setdefault(line_key, []).append((words['left'][i], text))
+            conf = float(words['conf'][i])
+            if conf >= 0: confs[k].append(conf)
+
+        for t, tile_lines, tile_confs in zip(tiles, lines, confs):
+            t.text = "\n".join(" ".join(w for _, w in sorted(ws)) for _, ws in sorted(tile_lines.items()))
+            t.conf = sum(tile_confs) / len(tile_confs) if tile_confs else None
+        self._adapt(tiles)
+
+    def _adapt(self, tiles: List[_Tile]):
+        weak = sum(1 for t in tiles if not t.text.strip() or (t.conf is not None and t.conf < self.CONF_FLOOR))
+        share = weak / len(tiles)
+        with self._cond:
+            self.stats['calls'] += 1
+            self.stats['tiles'] += len(tiles)
+            if share > self.SHRINK_AT:
+                self.max_tiles = max(self.MIN_TILES, self.max_tiles // 2)
+            elif share < self.GROW_AT:
+                self.max_tiles = min(self.MAX_TILES, self.max_tiles + 2)
+
+
+# One batcher for all worker threads: the more threads feed it, the fuller each mosaic
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_mosaic_ocr() -> Optional[MosaicOCR]:
+    """The shared MosaicOCR, or None when AURA_MOSAIC=0."""
+    global _shared
+    if not MosaicOCR.ENABLED: return None
+    with _shared_lock:
+        if _shared is None:
+            _shared = MosaicOCR()
+        return _shared
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+    print("--- MOSAIC OCR DIAGNOSTICS ---")
+
+    def render(lines: List[str], width: int = 0) -> np.ndarray:
+        w = max(width, max(14 * len(t) for t in lines) + 20)
+        img = np.full((40 * len(lines), w), 255, np.uint8)
+        for n, text in enumerate(lines):
+            cv2.putText(img, text, (10, 40 * n + 28), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2, cv2.LINE_AA)
+        return img
+
+    months = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+    amounts = [f"{(i * 7919) % 100000:05d}.{i % 100:02d}" for i in range(48)]
+    dates = [f"{i % 28 + 1:02d} {months[i % 12]} 2026" for i in range(48)]
+    pages = [[f"PAID TO STORE {i}", f"AMOUNT {amounts[i]}", f"DATE {dates[i]}"] for i in range(24)]
+    # (name, config, images, expected text) - the three configs the engine sends, mixed in one pool
+    sets = [("amount", r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789.,',
+             [render([v]) for v in amounts], amounts),
+            ("date", r'--oem 3 --psm 7', [render([v]) for v in dates], dates),
+            ("page", r'--oem 3 --psm 6', [render(p, 480) for p in pages], ["\n".join(p) for p in pages])]
+    jobs = [(name, k, cfg, img) for name, cfg, imgs, _ in sets for k, img in enumerate(imgs)]
+    jobs = jobs[0::3] + jobs[1::3] + jobs[2::3]
+
+    t = time.perf_counter()
+    solo = {(name, k): pytesseract.image_to_string(img, lang='eng', config=cfg).strip() for name, k, cfg, img in jobs}
+    solo_s = time.perf_counter() - t
+
+    mosaic = MosaicOCR()
+    read_mosaic = mosaic._read_mosaic
+    def checked_read(tiles: List[_Tile], config: str):
+        assert all(t.config == config for t in tiles), f"mixed configs in one canvas: {config!r}"
+        read_mosaic(tiles, config)
+    mosaic._read_mosaic = checked_read
+
+    passes = []
+    for label in ("calibration", "trusted"):
+        t = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            out = list(pool.map(lambda j: mosaic.read(j[3], j[2]).strip(), jobs))
+        passes.append((label, time.perf_counter() - t, {(j[0], j[1]): o for j, o in zip(jobs, out)}))
+
+    print(f"   Solo:   {len(jobs)} calls, {solo_s:.2f}s")
+    for label, secs, got in passes:
+        print(f"   Mosaic {label}: {secs:.2f}s")
+        for name, cfg, _, expected in sets:
+            keys = [(name, k) for k in range(len(expected))]
+            exact = sum(got[key] == expected[key[1]] for key in keys)
+            agree = sum(MosaicOCR._same_text(got[key], solo[key]) for key in keys)
+            solo_exact = sum(solo[key] == expected[key[1]] for key in keys)
+            print(f"     {name:<6} {exact}/{len(keys)} exact (solo {solo_exact}), agrees with solo on {agree}, "
+                  f"trusted={mosaic.trusted.get(cfg)}")
+    print(f"   {mosaic.stats['calls']} tesseract calls for mosaics, {mosaic.stats['rereads']} re-reads, "
+          f"{mosaic.stats['solo']} untrusted solo reads; no canvas mixed configs")
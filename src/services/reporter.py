@@ -1,6 +1,8 @@
 import sys, subprocess, os
 
 class ReportGenerator:
+    PENDING_LISTED = 15   # pending file names shown before "... and N more"
+
     def __init__(self):
         self.os_type = sys.platform
 
@@ -22,12 +24,15 @@ class ReportGenerator:
             print(f"   [WARN] Clipboard access failed: {e}")
             return False
 
-    def generate_whatsapp_report(self, intern_name: str, stats: dict, flagged_items: list) -> str:
+    def generate_whatsapp_report(self, intern_name: str, stats: dict, flagged_items: list,
+                                 pending_items: list = None, estimate: dict = None) -> str:
         """
         Generates a high-contrast, professional summary for Slack/WhatsApp.
         """
         total_files = stats['count']
-        success_rate = (stats['SUCCESS'] / total_files * 100) if total_files > 0 else 0
+        # Non-receipts (selfies, event photos) don't count against accuracy
+        receipts = total_files - stats.get('SKIPPED', 0)
+        success_rate = (stats['SUCCESS'] / receipts * 100) if receipts > 0 else 0
         
         # Header
         report = []
@@ -48,6 +53,8 @@ class ReportGenerator:
         report.append(f"⚠️ Manual Review: {stats['MANUAL_REVIEW']}")
         report.append(f"❌ Duplicates: {stats['DUPLICATE']}")
         report.append(f"🚫 Failed: {stats['FAILED']}")
+        if stats.get('SKIPPED'):
+            report.append(f"⏭️ Skipped (not a receipt): {stats['SKIPPED']}")
 
         # Flagged Item Details (Critical for feedback)
         if flagged_items:
@@ -57,6 +64,34 @@ class ReportGenerator:
                 reason = "DUPLICATE" if item['status'] == 'DUPLICATE' else "REVIEW"
                 clean_name = item['file_name'][:20] + "..." if len(item['file_name']) > 20 else item['file_name']
                 report.append(f"• {clean_name} -> *{reason}* (₹{item['amount']})")
+                if item.get('reason'):
+                    report.append(f"   ↳ _{item['reason']}_")
+
+        # Deadline / stop: what was NOT looked at yet (resume picks these up)
+        if pending_items:
+            report.append(f"")
+            report.append(f"*⏳ PENDING (not processed yet): {len(pending_items)}*")
+            for item in pending_items[:self.PENDING_LISTED]:
+                clean_name = item['name'][:20] + "..." if len(item['name']) > 20 else item['name']
+                report.append(f"• {clean_name}")
+            if len(pending_items) > self.PENDING_LISTED:
+                report.append(f"• ... and {len(pending_items) - self.PENDING_LISTED} more")
+
+        # Sample audit: extrapolation to the whole folder with confidence intervals
+        if estimate and estimate.get('n'):
+            rates = estimate['rates']
+            total = estimate['verified_total']
+            report.append(f"")
+            report.append(f"*📊 SAMPLE ESTIMATE ({estimate['n']} of {estimate['population']} files, "
+                          f"{estimate['confidence']:.0%} CI):*")
+            report.append(f"💰 Verified total: ₹{total['value']:,.0f} ± ₹{total['margin']:,.0f}")
+            for status, label in (('SUCCESS', '✅ Verified'), ('DUPLICATE', '❌ Duplicates'),
+                                  ('MANUAL_REVIEW', '⚠️ Manual Review'), ('FAILED', '🚫 Failed'),
+                                  ('SKIPPED', '⏭️ Not a receipt')):
+                r = rates[status]
+                report.append(f"{label}: {r['rate']:.1%} ± {r['margin']:.1%} "
+                              f"(~{r['rate'] * estimate['population']:,.0f} files)")
+            report.append(f"_Estimates only: the other {estimate['population'] - estimate['n']} files were not audited._")
 
         report.append(f"--------------------------------")
         report.append(f"_Generated by Project AURA on Apple Silicon_")
@@ -0,0 +1,337 @@
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Callable
+
+# PATH FIX
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+if project_root not in sys.path: sys.path.append(project_root)
+
+
+def detect_cores() -> int:
+    """Cores this process may actually run on (respects taskset / container cpusets)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+# Per-stage time budgets (seconds). Overruns are killed where the stage allows it:
+# tesseract runs as a subprocess (pytesseract `timeout=`), downloads are abandoned
+# between chunks; a cv2 decode can't be interrupted, so oversized images decode
+# reduced and an image whose decode still overran goes to review without OCR.
+STAGE_BUDGETS = {
+    'download': float(os.getenv('AURA_DOWNLOAD_BUDGET_S', '60')),
+    'decode': float(os.getenv('AURA_DECODE_BUDGET_S', '10')),
+    'ocr': float(os.getenv('AURA_OCR_BUDGET_S', '45')),      # per tesseract call
+}
+
+
+def is_ocr_timeout(exc: BaseException) -> bool:
+    """pytesseract kills tesseract after `timeout=` seconds and raises RuntimeError('Tesseract process timeout')."""
+    return isinstance(exc, RuntimeError) and 'timeout' in str(exc).lower()
+
+
+def detect_memory_mb() -> Optional[int]:
+    """Physical memory in MB, or None when the platform won't say."""
+    try:
+        return int(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / (1024 * 1024))
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class ResourceGovernor:
+    """
+    The 'Thermostat' of AURA.
+    Every audit worker runs cv2 (own thread pool) and tesseract (OpenMP threads)
+    so a fixed pool oversubscribes big machines' caches and starves small ones.
+    The governor:
+      1. limits cv2 and tesseract to one thread per worker, so parallelism comes
+         from the pool alone,
+      2. sizes the pool as cores x (1 + io/cpu) from measured stage times,
+         capped by physical memory,
+      3. hill-climbs around that target on observed files/sec.
+    Threads are not pinned to cores: the pool may outnumber the cores (I/O
+    waits), and the OS scheduler balances one-thread engines well on its own.
+    Workers call `slot()` around each file; the pool itself is sized to the cap.
+    """
+
+    MEM_PER_WORKER_MB = 350     # decoded image + 2x upscale + tesseract process
+    MAX_WORKERS = int(os.getenv('AURA_MAX_WORKERS', '32'))
+    TUNE_EVERY = 20             # completed files between retunes
+    SMOOTHING = 0.2             # EWMA weight of the newest stage timing
+    DEFAULT_IO_RATIO = 1.0      # assume download ~ OCR time until measured
+
+    def __init__(self, cores: int = None, memory_mb: int = None, fixed_workers: int = None,
+                 log: Callable[[str], None] = print):
+        # Sizing and retune decisions go to the session's log (the GUI terminal for the app)
+        self.log = log
+        self.cores = cores or detect_cores()
+        self.memory_mb = memory_mb if memory_mb is not None else detect_memory_mb()
+        fixed = fixed_workers or int(os.getenv('AURA_WORKERS', '0'))
+        self.fixed = fixed > 0
+
+        self.io_s: Optional[float] = None
+        self.cpu_s: Optional[float] = None
+        self.max_workers = fixed if self.fixed else self.memory_cap()
+        self.limit = fixed if self.fixed else self.target_workers()
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._completed = 0
+        self._window_start = time.monotonic()
+        self._last_rate: Optional[float] = None
+        self._direction = 1
+
+
+    # --- Library Threading ---
+
+    def configure_libraries(self):
+        """
+        One thread per engine per worker. OMP_THREAD_LIMIT is read by every
+        tesseract process pytesseract spawns, so setting it here covers them all.
+        """
+        os.environ['OMP_THREAD_LIMIT'] = '1'
+        try:
+            import cv2
+            cv2.setNumThreads(1)
+        except ImportError:
+            pass
+        self.log(f"   [GOVERNOR] {self.cores} cores, "
+                 f"{self.memory_mb or '?'} MB RAM -> {self.limit} workers "
+                 f"({'fixed' if self.fixed else f'auto, cap {self.max_workers}'}).")
+
+    # --- Sizing ---
+
+    def memory_cap(self) -> int:
+        cap = self.MAX_WORKERS
+        if self.memory_mb:
+            # leave a quarter of RAM for the OS, the GUI and the ledger index
+            cap = min(cap, int(self.memory_mb * 0.75 / self.MEM_PER_WORKER_MB))
+        return max(1, cap)
+
+    def target_workers(self) -> int:
+        """Little's-law style estimate: keep every core busy while others wait on I/O."""
+        ratio = self.DEFAULT_IO_RATIO
+        if self.io_s is not None and self.cpu_s:
+            ratio = self.io_s / self.cpu_s
+        return max(1, min(self.max_workers, int(round(self.cores * (1 + ratio)))))
+
+    # --- Admission ---
+
+    @contextmanager
+    def slot(self):
+        """
+        Blocks until fewer than `limit` workers hold a slot. Yields a release
+        function: calling it early hands the slot back (an abandoned straggler
+        keeps its thread but no longer counts against the limit); the exit of
+        the block then releases nothing.
+        """
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+        held = [True]
+
+        def release():
+            with self._cond:
+                if held[0]:
+                    held[0] = False
+                    self._active -= 1
+                    self._cond.notify()
+        try:
+            yield release
+        finally:
+            release()
+
+    def record(self, timings: Optional[Dict[str, float]]):
+        """
+        Feeds one file's stage times ({'io': s, 'cpu': s}) into the model. 'io' is
+        time the worker thread itself blocked on the network: with the async
+        DriveIOEngine that is only the occasional original fetch, so the model
+        rightly settles near one worker per core.
+        """
+        with self._cond:
+            if timings:
+                a = self.SMOOTHING
+                io, cpu = timings.get('io', 0.0), timings.get('cpu', 0.0)
+                self.io_s = io if self.io_s is None else (1 - a) * self.io_s + a * io
+                self.cpu_s = cpu if self.cpu_s is None else (1 - a) * self.cpu_s + a * cpu
+            self._completed += 1
+            if not self.fixed and self._completed % self.TUNE_EVERY == 0:
+                self._retune()
+
+    def _retune(self):
+        """Hill-climb on files/sec, but never stray far from the I/O-vs-CPU model."""
+        now = time.monotonic()
+        rate = self.TUNE_EVERY / max(now - self._window_start, 1e-6)
+        self._window_start = now
+
+        if self._last_rate is not None and rate < self._last_rate * 0.95:
+            self._direction = -self._direction
+        self._last_rate = rate
+
+        target = self.target_workers()
+        low, high = max(1, target // 2), min(self.max_workers, target * 2)
+        new_limit = min(high, max(low, self.limit + self._direction))
+        if new_limit != self.limit:
+            self.log(f"   [GOVERNOR] {rate:.2f} files/s, io/cpu {self.io_s or 0:.2f}s/{self.cpu_s or 0:.2f}s: "
+                     f"workers {self.limit} -> {new_limit}")
+            self.limit = new_limit
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'cores': self.cores, 'memory_mb': self.memory_mb, 'limit': self.limit,
+                'max_workers': self.max_workers, 'active': self._active,
+                'io_s': self.io_s, 'cpu_s': self.cpu_s, 'files_per_s': self._last_rate,
+            }
+
+
+class MemoryBudget:
+    """
+    Process-wide cap on decoded pixels in flight.
+    A worker reserves before it downloads and charges the decoded working set
+    once it knows the image size; when the budget is spent, new downloads wait
+    (backpressure) instead of decoding yet another 12 MP photo into RAM.
+    A lone reservation is always admitted, so one oversized image can't deadlock.
+
+    Compressed payloads buffered by the async DriveIOEngine have their own cap
+    (hold_limit_bytes) through try_hold() / drop(). They never count against the
+    decoders' admission, so downloads running ahead of OCR can't starve the
+    pool; one hold is always admitted. Whoever waits for hold room registers a
+    listener, called (from any thread) whenever held bytes go down.
+    """
+
+    def __init__(self, limit_bytes: int, hold_limit_bytes: int = None):
+        self.limit_bytes = limit_bytes
+        self.hold_limit_bytes = hold_limit_bytes or limit_bytes // 4
+        self.used_bytes = 0     # decoded working sets (reserve / charge)
+        self.holders = 0
+        self.held_bytes = 0     # buffered payloads (try_hold / drop)
+        self.held = 0
+        self.waits = 0
+        self._cond = threading.Condition()
+        self._listeners: List[Callable[[], None]] = []
+
+    @contextmanager
+    def reserve(self):
+        with self._cond:
+            if self.holders and self.used_bytes >= self.limit_bytes:
+                self.waits += 1
+                while self.holders and self.used_bytes >= self.limit_bytes:
+                    self._cond.wait()
+            self.holders += 1
+        ticket = _BudgetTicket(self)
+        try:
+            yield ticket
+        finally:
+            with self._cond:
+                self.used_bytes -= ticket.charged
+                self.holders -= 1
+                self._cond.notify_all()
+
+    def _charge(self, nbytes: int):
+        with self._cond:
+            self.used_bytes += nbytes
+
+    # --- Buffered payloads ---
+
+    def try_hold(self, nbytes: int) -> bool:
+        """Non-blocking admission for the event loop: True when `nbytes` of payload may be buffered."""
+        with self._cond:
+            if self.held and self.held_bytes + nbytes > self.hold_limit_bytes:
+                return False
+            self.held += 1
+            self.held_bytes += nbytes
+            return True
+
+    def resize_hold(self, delta: int):
+        """The estimate a hold was taken with, corrected to the real payload size."""
+        with self._cond:
+            self.held_bytes += delta
+        if delta < 0: self._room()
+
+    def drop(self, nbytes: int):
+        with self._cond:
+            self.held -= 1
+            self.held_bytes -= nbytes
+        self._room()
+
+    def add_listener(self, callback: Callable[[], None]):
+        with self._cond:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]):
+        with self._cond:
+            if callback in self._listeners: self._listeners.remove(callback)
+
+    def _room(self):
+        with self._cond:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback()
+
+
+class _BudgetTicket:
+    __slots__ = ('budget', 'charged')
+
+    def __init__(self, budget: MemoryBudget):
+        self.budget = budget
+        self.charged = 0
+
+    def charge(self, nbytes: int):
+        self.charged += nbytes
+        self.budget._charge(nbytes)
+
+
+_budget: Optional[MemoryBudget] = None
+_budget_lock = threading.Lock()
+
+def get_memory_budget() -> MemoryBudget:
+    """
+    Shared budget: AURA_PIXEL_BUDGET_MB, else a quarter of physical RAM
+    (at most 2 GB, 512 MB when RAM is unknown). Buffered payloads get
+    AURA_PAYLOAD_BUDGET_MB, else a quarter of the pixel budget.
+    """
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            mb = int(os.getenv('AURA_PIXEL_BUDGET_MB', '0'))
+            if mb <= 0:
+                ram = detect_memory_mb()
+                mb = min(2048, ram // 4) if ram else 512
+            hold_mb = int(os.getenv('AURA_PAYLOAD_BUDGET_MB', '0'))
+            _budget = MemoryBudget(mb * 1024 * 1024, hold_mb * 1024 * 1024 if hold_mb > 0 else None)
+        return _budget
+
+if __name__ == "__main__":
+    print("--- RESOURCE GOVERNOR DIAGNOSTICS ---")
+    gov = ResourceGovernor()
+    gov.configure_libraries()
+    print(f"   Initial target: {gov.target_workers()} workers (memory cap {gov.memory_cap()})")
+    # Download-heavy workload: the model should ask for more workers than cores
+    for _ in range(gov.TUNE_EVERY * 3):
+        gov.record({'io': 0.9, 'cpu': 0.3})
+    print(f"   After I/O-bound samples: {gov.snapshot()}")
+
+    # Payload holds must not starve decoders: fill the hold cap, then 8 workers decode at once
+    budget = MemoryBudget(64 * 1024 * 1024)
+    while budget.try_hold(1024 * 1024): pass
+    peak, live, lock = [0], [0], threading.Lock()
+    def decode():
+        with budget.reserve() as ticket:
+            ticket.charge(4 * 1024 * 1024)
+            with lock:
+                live[0] += 1
+                peak[0] = max(peak[0], live[0])
+            time.sleep(0.05)
+            with lock: live[0] -= 1
+    workers = [threading.Thread(target=decode) for _ in range(8)]
+    for w in workers: w.start()
+    for w in workers: w.join()
+    print(f"[{'OK' if peak[0] == 8 else 'FAIL'}] {budget.held_bytes // 2**20} MB of payload holds, "
+          f"peak {peak[0]} concurrent decoders (of 8)")
@@ -0,0 +1,176 @@
+import os
+import sys
+import math
+import random
+from statistics import NormalDist
+from typing import Dict, Any, Optional, List, Tuple
+
+# PATH FIX
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+if project_root not in sys.path: sys.path.append(project_root)
+
+
+class StratifiedSampler:
+    """
+    The 'Pollster' of AURA.
+    Health-checks a huge folder from a random sample instead of OCRing every file.
+
+    Files are stratified by (sub-folder, file type, size band) and drawn in
+    batches with proportional allocation, each stratum in a seeded random order.
+    After each batch the stratified estimators give the status rates and the
+    verified total with normal-approximation confidence intervals. Sampling
+    continues until every tracked margin is within target (or the folder runs out),
+    and each batch is sized from how far the current margins are from target.
+    """
+
+    FIRST_BATCH = 200
+    MIN_BATCH = 50
+    SIZE_BANDS = (250_000, 1_000_000, 4_000_000)   # bytes: screenshots / photos / large photos / scans
+    RATE_KEYS = ('SUCCESS', 'DUPLICATE', 'MANUAL_REVIEW', 'FAILED', 'SKIPPED')
+    # Precision targets: absolute margin on the duplicate / error rates, relative margin on the total
+    TRACKED_RATES = ('DUPLICATE', 'FAILED')
+
+    def __init__(self, files: List[Dict[str, Any]], margin: float = 0.03, amount_margin: float = 0.10,
+                 confidence: float = 0.95, seed: Optional[int] = None):
+        self.margin = margin
+        self.amount_margin = amount_margin
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        rng = random.Random(seed)
+
+        self.strata: Dict[Tuple, List[Dict[str, Any]]] = {}
+        for f in files:
+            self.strata.setdefault(self.stratum_of(f), []).append(f)
+        for members in self.strata.values():
+            rng.shuffle(members)
+        self.population = len(files)
+        self._drawn = {key: 0 for key in self.strata}
+        self._stratum_by_id = {f['id']: key for key, members in self.strata.items() for f in members}
+        # per stratum: observed (status, amount) of every sampled file that produced a result
+        self._observed: Dict[Tuple, List[Tuple[str, float]]] = {key: [] for key in self.strata}
+
+    @classmethod
+    def stratum_of(cls, f: Dict[str, Any]) -> Tuple:
+        parent = (f.get('parents') or ['?'])[0]
+        kind = 'pdf' if 'pdf' in (f.get('mimeType') or '') else 'image'
+        size = int(f['size']) if f.get('size') else None
+        band = 'unknown' if size is None else sum(size >= edge for edge in cls.SIZE_BANDS)
+        return parent, kind, band
+
+    # --- Drawing ---
+
+    @property
+    def drawn(self) -> int:
+        return sum(self._drawn.values())
+
+    def exhausted(self) -> bool:
+        return self.drawn >= self.population
+
+    def next_batch(self, size: int) -> List[Dict[str, Any]]:
+        """
+        Grows the sample to drawn + size files, keeping every stratum at its
+        proportional share (largest-remainder rounding).
+        """
+        total = min(self.population, self.drawn + size)
+        shares = {k: total * len(m) / self.population for k, m in self.strata.items()}
+        target = {k: min(len(self.strata[k]), int(s)) for k, s in shares.items()}
+        spare = total - sum(target.values())
+        for k in sorted(shares, key=lambda k: shares[k] - int(shares[k]), reverse=True):
+            if spare <= 0: break
+            if target[k] < len(self.strata[k]):
+                target[k] += 1
+                spare -= 1
+        batch = []
+        for k, members in self.strata.items():
+            want = max(target[k], self._drawn[k])
+            batch.extend(members[self._drawn[k]:want])
+            self._drawn[k] = want
+        return batch
+
+    def suggest_batch(self, estimate: Optional[Dict[str, Any]]) -> int:
+        """First FIRST_BATCH files; then margins shrink ~1/sqrt(n), so aim for the n that meets target."""
+        if estimate is None or not estimate['n']:
+            return self.FIRST_BATCH
+        worst = max(self._worst_ratio(estimate), 1.0)
+        needed = int(math.ceil(estimate['n'] * worst * worst)) - estimate['n']
+        return max(self.MIN_BATCH, min(needed, self.drawn))   # at most double per round
+
+    # --- Estimation ---
+
+    def record(self, file_id: str, status: str, amount: float):
+        key = self._stratum_by_id.get(file_id)
+        if key is not None:
+            self._observed[key].append((status or 'FAILED', float(amount or 0.0) if status == 'SUCCESS' else 0.0))
+
+    def _stratified(self, values: Dict[Tuple, List[float]]) -> Tuple[float, float]:
+        """Stratified estimate of the population TOTAL of y and its variance (with fpc)."""
+        pooled = [y for ys in values.values() for y in ys]
+        if not pooled: return 0.0, 0.0
+        pooled_mean = sum(pooled) / len(pooled)
+        pooled_var = sum((y - pooled_mean) ** 2 for y in pooled) / max(1, len(pooled) - 1)
+        total, variance = 0.0, 0.0
+        for key, ys in values.items():
+            big_n, n = len(self.strata[key]), len(ys)
+            if n == 0:
+                # not sampled yet: borrow the pooled mean, carry the pooled variance as if n = 1
+                total += big_n * pooled_mean
+                variance += big_n * big_n * pooled_var
+                continue
+            mean = sum(ys) / n
+            s2 = sum((y - mean) ** 2 for y in ys) / (n - 1) if n > 1 else pooled_var
+            total += big_n * mean
+            variance += big_n * big_n * (1 - n / big_n) * s2 / n
+        return total, variance
+
+    def estimate(self) -> Dict[str, Any]:
+        n = sum(len(obs) for obs in self._observed.values())
+        est = {'n': n, 'drawn': self.drawn, 'population': self.population,
+               'confidence': self.confidence, 'strata': len(self.strata), 'rates': {}}
+        if not n: return est
+        for status in self.RATE_KEYS:
+            # +0.5 / +1 smoothing so an all-zero early sample can't claim a zero-width interval
+            values = {k: [1.0 if s == status else 0.0 for s, _ in obs] for k, obs in self._observed.items()}
+            total, var = self._stratified(values)
+            p = total / self.population
+            smoothed = (p * n + 0.5) / (n + 1)
+            se = max(math.sqrt(var) / self.population,
+                     math.sqrt(smoothed * (1 - smoothed) / n * (1 - n / self.population)))
+            est['rates'][status] = {'rate': p, 'margin': self.z * se}
+        amounts = {k: [a for _, a in obs] for k, obs in self._observed.items()}
+        total, var = self._stratified(amounts)
+        est['verified_total'] = {'value': total, 'margin': self.z * math.sqrt(var)}
+        est['verified_count'] = est['rates']['SUCCESS']['rate'] * self.population
+        return est
+
+    def _worst_ratio(self, est: Dict[str, Any]) -> float:
+        """How far the loosest tracked margin is from its target (<= 1 means precise enough)."""
+        ratios = [est['rates'][k]['margin'] / self.margin for k in self.TRACKED_RATES]
+        amount = est['verified_total']
+        if amount['value'] > 0:
+            ratios.append(amount['margin'] / amount['value'] / self.amount_margin)
+        return max(ratios)
+
+    def precise_enough(self, est: Dict[str, Any]) -> bool:
+        return bool(est['n']) and self._worst_ratio(est) <= 1.0
+
+
+if __name__ == "__main__":
+    print("--- STRATIFIED SAMPLER DIAGNOSTICS (synthetic 10k folder) ---")
+    gen = random.Random(7)
+    folder = [{'id': f'f{i}', 'parents': [f'day{i % 12}'], 'mimeType': 'image/jpeg',
+               'size': str(gen.choice([120_000, 600_000, 3_000_000]))} for i in range(10_000)]
+    truth = {f['id']: ('DUPLICATE' if gen.random() < 0.06 else 'FAILED' if gen.random() < 0.1 else 'SUCCESS')
+             for f in folder}
+    sampler = StratifiedSampler(folder, seed=1)
+    est = None
+    while not sampler.exhausted():
+        for f in sampler.next_batch(sampler.suggest_batch(est)):
+            sampler.record(f['id'], truth[f['id']], 500.0)
+        est = sampler.estimate()
+        dup = est['rates']['DUPLICATE']
+        print(f"   n={est['n']:>5}: duplicates {dup['rate']:.3f} ± {dup['margin']:.3f}, "
+              f"verified ₹{est['verified_total']['value']:,.0f} ± {est['verified_total']['margin']:,.0f}")
+        if sampler.precise_enough(est): break
+    real_dup = sum(s == 'DUPLICATE' for s in truth.values()) / len(truth)
+    print(f"   True duplicate rate: {real_dup:.3f}")
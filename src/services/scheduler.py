@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+import datetime
+from typing import Dict, Any, Optional, List
+
+# PATH FIX
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+if project_root not in sys.path: sys.path.append(project_root)
+
+
+class AuditScheduler:
+    """
+    The 'Dispatcher' of AURA.
+    Decides which files of an audit go first and when to stop starting new ones.
+
+    Policies (combine with commas, earlier ones dominate, e.g. "risk,newest"):
+      listing   Drive listing order (the old behaviour)
+      newest    most recently modified receipts first
+      smallest  smallest download first: most files resolved per second
+      risk      files inside high-risk folders first (AURA_RISK_FOLDERS / risk_folders)
+
+    The pool is FIFO, so ordering the submissions is all the prioritising needed.
+    With a deadline, no new file starts once the expected time of one more file
+    would overrun it; the files still waiting are reported as PENDING and stay
+    pending in the run checkpoint for a later resume.
+    """
+
+    POLICIES = ('listing', 'newest', 'smallest', 'risk')
+
+    def __init__(self, policy: str = None, deadline: Optional[float] = None,
+                 risk_folders: List[str] = None):
+        policy = policy if policy is not None else os.getenv('AURA_SCHEDULE', 'listing')
+        self.policies = [p.strip() for p in policy.split(',') if p.strip()] or ['listing']
+        unknown = [p for p in self.policies if p not in self.POLICIES]
+        if unknown:
+            raise ValueError(f"Unknown scheduling policy {unknown}. Expected any of {self.POLICIES}")
+
+        if risk_folders is None:
+            risk_folders = [f.strip() for f in os.getenv('AURA_RISK_FOLDERS', '').split(',') if f.strip()]
+        self.risk_folders = set(risk_folders)
+
+        # deadline: seconds from now; AURA_DEADLINE_MIN as the environment default
+        if deadline is None and os.getenv('AURA_DEADLINE_MIN'):
+            deadline = float(os.getenv('AURA_DEADLINE_MIN')) * 60
+        self.deadline_s = deadline
+        self._deadline_at: Optional[float] = None
+
+    @staticmethod
+    def parse_deadline(value: str) -> float:
+        """'45' -> 45 minutes, '14:30' -> seconds until 14:30 today (local time)."""
+        if ':' in value:
+            now = datetime.datetime.now()
+            hour, minute = (int(x) for x in value.split(':', 1))
+            at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            return max(0.0, (at - now).total_seconds())
+        return float(value) * 60
+
+    # --- Ordering ---
+
+    def _sort_by(self, files: List[Dict[str, Any]], policy: str):
+        if policy == 'newest':
+            # ISO 8601 strings sort chronologically; unknown dates ('') end up last
+            files.sort(key=lambda f: f.get('modifiedTime') or '', reverse=True)
+        elif policy == 'smallest':
+            files.sort(key=lambda f: int(f['size']) if f.get('size') else float('inf'))
+        elif policy == 'risk':
+            files.sort(key=lambda f: 0 if self.risk_folders.intersection(f.get('parents') or ()) else 1)
+
+    def order(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Chained stable sorts, least significant policy first, so the first
+        policy dominates and ties keep listing order.
+        """
+        ordered = list(files)
+        for policy in reversed(self.policies):
+            self._sort_by(ordered, policy)
+        if self.policies != ['listing']:
+            print(f"   [SCHEDULER] {len(files)} files ordered by {', '.join(self.policies)}.")
+        return ordered
+
+    # --- Deadline ---
+
+    def start_clock(self):
+        if self.deadline_s is not None:
+            self._deadline_at = time.monotonic() + self.deadline_s
+            finish = datetime.datetime.now() + datetime.timedelta(seconds=self.deadline_s)
+            print(f"   [SCHEDULER] Deadline {finish:%H:%M:%S}: unstarted files after that are reported PENDING.")
+
+    def expired(self, expected_file_s: float = 0.0) -> bool:
+        """True once starting one more file (taking ~expected_file_s) would overrun the deadline."""
+        return self._deadline_at is not None and time.monotonic() + expected_file_s >= self._deadline_at
+
+
+if __name__ == "__main__":
+    print("--- AUDIT SCHEDULER DIAGNOSTICS ---")
+    sample = [
+        {'id': 'a', 'name': 'old_big.jpg', 'size': '4000000', 'modifiedTime': '2026-01-02T10:00:00.000Z', 'parents': ['p1']},
+        {'id': 'b', 'name': 'new_small.jpg', 'size': '90000', 'modifiedTime': '2026-03-01T09:00:00.000Z', 'parents': ['p2']},
+        {'id': 'c', 'name': 'risky.jpg', 'size': '800000', 'modifiedTime': '2026-02-11T18:30:00.000Z', 'parents': ['risk']},
+    ]
+    for policy in ('listing', 'newest', 'smallest', 'risk,newest'):
+        names = [f['name'] for f in AuditScheduler(policy, risk_folders=['risk']).order(sample)]
+        print(f"   {policy:<12} -> {names}")
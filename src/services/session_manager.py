@@ -1,6 +1,16 @@
 import sqlite3
 import datetime
+import time
 import os
+import re
+import uuid
+import hashlib
+import zlib
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from urllib.request import pathname2url
+
+from src.services.utr_index import normalize_utr
+from src.services.metrics import DB_WRITE_SECONDS
 
 class SessionManager:
     """
@@ -8,69 +18,1109 @@ class SessionManager:
     Manages a local SQLite database to persist audit results immediately.
     Follows 'Zero-Server' policy: Data stays on the M4 Silicon.
     """
-    
+
+    # Statuses that count towards the 'failures' column of the rollups
+    FAILURE_STATUSES = ('FAILED', 'PARTIAL_FAIL')
+    # Statuses that land in the manual-review queue (review_items)
+    REVIEW_STATUSES = ('MANUAL_REVIEW', 'PARTIAL_FAIL', 'DUPLICATE')
+
+    # Column layout shared by every monthly partition (and its archive file)
+    LOG_COLUMNS = '''
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        intern_name TEXT,
+        folder_id TEXT,
+        file_name TEXT,
+        utr TEXT,
+        amount REAL,
+        status TEXT,
+        fidelity TEXT,
+        bytes_fetched INTEGER,
+        file_id TEXT,
+        extract_status TEXT,
+        ocr_text BLOB
+    '''
+    LOG_FIELDS = ('id, timestamp, intern_name, folder_id, file_name, utr, amount, status, '
+                  'fidelity, bytes_fetched, file_id, extract_status, ocr_text')
+    _PARTITION_NAME = re.compile(r'^audit_logs_\d{4}_\d{2}$')
+
     def __init__(self, db_name="aura_logs.db"):
         # db is created in the project root
         self.db_path = os.path.join(os.getcwd(), db_name)
+        # Snapshot of the Master Ledger for offline re-scoring (written on every ledger sync)
+        self.ledger_index_path = os.path.join(os.path.dirname(self.db_path), 'aura_ledger.idx')
+        self._live_months = set()   # partitions this instance has already ensured
         self._init_db()
 
+    def _connect(self) -> sqlite3.Connection:
+        # Generous timeout: 5 audit threads share one file.
+        # uri=True lets archives be ATTACHed read-only (file:...?mode=ro)
+        return sqlite3.connect(self.db_path, timeout=30, uri=True)
+
     def _init_db(self):
         """Creates the table schema if it doesn't exist."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
-        
-        # Schema: Optimized for reporting
+
+        # Audit logs live in monthly partitions (audit_logs_YYYY_MM), listed here.
+        # archive_path is set once a month has been moved to its own read-only file.
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS audit_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
+            CREATE TABLE IF NOT EXISTS log_partitions (
+                month TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                archive_path TEXT,
+                row_count INTEGER,
+                archived_at TEXT
+            )
+        ''')
+        legacy = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'audit_logs'").fetchone()
+        if legacy and legacy[0] == 'table':
+            self._split_legacy_logs(cursor)
+
+        # Materialized Rollups: one row per intern/day/status.
+        # Maintained incrementally by log_transaction so the Dashboard never scans audit_logs.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS audit_rollups (
+                intern_name TEXT NOT NULL,
+                day TEXT NOT NULL,
+                status TEXT NOT NULL,
+                file_count INTEGER NOT NULL DEFAULT 0,
+                total_amount REAL NOT NULL DEFAULT 0,
+                duplicates INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (intern_name, day, status)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_rollups_day ON audit_rollups (day)')
+
+        # Checkpoints: one row per audit run + per-file state (pending / in_flight / done)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS audit_runs (
+                run_id TEXT PRIMARY KEY,
+                folder_id TEXT NOT NULL,
                 intern_name TEXT,
+                started_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'RUNNING'
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_runs_folder ON audit_runs (folder_id, state)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS run_files (
+                run_id TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                file_name TEXT,
+                mime_type TEXT,
+                state TEXT NOT NULL DEFAULT 'pending',
+                status TEXT,
+                utr TEXT,
+                amount REAL,
+                updated_at TEXT,
+                size INTEGER,
+                modified_time TEXT,
+                parent_id TEXT,
+                thumbnail_link TEXT,
+                PRIMARY KEY (run_id, file_id)
+            )
+        ''')
+        # Older databases: listing metadata the scheduler / progressive fetch need on resume
+        run_columns = {row[1] for row in cursor.execute('PRAGMA table_info(run_files)')}
+        for column, decl in (('size', 'INTEGER'), ('modified_time', 'TEXT'), ('parent_id', 'TEXT'),
+                             ('thumbnail_link', 'TEXT')):
+            if column not in run_columns:
+                cursor.execute(f'ALTER TABLE run_files ADD COLUMN {column} {decl}')
+
+        # UTR Registry: local uniqueness index across every run, sheet write-back or not
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS utr_registry (
+                utr TEXT PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                file_name TEXT,
                 folder_id TEXT,
+                first_seen TEXT NOT NULL
+            ) WITHOUT ROWID
+        ''')
+
+        # Ledger Outbox: verified rows waiting for (or done with) Master Ledger write-back
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ledger_outbox (
+                idem_key TEXT PRIMARY KEY,
+                utr TEXT NOT NULL,
+                amount REAL,
+                txn_date TEXT,
+                intern_name TEXT,
+                file_link TEXT,
+                queued_at TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                sent_at TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_outbox_pending ON ledger_outbox (sent_at)')
+
+        # Manual Review Queue: one row per flagged log row; blob = BlobStore digest of the image
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS review_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                queued_at TEXT NOT NULL,
+                log_table TEXT NOT NULL,
+                log_id INTEGER NOT NULL,
+                file_id TEXT,
                 file_name TEXT,
+                folder_id TEXT,
+                intern_name TEXT,
+                status TEXT NOT NULL,
+                reason TEXT,
                 utr TEXT,
                 amount REAL,
-                status TEXT
+                blob TEXT,
+                decision TEXT,
+                decided_at TEXT,
+                reviewer TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_review_open ON review_items (decision, id)')
+
+        # Metric Snapshots: periodic dumps of the in-process metrics registry (see metrics.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS metric_snapshots (
+                taken_at TEXT NOT NULL,
+                series TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                value REAL
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_metric_snapshots ON metric_snapshots (series, taken_at)')
         conn.commit()
+
+        # One-time backfill for databases created before rollups existed
+        has_rollups = cursor.execute('SELECT 1 FROM audit_rollups LIMIT 1').fetchone()
+        has_logs = cursor.execute('SELECT 1 FROM log_partitions LIMIT 1').fetchone()
         conn.close()
+        if has_logs and not has_rollups:
+            self.rebuild_rollups()
 
-    def log_transaction(self, intern_name: str, folder_id: str, file_name: str, 
-                       utr: str, amount: float, status: str):
+    def _bump_rollup(self, cursor: sqlite3.Cursor, intern_name: str, day: str,
+                     status: str, amount: float, delta: int = 1):
+        """
+        Applies one log row to its intern/day/status bucket.
+        Must run on the same cursor (transaction) as the audit_logs write.
+        """
+        is_dup = delta if status == 'DUPLICATE' else 0
+        is_fail = delta if status in self.FAILURE_STATUSES else 0
+        cursor.execute('''
+            INSERT INTO audit_rollups (intern_name, day, status, file_count, total_amount, duplicates, failures)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (intern_name, day, status) DO UPDATE SET
+                file_count = file_count + excluded.file_count,
+                total_amount = total_amount + excluded.total_amount,
+                duplicates = duplicates + excluded.duplicates,
+                failures = failures + excluded.failures
+        ''', (intern_name or 'Unknown_Intern', day, status or 'FAILED',
+              delta, amount * delta, is_dup, is_fail))
+
+    def log_transaction(self, intern_name: str, folder_id: str, file_name: str,
+                       utr: str, amount: float, status: str,
+                       fidelity: str = None, bytes_fetched: int = None, file_id: str = None,
+                       extract_status: str = None, ocr_text: str = None,
+                       reason: str = None, blob: str = None):
         """
         Atomic Write Operation.
         Logs a single scan result to the database.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        with DB_WRITE_SECONDS.time('log_transaction'):
+            conn = self._connect()
+            cursor = conn.cursor()
+            self._insert_log(cursor, intern_name, folder_id, file_name, utr, amount, status,
+                             fidelity, bytes_fetched, file_id, extract_status, ocr_text, reason, blob)
+            conn.commit()
+            conn.close()
+
+    def _insert_log(self, cursor: sqlite3.Cursor, intern_name: str, folder_id: str, file_name: str,
+                    utr: str, amount: float, status: str,
+                    fidelity: str = None, bytes_fetched: int = None, file_id: str = None,
+                    extract_status: str = None, ocr_text: str = None,
+                    reason: str = None, blob: str = None):
         # ISO 8601 Timestamp
         ts = datetime.datetime.now().isoformat()
-        
+
         # Handle None/Null values safely
         safe_utr = str(utr) if utr else "N/A"
         safe_amt = float(amount) if amount else 0.0
-        
-        cursor.execute('''
-            INSERT INTO audit_logs (timestamp, intern_name, folder_id, file_name, utr, amount, status)
+
+        table = self._ensure_partition(cursor, ts[:7])
+        cursor.execute(f'''
+            INSERT INTO {table} (timestamp, intern_name, folder_id, file_name, utr, amount, status,
+                                 fidelity, bytes_fetched, file_id, extract_status, ocr_text)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (ts, intern_name, folder_id, file_name, safe_utr, safe_amt, status, fidelity, bytes_fetched,
+              file_id, extract_status, self.pack_text(ocr_text)))
+        log_id = cursor.lastrowid
+
+        # Same transaction: the rollup can never drift from the raw log
+        self._bump_rollup(cursor, intern_name, ts[:10], status, safe_amt)
+
+        # Flagged rows join the manual-review queue in the same transaction too
+        if status in self.REVIEW_STATUSES:
+            cursor.execute('''
+                INSERT INTO review_items (queued_at, log_table, log_id, file_id, file_name, folder_id,
+                                          intern_name, status, reason, utr, amount, blob)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (ts, table, log_id, file_id, file_name, folder_id, intern_name, status, reason,
+                  safe_utr, safe_amt, blob))
+
+    def rebuild_rollups(self):
+        """
+        Recomputes audit_rollups from scratch: one aggregate per partition
+        (archives included), then a single swap transaction.
+        Only needed for legacy databases or after manual edits to audit_logs.
+        """
+        fail_marks = ','.join('?' * len(self.FAILURE_STATUSES))
+        buckets = list(self.query_partitions(f'''
+            SELECT COALESCE(intern_name, 'Unknown_Intern'), substr(timestamp, 1, 10), COALESCE(status, 'FAILED'),
+                   COUNT(*), COALESCE(SUM(amount), 0),
+                   SUM(CASE WHEN status = 'DUPLICATE' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN status IN ({fail_marks}) THEN 1 ELSE 0 END)
+            FROM {{table}}
+            GROUP BY 1, 2, 3
+        ''', self.FAILURE_STATUSES))
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM audit_rollups')
+        cursor.executemany('''
+            INSERT INTO audit_rollups (intern_name, day, status, file_count, total_amount, duplicates, failures)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (ts, intern_name, folder_id, file_name, safe_utr, safe_amt, status))
-        
+            ON CONFLICT (intern_name, day, status) DO UPDATE SET
+                file_count = file_count + excluded.file_count,
+                total_amount = total_amount + excluded.total_amount,
+                duplicates = duplicates + excluded.duplicates,
+                failures = failures + excluded.failures
+        ''', buckets)
         conn.commit()
         conn.close()
 
-    def get_session_stats(self, folder_id: str):
-        """Returns a quick summary for the active session."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+    def get_session_stats(self, folder_id: str, since_day: str = None):
+        """Returns a quick summary for the active session (pass since_day to skip older months)."""
+        merged: Dict[str, List[float]] = {}
+        for status, count, amount in self.query_partitions('''
+            SELECT status, COUNT(*), SUM(amount)
+            FROM {table}
+            WHERE folder_id = ?
+            GROUP BY status
+        ''', (folder_id,), since_day=since_day):
+            bucket = merged.setdefault(status, [0, 0.0])
+            bucket[0] += count
+            bucket[1] += amount or 0.0
+        return [(status, count, amount) for status, (count, amount) in merged.items()]
+
+    # --- MONTHLY PARTITIONS ---
+    # Writes only ever touch the current month's table, so they stay fast however
+    # much history piles up. Reads go through query_partitions, which prunes by
+    # month and attaches archived months read-only for the one query that needs them.
+
+    @staticmethod
+    def partition_table(month: str) -> str:
+        """'2026-10' (or any ISO timestamp) -> 'audit_logs_2026_10'."""
+        return 'audit_logs_' + month[:7].replace('-', '_')
+
+    def _ensure_partition(self, cursor: sqlite3.Cursor, month: str) -> str:
+        """Creates (once) and returns the live table for `month` (YYYY-MM)."""
+        table = self.partition_table(month)
+        if month in self._live_months:
+            return table
+        self._create_log_table(cursor, table)
         cursor.execute('''
-            SELECT status, COUNT(*), SUM(amount) 
-            FROM audit_logs 
-            WHERE folder_id = ? 
+            INSERT INTO log_partitions (month, table_name) VALUES (?, ?) ON CONFLICT (month) DO NOTHING
+        ''', (month, table))
+        if cursor.rowcount:
+            self._refresh_log_view(cursor)
+        self._live_months.add(month)
+        return table
+
+    def _create_log_table(self, cursor: sqlite3.Cursor, table: str, schema: str = 'main'):
+        if not self._PARTITION_NAME.match(table):
+            raise ValueError(f"Not a log partition: {table}")
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {schema}.{table} ({self.LOG_COLUMNS})')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_folder ON {table} (folder_id, status)')
+
+    def _refresh_log_view(self, cursor: sqlite3.Cursor):
+        """audit_logs stays queryable by hand: a view over the live (non-archived) partitions."""
+        tables = [t for (t,) in cursor.execute(
+            'SELECT table_name FROM log_partitions WHERE archive_path IS NULL ORDER BY month').fetchall()]
+        cursor.execute('DROP VIEW IF EXISTS audit_logs')
+        if tables:
+            union = ' UNION ALL '.join(f'SELECT * FROM main.{t}' for t in tables)
+            cursor.execute(f'CREATE VIEW audit_logs AS {union}')
+
+    def _split_legacy_logs(self, cursor: sqlite3.Cursor):
+        """One-time migration: the old single audit_logs table becomes monthly partitions."""
+        # Older databases: add the transfer / re-score columns in place first
+        log_columns = {row[1] for row in cursor.execute('PRAGMA table_info(audit_logs)')}
+        for column, decl in (('fidelity', 'TEXT'), ('bytes_fetched', 'INTEGER'), ('file_id', 'TEXT'),
+                             ('extract_status', 'TEXT'), ('ocr_text', 'BLOB')):
+            if column not in log_columns:
+                cursor.execute(f'ALTER TABLE audit_logs ADD COLUMN {column} {decl}')
+
+        months = [m for (m,) in cursor.execute('SELECT DISTINCT substr(timestamp, 1, 7) FROM audit_logs').fetchall()]
+        for month in months:
+            table = self.partition_table(month)
+            self._create_log_table(cursor, table)
+            cursor.execute(f'''
+                INSERT INTO {table} ({self.LOG_FIELDS})
+                SELECT {self.LOG_FIELDS} FROM audit_logs WHERE substr(timestamp, 1, 7) = ? ORDER BY id
+            ''', (month,))
+            cursor.execute('''
+                INSERT INTO log_partitions (month, table_name) VALUES (?, ?) ON CONFLICT (month) DO NOTHING
+            ''', (month, table))
+        moved = cursor.execute('SELECT COUNT(*) FROM audit_logs').fetchone()[0]
+        cursor.execute('DROP TABLE audit_logs')
+        self._refresh_log_view(cursor)
+        print(f"   [MIGRATION] Split {moved} audit log rows into {len(months)} monthly partitions.")
+
+    def _partitions(self, since_day: str = None, until_day: str = None,
+                    live_only: bool = False) -> List[Tuple[str, str, Optional[str]]]:
+        """(month, table, archive_path) in month order, pruned to [since_day, until_day]."""
+        query, params = 'SELECT month, table_name, archive_path FROM log_partitions WHERE 1', []
+        if since_day:
+            query += ' AND month >= ?'
+            params.append(since_day[:7])
+        if until_day:
+            query += ' AND month <= ?'
+            params.append(until_day[:7])
+        if live_only:
+            query += ' AND archive_path IS NULL'
+        conn = self._connect()
+        rows = conn.execute(query + ' ORDER BY month', params).fetchall()
+        conn.close()
+        return rows
+
+    def _archive_file(self, archive_path: str) -> str:
+        # Relative archive paths resolve against the database, so the pair can move together
+        return os.path.join(os.path.dirname(self.db_path), archive_path)
+
+    def _open_partition(self, cursor: sqlite3.Cursor, table: str, archive_path: Optional[str]) -> str:
+        """Qualified name to read `table` from; archived months are attached read-only."""
+        if not archive_path:
+            return f'main.{table}'
+        uri = 'file:' + pathname2url(os.path.abspath(self._archive_file(archive_path))) + '?mode=ro&immutable=1'
+        cursor.execute('ATTACH DATABASE ? AS archive', (uri,))
+        return f'archive.{table}'
+
+    def _close_partition(self, cursor: sqlite3.Cursor, archive_path: Optional[str]):
+        if archive_path:
+            cursor.execute('DETACH DATABASE archive')
+
+    def query_partitions(self, sql: str, params: tuple = (), since_day: str = None,
+                         until_day: str = None) -> Iterator[tuple]:
+        """
+        Query router: runs `sql` once per partition in range, with {table}
+        standing for that partition, and yields every row. Only months that can
+        overlap [since_day, until_day] are touched, and one archive is attached
+        at a time, so SQLite's attach limit never matters.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            for month, table, archive in self._partitions(since_day, until_day):
+                source = self._open_partition(cursor, table, archive)
+                try:
+                    yield from cursor.execute(sql.format(table=source), params).fetchall()
+                finally:
+                    self._close_partition(cursor, archive)
+        finally:
+            conn.close()
+
+    def get_logs(self, since_day: str = None, until_day: str = None, folder_id: str = None,
+                 limit: int = 500) -> List[Dict[str, Any]]:
+        """History rows, newest first, read only from the months in range."""
+        where, params = ['1'], []
+        if since_day:
+            where.append('timestamp >= ?')
+            params.append(since_day)
+        if until_day:
+            where.append('timestamp < ?')
+            params.append((datetime.date.fromisoformat(until_day[:10]) + datetime.timedelta(days=1)).isoformat())
+        if folder_id:
+            where.append('folder_id = ?')
+            params.append(folder_id)
+        sql = f'''
+            SELECT timestamp, intern_name, folder_id, file_name, utr, amount, status
+            FROM {{table}} WHERE {' AND '.join(where)} ORDER BY id DESC LIMIT ?
+        '''
+        rows = []
+        conn = self._connect()
+        cursor = conn.cursor()
+        for month, table, archive in reversed(self._partitions(since_day, until_day)):
+            if len(rows) >= limit: break
+            source = self._open_partition(cursor, table, archive)
+            rows.extend(cursor.execute(sql.format(table=source), params + [limit - len(rows)]).fetchall())
+            self._close_partition(cursor, archive)
+        conn.close()
+        keys = ('timestamp', 'intern_name', 'folder_id', 'file_name', 'utr', 'amount', 'status')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def get_partition_summary(self) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        summary = []
+        for month, table, archive, row_count, archived_at in conn.execute(
+                'SELECT month, table_name, archive_path, row_count, archived_at FROM log_partitions ORDER BY month'
+        ).fetchall():
+            if not archive:
+                row_count = conn.execute(f'SELECT COUNT(*) FROM main.{table}').fetchone()[0]
+            summary.append({'month': month, 'table': table, 'archive_path': archive,
+                            'rows': row_count, 'archived_at': archived_at})
+        conn.close()
+        return summary
+
+    def archive_partitions(self, keep_months: int = 3, archive_dir: str = None,
+                           vacuum: bool = True) -> List[Dict[str, Any]]:
+        """
+        Moves every live month older than the newest `keep_months` (the current
+        month always stays) into its own compact, read-only database file
+        (archive/aura_logs_YYYY-MM.db next to the main DB), then drops it here.
+        Rollups are untouched: the Dashboard keeps its full history.
+        """
+        first_kept = datetime.date.today().replace(day=1)
+        for _ in range(max(1, keep_months) - 1):
+            first_kept = (first_kept - datetime.timedelta(days=1)).replace(day=1)
+        cutoff = first_kept.isoformat()[:7]
+
+        archive_dir = archive_dir or os.path.join(os.path.dirname(self.db_path), 'archive')
+        os.makedirs(archive_dir, exist_ok=True)
+        archived = []
+        for month, table, _ in self._partitions(live_only=True):
+            if month >= cutoff: break
+            path = os.path.join(archive_dir, f'aura_logs_{month}.db')
+            if os.path.exists(path):   # left over from an interrupted attempt
+                os.chmod(path, 0o644)
+                os.remove(path)
+
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute('ATTACH DATABASE ? AS archive', (path,))
+            self._create_log_table(cursor, table, schema='archive')
+            cursor.execute(f'INSERT INTO archive.{table} ({self.LOG_FIELDS}) '
+                           f'SELECT {self.LOG_FIELDS} FROM main.{table} ORDER BY id')
+            rows = cursor.execute(f'SELECT COUNT(*) FROM archive.{table}').fetchone()[0]
+            conn.commit()
+            cursor.execute('DETACH DATABASE archive')
+
+            # Compact the file on its own connection, then freeze it
+            archive_conn = sqlite3.connect(path)
+            archive_conn.execute('VACUUM')
+            archive_conn.close()
+            os.chmod(path, 0o444)
+
+            # Swap: the registry points at the file and the live table goes, in one transaction
+            stored = os.path.relpath(path, os.path.dirname(self.db_path))
+            cursor.execute('''
+                UPDATE log_partitions SET archive_path = ?, row_count = ?, archived_at = ? WHERE month = ?
+            ''', (stored, rows, datetime.datetime.now().isoformat(), month))
+            cursor.execute(f'DROP TABLE main.{table}')
+            self._refresh_log_view(cursor)
+            conn.commit()
+            conn.close()
+            self._live_months.discard(month)
+            archived.append({'month': month, 'rows': rows, 'path': path, 'bytes': os.path.getsize(path)})
+
+        if archived and vacuum:
+            conn = self._connect()
+            conn.execute('VACUUM')   # hand the freed pages back to the filesystem
+            conn.close()
+        return archived
+
+    # --- DASHBOARD QUERIES (Rollup-backed: O(days), never O(rows)) ---
+
+    def get_dashboard_totals(self, since_day: str = None) -> Dict[str, Any]:
+        """
+        Lifetime (or since `since_day`, YYYY-MM-DD) totals for the Dashboard cards.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        where, params = ('WHERE day >= ?', (since_day,)) if since_day else ('', ())
+        cursor.execute(f'''
+            SELECT status, SUM(file_count), SUM(total_amount), SUM(duplicates), SUM(failures)
+            FROM audit_rollups {where}
             GROUP BY status
-        ''', (folder_id,))
-        
+        ''', params)
+        rows = cursor.fetchall()
+        conn.close()
+
+        totals = {'files': 0, 'verified_amt': 0.0, 'verified': 0,
+                  'duplicates': 0, 'failures': 0, 'by_status': {}}
+        for status, count, amount, dups, fails in rows:
+            totals['files'] += count
+            totals['duplicates'] += dups
+            totals['failures'] += fails
+            totals['by_status'][status] = count
+            if status == 'SUCCESS':
+                totals['verified'] = count
+                totals['verified_amt'] = amount
+        return totals
+
+    def get_daily_trend(self, days: int = 14) -> List[Dict[str, Any]]:
+        """Per-day series (oldest first) for the last `days` days."""
+        start = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT day,
+                   SUM(file_count),
+                   SUM(CASE WHEN status = 'SUCCESS' THEN total_amount ELSE 0 END),
+                   SUM(CASE WHEN status = 'SUCCESS' THEN file_count ELSE 0 END),
+                   SUM(duplicates), SUM(failures)
+            FROM audit_rollups
+            WHERE day >= ?
+            GROUP BY day
+            ORDER BY day
+        ''', (start,))
+        rows = cursor.fetchall()
+        conn.close()
+        return [
+            {'day': d, 'files': n, 'verified_amt': amt, 'verified': ok, 'duplicates': dup, 'failures': fail}
+            for d, n, amt, ok, dup, fail in rows
+        ]
+
+    def get_intern_totals(self, since_day: str = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Top interns by verified amount."""
+        conn = self._connect()
+        cursor = conn.cursor()
+        where, params = ('WHERE day >= ?', (since_day,)) if since_day else ('', ())
+        cursor.execute(f'''
+            SELECT intern_name,
+                   SUM(file_count),
+                   SUM(CASE WHEN status = 'SUCCESS' THEN total_amount ELSE 0 END),
+                   SUM(duplicates), SUM(failures)
+            FROM audit_rollups {where}
+            GROUP BY intern_name
+            ORDER BY 3 DESC
+            LIMIT ?
+        ''', params + (limit,))
         rows = cursor.fetchall()
         conn.close()
-        return rows
\ No newline at end of file
+        return [
+            {'intern_name': name, 'files': n, 'verified_amt': amt, 'duplicates': dup, 'failures': fail}
+            for name, n, amt, dup, fail in rows
+        ]
+
+    def get_transfer_totals(self, folder_id: str = None, since_day: str = None) -> Dict[str, Dict[str, Any]]:
+        """Files and bytes per download fidelity ('thumbnail' / 'original'), optionally for one folder."""
+        query = '''
+            SELECT COALESCE(fidelity, 'original'), COUNT(*), COALESCE(SUM(bytes_fetched), 0)
+            FROM {table} WHERE bytes_fetched IS NOT NULL
+        '''
+        params = ()
+        if folder_id:
+            query += ' AND folder_id = ?'
+            params = (folder_id,)
+        totals: Dict[str, Dict[str, Any]] = {}
+        for fidelity, n, b in self.query_partitions(query + ' GROUP BY 1', params, since_day=since_day):
+            bucket = totals.setdefault(fidelity, {'files': 0, 'bytes': 0})
+            bucket['files'] += n
+            bucket['bytes'] += b
+        return totals
+
+    # --- CHECKPOINT / RESUME ---
+
+    def start_run(self, folder_id: str, intern_name: str) -> str:
+        """Opens a new audit run and returns its run ID."""
+        run_id = uuid.uuid4().hex
+        ts = datetime.datetime.now().isoformat()
+        conn = self._connect()
+        conn.execute('''
+            INSERT INTO audit_runs (run_id, folder_id, intern_name, started_at, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (run_id, folder_id, intern_name, ts, ts))
+        conn.commit()
+        conn.close()
+        return run_id
+
+    def find_resumable_run(self, folder_id: str) -> Optional[Dict[str, Any]]:
+        """Latest run for this folder that never reached finish_run()."""
+        conn = self._connect()
+        row = conn.execute('''
+            SELECT run_id, intern_name, started_at FROM audit_runs
+            WHERE folder_id = ? AND state = 'RUNNING'
+            ORDER BY started_at DESC LIMIT 1
+        ''', (folder_id,)).fetchone()
+        conn.close()
+        if not row: return None
+        return {'run_id': row[0], 'intern_name': row[1], 'started_at': row[2]}
+
+    def supersede_runs(self, folder_id: str) -> int:
+        """Closes every open run for this folder (a fresh run replaces them); returns how many."""
+        conn = self._connect()
+        cursor = conn.execute('''
+            UPDATE audit_runs SET state = 'SUPERSEDED', updated_at = ? WHERE folder_id = ? AND state = 'RUNNING'
+        ''', (datetime.datetime.now().isoformat(), folder_id))
+        superseded = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return superseded
+
+    def register_run_files(self, run_id: str, files: List[Dict[str, Any]]):
+        """Snapshots the file listing so a resume never has to re-crawl Drive."""
+        conn = self._connect()
+        conn.executemany('''
+            INSERT OR IGNORE INTO run_files (run_id, file_id, file_name, mime_type,
+                                             size, modified_time, parent_id, thumbnail_link)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(run_id, f['id'], f.get('name'), f.get('mimeType', f.get('mime')),
+               int(f['size']) if f.get('size') else None, f.get('modifiedTime'),
+               (f.get('parents') or [None])[0], f.get('thumbnailLink')) for f in files])
+        conn.commit()
+        conn.close()
+
+    def requeue_inflight(self, run_id: str) -> int:
+        """Files that were mid-flight when the app died go back to pending."""
+        conn = self._connect()
+        cursor = conn.execute('''
+            UPDATE run_files SET state = 'pending' WHERE run_id = ? AND state = 'in_flight'
+        ''', (run_id,))
+        requeued = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return requeued
+
+    def get_run_files(self, run_id: str, state: str) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT file_id, file_name, mime_type, status, utr, amount,
+                   size, modified_time, parent_id, thumbnail_link
+            FROM run_files WHERE run_id = ? AND state = ?
+        ''', (run_id, state)).fetchall()
+        conn.close()
+        return [
+            {'id': fid, 'name': name, 'mimeType': mime, 'status': status, 'utr': utr, 'amount': amount,
+             'size': size, 'modifiedTime': modified, 'parents': [parent] if parent else [],
+             'thumbnailLink': thumb}
+            for fid, name, mime, status, utr, amount, size, modified, parent, thumb in rows
+        ]
+
+    def mark_file_inflight(self, run_id: str, file_id: str):
+        conn = self._connect()
+        conn.execute('''
+            UPDATE run_files SET state = 'in_flight', updated_at = ?
+            WHERE run_id = ? AND file_id = ? AND state != 'done'
+        ''', (datetime.datetime.now().isoformat(), run_id, file_id))
+        conn.commit()
+        conn.close()
+
+    def complete_run_file(self, run_id: str, file_id: str, intern_name: str, folder_id: str,
+                          file_name: str, utr: str, amount: float, status: str,
+                          ledger_row: Dict[str, Any] = None,
+                          fidelity: str = None, bytes_fetched: int = None,
+                          extract_status: str = None, ocr_text: str = None,
+                          reason: str = None, blob: str = None):
+        """
+        Atomic checkpoint: the audit log row, its rollup, the 'done' marker and
+        (for verified receipts) the ledger outbox row commit together, so a crash
+        can never log a file twice or lose its write-back.
+        """
+        with DB_WRITE_SECONDS.time('complete_run_file'):
+            conn = self._connect()
+            cursor = conn.cursor()
+            ts = datetime.datetime.now().isoformat()
+            self._insert_log(cursor, intern_name, folder_id, file_name, utr, amount, status,
+                             fidelity, bytes_fetched, file_id, extract_status, ocr_text, reason, blob)
+            if ledger_row: self._enqueue_ledger_row(cursor, ledger_row)
+            cursor.execute('''
+                UPDATE run_files SET state = 'done', status = ?, utr = ?, amount = ?, updated_at = ?
+                WHERE run_id = ? AND file_id = ?
+            ''', (status, utr, float(amount) if amount else 0.0, ts, run_id, file_id))
+            cursor.execute('UPDATE audit_runs SET updated_at = ? WHERE run_id = ?', (ts, run_id))
+            conn.commit()
+            conn.close()
+
+    def finish_run(self, run_id: str, state: str = 'COMPLETE'):
+        conn = self._connect()
+        conn.execute('''
+            UPDATE audit_runs SET state = ?, updated_at = ? WHERE run_id = ?
+        ''', (state, datetime.datetime.now().isoformat(), run_id))
+        conn.commit()
+        conn.close()
+
+    # --- LOCAL UTR REGISTRY ---
+
+    def claim_utr(self, utr: str, file_id: str, file_name: str, folder_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomic check-and-claim of a UTR.
+        Returns None if this file owns the UTR (first sighting, or the same file
+        seen again on resume). Otherwise returns the first-seen record: a DUPLICATE.
+        BEGIN IMMEDIATE takes the write lock up front, so concurrent threads and
+        processes serialize here and exactly one of them wins the claim.
+        """
+        key = normalize_utr(utr)
+        if not key: return None
+
+        started = time.perf_counter()
+        conn = self._connect()
+        conn.isolation_level = None  # manual transaction control
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('''
+                INSERT INTO utr_registry (utr, file_id, file_name, folder_id, first_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (utr) DO NOTHING
+            ''', (key, file_id, file_name, folder_id, datetime.datetime.now().isoformat()))
+            row = conn.execute('''
+                SELECT file_id, file_name, folder_id, first_seen FROM utr_registry WHERE utr = ?
+            ''', (key,)).fetchone()
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction: conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+            DB_WRITE_SECONDS.observe(time.perf_counter() - started, 'claim_utr')
+
+        if row[0] == file_id:
+            return None
+        return {'utr': key, 'file_id': row[0], 'file_name': row[1], 'folder_id': row[2], 'first_seen': row[3]}
+
+    def utr_owner(self, utr: str) -> Optional[str]:
+        """file_id that claimed this UTR first, or None if nobody has."""
+        key = normalize_utr(utr)
+        if not key: return None
+        conn = self._connect()
+        row = conn.execute('SELECT file_id FROM utr_registry WHERE utr = ?', (key,)).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    # --- LEDGER WRITE-BACK OUTBOX ---
+
+    @staticmethod
+    def make_ledger_row(file_id: str, utr: str, amount: float, txn_date: str, intern_name: str) -> Dict[str, Any]:
+        """Builds an outbox row. The idempotency key is stable per (file, UTR)."""
+        return {
+            'idem_key': 'AURA-' + hashlib.sha1(f"{file_id}:{normalize_utr(utr)}".encode()).hexdigest()[:16],
+            'utr': normalize_utr(utr),
+            'amount': float(amount) if amount else 0.0,
+            'txn_date': txn_date,
+            'intern_name': intern_name,
+            'file_link': f"https://drive.google.com/file/d/{file_id}/view",
+            'queued_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def _enqueue_ledger_row(self, cursor: sqlite3.Cursor, row: Dict[str, Any]):
+        cursor.execute('''
+            INSERT OR IGNORE INTO ledger_outbox (idem_key, utr, amount, txn_date, intern_name, file_link, queued_at)
+            VALUES (:idem_key, :utr, :amount, :txn_date, :intern_name, :file_link, :queued_at)
+        ''', row)
+
+    def enqueue_ledger_row(self, row: Dict[str, Any]):
+        conn = self._connect()
+        self._enqueue_ledger_row(conn.cursor(), row)
+        conn.commit()
+        conn.close()
+
+    def count_pending_ledger_rows(self) -> int:
+        conn = self._connect()
+        n = conn.execute('SELECT COUNT(*) FROM ledger_outbox WHERE sent_at IS NULL').fetchone()[0]
+        conn.close()
+        return n
+
+    def claim_ledger_batch(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Oldest unsent rows, with their attempt counter bumped *before* sending.
+        attempts > 0 on return means an earlier send may already have landed.
+        """
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        rows = [dict(r) for r in conn.execute('''
+            SELECT idem_key, utr, amount, txn_date, intern_name, file_link, queued_at, attempts
+            FROM ledger_outbox WHERE sent_at IS NULL
+            ORDER BY queued_at LIMIT ?
+        ''', (limit,)).fetchall()]
+        conn.executemany('UPDATE ledger_outbox SET attempts = attempts + 1 WHERE idem_key = ?',
+                         [(r['idem_key'],) for r in rows])
+        conn.commit()
+        conn.close()
+        return rows
+
+    def mark_ledger_rows_sent(self, idem_keys: List[str]):
+        ts = datetime.datetime.now().isoformat()
+        conn = self._connect()
+        conn.executemany('UPDATE ledger_outbox SET sent_at = ? WHERE idem_key = ?',
+                         [(ts, k) for k in idem_keys])
+        conn.commit()
+        conn.close()
+
+    # --- MANUAL REVIEW QUEUE ---
+
+    def get_review_queue(self, limit: int = 50, after_id: int = 0,
+                         folder_id: str = None) -> List[Dict[str, Any]]:
+        """Open (undecided) review items in queue order, keyset-paged by id."""
+        sql = '''
+            SELECT id, queued_at, file_id, file_name, folder_id, intern_name, status, reason, utr, amount, blob
+            FROM review_items WHERE decision IS NULL AND id > ?
+        '''
+        params: list = [after_id]
+        if folder_id:
+            sql += ' AND folder_id = ?'
+            params.append(folder_id)
+        sql += ' ORDER BY id LIMIT ?'
+        params.append(limit)
+
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        rows = [dict(r) for r in conn.execute(sql, params).fetchall()]
+        conn.close()
+        return rows
+
+    def count_open_reviews(self) -> int:
+        conn = self._connect()
+        n = conn.execute('SELECT COUNT(*) FROM review_items WHERE decision IS NULL').fetchone()[0]
+        conn.close()
+        return n
+
+    def get_review_blob_refs(self) -> set:
+        """Blob digests still needed by an open review item (everything else may be pruned)."""
+        conn = self._connect()
+        refs = {r[0] for r in conn.execute(
+            'SELECT DISTINCT blob FROM review_items WHERE decision IS NULL AND blob IS NOT NULL')}
+        conn.close()
+        return refs
+
+    def apply_review_decisions(self, decisions: List[Tuple[int, str]], reviewer: str = None) -> Dict[str, int]:
+        """
+        Writes a batch of reviewer decisions ('APPROVED' / 'REJECTED') in one transaction.
+
+        REJECTED confirms the flag: the log row keeps its status. APPROVED on a
+        MANUAL_REVIEW / PARTIAL_FAIL row that has a UTR and an amount promotes it
+        to SUCCESS the way apply_rescores does (log row, run_files, both rollup
+        buckets, UTR registry) and queues its Master Ledger write-back. Approving
+        a DUPLICATE, an incomplete read, a row changed since it was queued or one
+        in an archived month only records the decision.
+        """
+        counts = {'approved': 0, 'rejected': 0, 'promoted': 0, 'not_promoted': 0}
+        if not decisions: return counts
+        for _, decision in decisions:
+            if decision not in ('APPROVED', 'REJECTED'):
+                raise ValueError(f"Unknown review decision: {decision}")
+
+        conn = self._connect()
+        conn.isolation_level = None  # manual transaction control
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.cursor()
+            live = {r[0] for r in cursor.execute(
+                'SELECT table_name FROM log_partitions WHERE archive_path IS NULL')}
+            now = datetime.datetime.now().isoformat()
+            for item_id, decision in decisions:
+                item = cursor.execute('''
+                    SELECT log_table, log_id, file_id, file_name, folder_id, status, utr, amount
+                    FROM review_items WHERE id = ? AND decision IS NULL
+                ''', (item_id,)).fetchone()
+                if item is None: continue   # decided elsewhere in the meantime
+                table, log_id, file_id, file_name, folder, status, utr, amount = item
+                cursor.execute('UPDATE review_items SET decision = ?, decided_at = ?, reviewer = ? WHERE id = ?',
+                               (decision, now, reviewer, item_id))
+                if decision == 'REJECTED':
+                    counts['rejected'] += 1
+                    continue
+                counts['approved'] += 1
+
+                key = normalize_utr(utr)
+                row = None
+                if status != 'DUPLICATE' and key and amount and table in live:
+                    row = cursor.execute(f'''
+                        SELECT timestamp, intern_name FROM main.{table} WHERE id = ? AND status = ?
+                    ''', (log_id, status)).fetchone()
+                if row and file_id:
+                    cursor.execute('''
+                        INSERT INTO utr_registry (utr, file_id, file_name, folder_id, first_seen)
+                        VALUES (?, ?, ?, ?, ?) ON CONFLICT (utr) DO NOTHING
+                    ''', (key, file_id, file_name, folder, now))
+                    owner = cursor.execute('SELECT file_id FROM utr_registry WHERE utr = ?', (key,)).fetchone()
+                    if owner[0] != file_id: row = None   # someone else's UTR: not ours to verify
+                if row is None:
+                    counts['not_promoted'] += 1
+                    continue
+
+                ts, intern = row
+                cursor.execute(f'UPDATE main.{table} SET status = ? WHERE id = ?', ('SUCCESS', log_id))
+                cursor.execute('''
+                    UPDATE run_files SET status = 'SUCCESS'
+                    WHERE file_id = ? AND state = 'done' AND status = ?
+                ''', (file_id, status))
+                self._bump_rollup(cursor, intern, ts[:10], status, amount, delta=-1)
+                self._bump_rollup(cursor, intern, ts[:10], 'SUCCESS', amount)
+                self._enqueue_ledger_row(cursor, self.make_ledger_row(file_id, utr, amount, None, intern))
+                counts['promoted'] += 1
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction: conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return counts
+
+    # --- METRIC SNAPSHOTS ---
+
+    METRIC_RETENTION_DAYS = 30
+
+    def save_metric_snapshot(self, samples: List[Tuple[str, str, float]]):
+        """One timestamped copy of every metric sample; rows older than METRIC_RETENTION_DAYS are dropped."""
+        if not samples: return
+        ts = datetime.datetime.now().isoformat(timespec='seconds')
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=self.METRIC_RETENTION_DAYS)).isoformat()
+        with DB_WRITE_SECONDS.time('metric_snapshot'):
+            conn = self._connect()
+            conn.executemany('INSERT INTO metric_snapshots (taken_at, series, labels, value) VALUES (?, ?, ?, ?)',
+                             [(ts, series, labels, value) for series, labels, value in samples])
+            conn.execute('DELETE FROM metric_snapshots WHERE taken_at < ?', (cutoff,))
+            conn.commit()
+            conn.close()
+
+    def get_metric_history(self, series: str, since: str = None) -> List[Dict[str, Any]]:
+        """Snapshots of one series (e.g. 'aura_files_total'), oldest first."""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        rows = [dict(r) for r in conn.execute('''
+            SELECT taken_at, labels, value FROM metric_snapshots
+            WHERE series = ? AND taken_at >= ? ORDER BY taken_at
+        ''', (series, since or '')).fetchall()]
+        conn.close()
+        return rows
+
+    # --- BULK RE-SCORING (stored OCR text, no downloads / tesseract) ---
+
+    @staticmethod
+    def pack_text(text: Optional[str]) -> Optional[bytes]:
+        """OCR dumps are repetitive: zlib keeps them at roughly a quarter of their size."""
+        return zlib.compress(text.encode('utf-8'), 6) if text else None
+
+    @staticmethod
+    def unpack_text(blob: Optional[bytes]) -> str:
+        return zlib.decompress(blob).decode('utf-8') if blob else ''
+
+    def iter_rescore_chunks(self, chunk_size: int = 1000, folder_id: str = None,
+                            since_day: str = None) -> Iterator[Tuple[str, List[Tuple[int, bytes]]]]:
+        """
+        Streams (partition, [(id, compressed text), ...]) for every re-scorable
+        row, oldest month first. Keyset paging on id: each chunk is one short
+        indexed read, so memory stays flat and writers are never blocked behind
+        a long scan. Archived months are read-only and are not re-scored.
+        Rows whose status was overridden centrally (DUPLICATE, near-duplicate
+        review) are left alone: the text alone can't reproduce that decision.
+        """
+        for month, table, _ in self._partitions(since_day=since_day, live_only=True):
+            last_id = 0
+            query = f'''
+                SELECT id, ocr_text FROM main.{table}
+                WHERE id > ? AND ocr_text IS NOT NULL AND status = extract_status
+            '''
+            if folder_id: query += ' AND folder_id = ?'
+            query += ' ORDER BY id LIMIT ?'
+            while True:
+                conn = self._connect()
+                params = (last_id, folder_id, chunk_size) if folder_id else (last_id, chunk_size)
+                rows = conn.execute(query, params).fetchall()
+                conn.close()
+                if not rows: break
+                yield table, rows
+                last_id = rows[-1][0]
+
+    def apply_rescores(self, table: str, results: List[Dict[str, Any]], writeback: bool = False,
+                       dry_run: bool = False) -> Dict[str, int]:
+        """
+        Applies one chunk of fresh extractions (all from partition `table`) in a
+        single transaction: the log rows, run_files, the UTR registry and both rollup buckets
+        (-1 on the old status, +1 on the new) move together.
+
+        A new SUCCESS still has to own its UTR in the local registry, otherwise
+        it becomes DUPLICATE; so does one whose UTR the scorer found in the
+        Master Ledger snapshot ('in_ledger'), unless the registry says the row
+        there is this file's own write-back. Ledger write-back for newly
+        verified rows is only queued with writeback=True, since the snapshot
+        may be older than the sheet. Rows demoted from SUCCESS lose their unsent outbox row; ones
+        already written to the ledger are counted in 'already_written'.
+        """
+        counts = {'scored': len(results), 'changed': 0, 'promoted': 0, 'demoted': 0,
+                  'duplicates': 0, 'queued': 0, 'already_written': 0}
+        if not results: return counts
+        if not self._PARTITION_NAME.match(table):
+            raise ValueError(f"Not a log partition: {table}")
+        ids = [r['id'] for r in results]
+
+        conn = self._connect()
+        conn.isolation_level = None  # manual transaction control
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.cursor()
+            # ids come from one keyset page, so a range read beats a huge IN (...)
+            old_rows = {row[0]: row for row in cursor.execute(f'''
+                SELECT id, timestamp, intern_name, folder_id, file_id, file_name, utr, amount, status, extract_status
+                FROM main.{table} WHERE id BETWEEN ? AND ?
+            ''', (min(ids), max(ids)))}
+
+            now = datetime.datetime.now().isoformat()
+            for r in results:
+                old = old_rows.get(r['id'])
+                if old is None: continue
+                _, ts, intern, folder, file_id, file_name, old_utr, old_amt, old_status, old_extract = old
+                if old_status != old_extract: continue   # overridden since it was read
+
+                new_utr = str(r['utr']) if r['utr'] else "N/A"
+                new_amt = float(r['amount']) if r['amount'] else 0.0
+                new_status = r['status']
+                if (new_status, new_utr, new_amt) == (old_status, old_utr, old_amt or 0.0): continue
+
+                # The old UTR no longer belongs to this file
+                if old_utr != new_utr and file_id and normalize_utr(old_utr):
+                    cursor.execute('DELETE FROM utr_registry WHERE utr = ? AND file_id = ?',
+                                   (normalize_utr(old_utr), file_id))
+                final_status = new_status
+                key = normalize_utr(r['utr']) if r['utr'] else None
+                prior = cursor.execute('SELECT file_id FROM utr_registry WHERE utr = ?',
+                                       (key,)).fetchone() if key else None
+                if new_status == 'SUCCESS' and r.get('in_ledger') and not (prior and prior[0] == file_id):
+                    final_status = 'DUPLICATE'
+                    counts['duplicates'] += 1
+                    key = None   # a ledger duplicate claims nothing locally
+                if key and file_id:
+                    cursor.execute('''
+                        INSERT INTO utr_registry (utr, file_id, file_name, folder_id, first_seen)
+                        VALUES (?, ?, ?, ?, ?) ON CONFLICT (utr) DO NOTHING
+                    ''', (key, file_id, file_name, folder, now))
+                    owner = cursor.execute('SELECT file_id FROM utr_registry WHERE utr = ?', (key,)).fetchone()
+                    if owner[0] != file_id:
+                        final_status = 'DUPLICATE'
+                        counts['duplicates'] += 1
+
+                cursor.execute(f'''
+                    UPDATE main.{table} SET utr = ?, amount = ?, status = ?, extract_status = ? WHERE id = ?
+                ''', (new_utr, new_amt, final_status, new_status, r['id']))
+                if file_id:
+                    cursor.execute('''
+                        UPDATE run_files SET status = ?, utr = ?, amount = ?
+                        WHERE file_id = ? AND state = 'done' AND status = ?
+                    ''', (final_status, r['utr'], new_amt, file_id, old_status))
+                self._bump_rollup(cursor, intern, ts[:10], old_status, old_amt or 0.0, delta=-1)
+                self._bump_rollup(cursor, intern, ts[:10], final_status, new_amt)
+                counts['changed'] += 1
+
+                utr_moved = old_utr != new_utr
+                if old_status == 'SUCCESS' and (final_status != 'SUCCESS' or utr_moved):
+                    counts['demoted'] += 1
+                    if file_id:
+                        idem_key = self.make_ledger_row(file_id, old_utr, old_amt, None, intern)['idem_key']
+                        cursor.execute('DELETE FROM ledger_outbox WHERE idem_key = ? AND sent_at IS NULL',
+                                       (idem_key,))
+                        if not cursor.rowcount and cursor.execute(
+                                'SELECT 1 FROM ledger_outbox WHERE idem_key = ?', (idem_key,)).fetchone():
+                            counts['already_written'] += 1
+                if final_status == 'SUCCESS' and (old_status != 'SUCCESS' or utr_moved):
+                    counts['promoted'] += 1
+                    if writeback and file_id:
+                        self._enqueue_ledger_row(cursor, self.make_ledger_row(
+                            file_id, r['utr'], new_amt, r.get('timestamp'), intern))
+                        counts['queued'] += 1
+
+            conn.execute('ROLLBACK' if dry_run else 'COMMIT')
+        except Exception:
+            if conn.in_transaction: conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return counts
@@ -1,15 +1,33 @@
 import sys
 import os
 import re
-from typing import Set
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Set, Optional, Dict, Any, List
 
 # --- PATH FIX ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
 if project_root not in sys.path: sys.path.append(project_root)
 
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from src.services.auth_manager import AuthManager
+from src.services.utr_index import normalize_utr, FuzzyUTRIndex, write_ledger_file
+
+_DATE_LIKE = re.compile(r'^\d{1,4}[\-/.]\d{1,2}[\-/.]\d{1,4}$')
+
+def _column_letter(index: int) -> str:
+    """0 -> 'A', 25 -> 'Z', 26 -> 'AA'."""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
 
 class SheetManager:
     """
@@ -17,15 +35,36 @@ class SheetManager:
     Connects to the Master Ledger to fetch historical UTRs/Transaction IDs
     to prevent Duplicate Fraud.
     """
+
+    # Write-Back: verified receipts land in their own tab, one row per receipt
+    WRITEBACK_TAB = 'AURA_Verified'
+    WRITEBACK_HEADER = ['UTR', 'Amount', 'Date', 'Intern', 'File Link', 'Logged At', 'Idempotency Key']
+    WRITEBACK_CHUNK = 300       # rows per values().append call (Sheets quota: ~60 writes/min/user)
+    WRITEBACK_RETRIES = 5
     
-    def __init__(self, spreadsheet_id: str):
+    # Ledger Layout: which columns hold transaction IDs, learned once per tab
+    LAYOUT_SAMPLE_ROWS = 50
+    ID_COLUMN_MIN_SHARE = 0.3
+    
+    def __init__(self, spreadsheet_id: str, sources: List[Dict[str, Any]] = None):
+        """
+        spreadsheet_id: the primary ledger (write-back target).
+        sources: [{'spreadsheet_id': ..., 'tabs': ['2024', '2025']}, ...].
+                 'tabs' omitted -> every tab. Defaults to Sheet1 of the primary ledger.
+        """
         self.spreadsheet_id = spreadsheet_id
+        self.sources = sources or [{'spreadsheet_id': spreadsheet_id, 'tabs': ['Sheet1']}]
+        self.layout_path = os.path.join(os.getcwd(), 'assets', 'config', 'ledger_layout.json')
         self.auth = AuthManager()
         self.creds = self.auth.get_credentials()
         self.service = build('sheets', 'v4', credentials=self.creds)
         
         # The 'Iron Set' - A hash set for O(1) duplicate lookups
         self.ledger_utrs: Set[str] = set()
+        # OCR-tolerant neighbour of the Iron Set (0/O, 1/l, 5/S, dropped chars...)
+        self.fuzzy_index = FuzzyUTRIndex()
+        self._index_lock = threading.Lock()
+        self._writeback_tab_ready = False
         self.loaded = False
 
     def _normalize_utr(self, utr: str) -> str:
@@ -34,33 +73,137 @@ class SheetManager:
         Ex: 'UPI-12345' -> '12345'
         Ex: ' 12345 '   -> '12345'
         """
-        if not utr: return ""
         # Remove anything that isn't a letter or number
-        return re.sub(r'[^A-Za-z0-9]', '', str(utr)).strip()
+        return normalize_utr(utr)
+
+    def _looks_like_txn_id(self, cell) -> str:
+        """Normalized cell if it looks like a transaction ID, else ''."""
+        clean_val = self._normalize_utr(cell)
+        # Filter: Only keep strings that look like transaction IDs (Length > 6)
+        # This avoids caching words like "Verified" or "Pending"
+        if len(clean_val) > 6 and not clean_val.isalpha():
+            return clean_val
+        return ""
+
+    def _thread_http(self):
+        """httplib2 is not thread-safe: every concurrent request gets its own connection."""
+        return AuthorizedHttp(self.creds, http=httplib2.Http())
+
+    def _load_layout(self) -> Dict[str, List[str]]:
+        try:
+            with open(self.layout_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_layout(self, layout: Dict[str, List[str]]):
+        try:
+            os.makedirs(os.path.dirname(self.layout_path), exist_ok=True)
+            with open(self.layout_path, 'w') as f:
+                json.dump(layout, f, indent=2)
+        except OSError as e:
+            print(f"   [WARN] Could not remember ledger layout: {e}")
 
-    def load_ledger(self, range_name: str = 'Sheet1!A:Z'):
+    def _detect_id_columns(self, sample_rows: List[List[str]]) -> List[str]:
+        """
+        Columns where a meaningful share of the sample looks like transaction IDs.
+        Falls back to every sampled column if nothing qualifies (safe > fast).
+        """
+        hits, filled = {}, {}
+        for row in sample_rows:
+            for col, cell in enumerate(row):
+                if str(cell).strip() == "": continue
+                filled[col] = filled.get(col, 0) + 1
+                # Dates normalize to 8 digits ('2026-01-01' -> '20260101'); don't let them claim a column
+                if self._looks_like_txn_id(cell) and not _DATE_LIKE.match(str(cell).strip()):
+                    hits[col] = hits.get(col, 0) + 1
+        cols = [c for c in sorted(hits) if hits[c] / filled[c] >= self.ID_COLUMN_MIN_SHARE]
+        if not cols:
+            cols = sorted(filled) or list(range(26))
+        return [_column_letter(c) for c in cols]
+
+    def _load_source(self, source: Dict[str, Any], layout: Dict[str, List[str]], refresh_layout: bool):
+        """
+        Fetches one spreadsheet: tab discovery, (first time only) a column sample,
+        then a single values().batchGet restricted to the ID columns of every tab.
+        Runs in a worker thread; returns (utrs, layout_updates, has_writeback_tab).
+        """
+        sid = source['spreadsheet_id']
+        http = self._thread_http()
+        sheet = self.service.spreadsheets()
+
+        meta = sheet.get(spreadsheetId=sid, fields='sheets.properties.title').execute(http=http)
+        titles = [s['properties']['title'] for s in meta.get('sheets', [])]
+        wanted = source.get('tabs') or [t for t in titles if t != self.WRITEBACK_TAB]
+        tabs = [t for t in wanted if t in titles]
+        missing = [t for t in wanted if t not in titles]
+        if missing:
+            print(f"   [WARN] Ledger {sid}: tabs not found {missing}")
+
+        # 1. Column detection: once per tab, then remembered on disk
+        updates = {}
+        unknown = [t for t in tabs if refresh_layout or f"{sid}/{t}" not in layout]
+        if unknown:
+            sample = sheet.values().batchGet(
+                spreadsheetId=sid, ranges=[f"'{t}'!A1:Z{self.LAYOUT_SAMPLE_ROWS}" for t in unknown]
+            ).execute(http=http)
+            for tab, vr in zip(unknown, sample.get('valueRanges', [])):
+                updates[f"{sid}/{tab}"] = self._detect_id_columns(vr.get('values', []))
+
+        # 2. One batchGet for every ID column of every tab
+        ranges = []
+        for tab in tabs:
+            cols = updates.get(f"{sid}/{tab}") or layout[f"{sid}/{tab}"]
+            ranges.extend(f"'{tab}'!{c}:{c}" for c in cols)
+        has_writeback = sid == self.spreadsheet_id and self.WRITEBACK_TAB in titles
+        if has_writeback:
+            ranges.append(f"'{self.WRITEBACK_TAB}'!A2:A")
+
+        utrs = set()
+        if ranges:
+            result = sheet.values().batchGet(
+                spreadsheetId=sid, ranges=ranges, majorDimension='COLUMNS'
+            ).execute(http=http)
+            for vr in result.get('valueRanges', []):
+                for column in vr.get('values', []):
+                    for cell in column:
+                        clean_val = self._looks_like_txn_id(cell)
+                        if clean_val: utrs.add(clean_val)
+        return utrs, updates, has_writeback
+
+    def load_ledger(self, refresh_layout: bool = False):
         """
         Downloads the Master Ledger into RAM.
-        We scan ALL columns to be safe against interns pasting UTRs in the wrong place.
+        Every configured spreadsheet is fetched concurrently (one batchGet each),
+        restricted to the columns that actually hold transaction IDs.
         """
-        print(f"   [MEMORY] Syncing with Master Ledger ({self.spreadsheet_id})...")
+        print(f"   [MEMORY] Syncing with Master Ledger ({len(self.sources)} spreadsheet(s))...")
         try:
-            sheet = self.service.spreadsheets()
-            result = sheet.values().get(spreadsheetId=self.spreadsheet_id, range=range_name).execute()
-            rows = result.get('values', [])
-
-            count = 0
-            for row in rows:
-                for cell in row:
-                    clean_val = self._normalize_utr(cell)
-                    # Filter: Only keep strings that look like transaction IDs (Length > 6)
-                    # This avoids caching words like "Verified" or "Pending"
-                    if len(clean_val) > 6 and not clean_val.isalpha(): 
-                        self.ledger_utrs.add(clean_val)
-                        count += 1
-            
+            layout = self._load_layout()
+            all_updates = {}
+            merged: Set[str] = set()
+
+            with ThreadPoolExecutor(max_workers=min(8, len(self.sources))) as pool:
+                futures = [pool.submit(self._load_source, src, layout, refresh_layout) for src in self.sources]
+                for future in futures:
+                    utrs, updates, has_writeback = future.result()
+                    merged |= utrs
+                    all_updates.update(updates)
+                    if has_writeback: self._writeback_tab_ready = True
+
+            if all_updates:
+                layout.update(all_updates)
+                self._save_layout(layout)
+                for key, cols in all_updates.items():
+                    print(f"   [MEMORY] Learned ID columns for {key}: {', '.join(cols)}")
+
+            # The Iron Set only grows: a re-sync (warm runtime, every LEDGER_TTL) indexes the new rows only
+            with self._index_lock:
+                fresh = merged - self.ledger_utrs
+                self.ledger_utrs |= fresh
+                self.fuzzy_index.extend(fresh)
             self.loaded = True
-            print(f"   [SUCCESS] Ledger Synced. {count} historic transactions cached in RAM.")
+            print(f"   [SUCCESS] Ledger Synced. {len(merged)} historic transactions cached in RAM.")
             
         except Exception as e:
             print(f"   [CRITICAL FAIL] Could not load Master Ledger: {e}")
@@ -83,6 +226,116 @@ class SheetManager:
             
         return False
 
+    def export_shared_index(self, path: str) -> int:
+        """
+        Writes the Iron Set to a memory-mappable file (see MappedLedger) for
+        processes that can't reach the sheet: rescore.py's pool workers map it
+        read-only and share one copy of its pages. Returns the number of UTRs.
+        """
+        if not self.loaded:
+            raise RuntimeError("Ledger not loaded. Call load_ledger() first.")
+        with self._index_lock:
+            count = write_ledger_file(path, self.ledger_utrs)
+        print(f"   [MEMORY] Shared ledger index: {count} UTRs -> {path}")
+        return count
+
+    def find_near_duplicate(self, candidate_utr: str) -> Optional[Dict[str, Any]]:
+        """
+        Closest ledger UTR within edit distance 1-2 after OCR-confusion folding.
+        Returns {'utr', 'distance', 'raw_distance'} or None.
+        The UTR itself is skipped (a file's own written-back row on a re-audit).
+        """
+        if not self.loaded:
+            return None
+        clean = self._normalize_utr(candidate_utr)
+        hits = [h for h in self.fuzzy_index.lookup(candidate_utr, limit=2) if h['utr'] != clean]
+        return hits[0] if hits else None
+
+    # --- WRITE-BACK ---
+
+    def _index_utr(self, utr: str):
+        """Makes a freshly written UTR visible to is_duplicate() immediately."""
+        clean_val = self._normalize_utr(utr)
+        if not clean_val: return
+        with self._index_lock:
+            if clean_val not in self.ledger_utrs:
+                self.ledger_utrs.add(clean_val)
+                self.fuzzy_index.add(clean_val)
+
+    def _ensure_writeback_tab(self):
+        """Creates the write-back tab (with header) once, via batchUpdate."""
+        if self._writeback_tab_ready: return
+        sheet = self.service.spreadsheets()
+        meta = sheet.get(spreadsheetId=self.spreadsheet_id, fields='sheets.properties.title').execute()
+        titles = [s['properties']['title'] for s in meta.get('sheets', [])]
+        if self.WRITEBACK_TAB not in titles:
+            sheet.batchUpdate(spreadsheetId=self.spreadsheet_id, body={
+                'requests': [{'addSheet': {'properties': {'title': self.WRITEBACK_TAB}}}]
+            }).execute()
+            sheet.values().update(
+                spreadsheetId=self.spreadsheet_id, range=f"'{self.WRITEBACK_TAB}'!A1",
+                valueInputOption='RAW', body={'values': [self.WRITEBACK_HEADER]}
+            ).execute()
+        self._writeback_tab_ready = True
+
+    def _fetch_written_keys(self) -> Set[str]:
+        """Idempotency keys already present in the write-back tab (last column)."""
+        key_col = chr(ord('A') + len(self.WRITEBACK_HEADER) - 1)
+        result = self.service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id, range=f"'{self.WRITEBACK_TAB}'!{key_col}2:{key_col}"
+        ).execute()
+        return {row[0] for row in result.get('values', []) if row}
+
+    def append_verified_rows(self, rows: List[Dict[str, Any]], reconcile: bool = False) -> List[str]:
+        """
+        Appends verified receipts to the write-back tab in chunked values().append calls.
+        Each row dict carries: idem_key, utr, amount, txn_date, intern_name, file_link, queued_at.
+
+        Idempotency: a retry (or a previously attempted batch when reconcile=True) first
+        re-reads the key column and drops rows that already landed, so an append whose
+        response was lost is never written twice.
+        Returns the idempotency keys that are now safely in the sheet.
+        """
+        if not rows: return []
+        self._ensure_writeback_tab()
+        committed = []
+
+        for start in range(0, len(rows), self.WRITEBACK_CHUNK):
+            chunk = rows[start:start + self.WRITEBACK_CHUNK]
+            needs_check = reconcile
+
+            for attempt in range(self.WRITEBACK_RETRIES):
+                try:
+                    if needs_check:
+                        landed = self._fetch_written_keys()
+                        committed.extend(r['idem_key'] for r in chunk if r['idem_key'] in landed)
+                        chunk = [r for r in chunk if r['idem_key'] not in landed]
+                    if chunk:
+                        self.service.spreadsheets().values().append(
+                            spreadsheetId=self.spreadsheet_id,
+                            range=f"'{self.WRITEBACK_TAB}'!A:A",
+                            valueInputOption='RAW',
+                            insertDataOption='INSERT_ROWS',
+                            body={'values': [[
+                                r['utr'], r['amount'], r.get('txn_date') or '', r['intern_name'],
+                                r['file_link'], r['queued_at'], r['idem_key']
+                            ] for r in chunk]}
+                        ).execute()
+                    committed.extend(r['idem_key'] for r in chunk)
+                    for r in chunk: self._index_utr(r['utr'])
+                    break
+                except Exception as e:
+                    # Outcome unknown: the append may have landed. Check before resending.
+                    needs_check = True
+                    wait = min(2 ** attempt, 30)
+                    print(f"   [WARN] Ledger write-back failed ({e}). Retry {attempt + 1}/{self.WRITEBACK_RETRIES} in {wait}s...")
+                    time.sleep(wait)
+            else:
+                print(f"   [CRITICAL FAIL] Ledger write-back gave up on {len(chunk)} rows. They stay queued locally.")
+                break
+
+        return committed
+
 # --- INTEGRATION TEST ---
 if __name__ == "__main__":
     print("--- TESTING IRON DOME LEDGER ---")
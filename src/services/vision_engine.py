@@ -1,12 +1,17 @@
 import sys
 import os
-import re
 import io
+import re
+import time
+import httplib2
 import cv2
 import pytesseract
+import threading
 import numpy as np
-from typing import Dict, Any, Optional
+from PIL import Image
+from typing import Dict, Any, Optional, Tuple, Callable
 from googleapiclient.http import MediaIoBaseDownload
+from google_auth_httplib2 import AuthorizedHttp
 
 # PATH FIX
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -14,151 +19,611 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 if project_root not in sys.path: sys.path.append(project_root)
 
 from src.services.drive_manager import DriveManager
+from src.services.layout_templates import get_layout_recognizer
+from src.services.extraction_engine import DEFAULT_PATTERNS, validate_amount, get_default_engine
+from src.services.resource_governor import get_memory_budget, STAGE_BUDGETS, is_ocr_timeout
+from src.services.mosaic_ocr import get_mosaic_ocr
+from src.services.metrics import DRIVE_REQUESTS, DOWNLOAD_SECONDS, DECODE_SECONDS, OCR_SECONDS, STAGE_OVERRUNS
 
-class VisionEngine:
-    PATTERNS = {
-        'upi_labeled': r'(?i)(?:UPI\s*Ref\.?\s*No|UTR|Transaction\s*ID|Txn\s*ID|Ref\s*No|Reference\s*ID|Bank\s*Ref|Ref\s*Number)[\s:\-\.]*([A-Z0-9]+)',
-        'upi_standalone': r'\b\d{12,25}\b',
-        'amount_strict': r'(?:₹|Rs\.?|INR)\s*[\.\-]?\s*([\d,]+\.?\d{0,2})',
-        # Removed 'T' from fuzzy to prevent Transaction ID matches
-        'amount_fuzzy': r'(?:<|\?|t|R|\|)\s*([\d,]+\.?\d{0,2})\b',
-        'date_text': r'(?i)(?:on\s+)?(\d{1,2})[\s\-\/]+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[\s\-\/,]+(\d{4})',
-    }
+
+class ScratchBuffers:
+    """
+    Per-worker reusable pixel buffers. cv2 writes into them via `dst=`, so a
+    worker allocates its working set once instead of once per file. A buffer
+    grown for an unusually large photo is dropped again by trim().
+    """
+    RETAIN_MAX_BYTES = 48 * 1024 * 1024
 
     def __init__(self):
-        self.drive = DriveManager()
+        self._flat: Dict[str, np.ndarray] = {}
+
+    def get(self, name: str, shape: tuple) -> np.ndarray:
+        n = int(np.prod(shape))
+        buf = self._flat.get(name)
+        if buf is None or buf.size < n:
+            buf = np.empty(n, dtype=np.uint8)
+            self._flat[name] = buf
+        return buf[:n].reshape(shape)
+
+    def trim(self):
+        for name in [k for k, b in self._flat.items() if b.nbytes > self.RETAIN_MAX_BYTES]:
+            del self._flat[name]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self._flat.values())
+
+
+class VisionEngine:
+    # Single source of truth for the extraction rules (see extraction_engine.py)
+    PATTERNS = DEFAULT_PATTERNS
+
+    # Pre-OCR Gate: documents scoring below this are SKIPPED without tesseract.
+    # Deliberately low: only obvious selfies / event photos should fall under it.
+    DOC_SKIP_THRESHOLD = float(os.getenv('AURA_DOC_THRESHOLD', '0.35'))
+    CLASSIFIER_SIDE = 320       # px, longest side of the downsampled copy
+    # A whitelisted UTR crop taken off the wrong region still reads as letters; a real reference is digits
+    ROI_UTR_MIN_DIGITS = 8
+
+    # Quality Triage (on a TRIAGE_SIDE px copy): one preprocessing recipe per image
+    TRIAGE_SIDE = 480
+    DARK_LUMINANCE = 0.45       # mean gray below this = dark-mode screenshot
+    LOW_CONTRAST = 0.40         # text/background gap below this = washed-out photo of a screen
+    SOFT_BLUR = 120.0           # Laplacian variance: soft enough to need the photo recipe
+    BLUR_REJECT = float(os.getenv('AURA_BLUR_REJECT', '15'))   # below: unreadable, no OCR
+    MOIRE_PEAK = 60.0           # FFT band peak / median above this = screen grid
+    FLAT_BACKGROUND = 0.60      # share of pixels at the background level: a screenshot, no grid possible
+
+    # Progressive Download: Drive thumbnail first, original only if the thumbnail can't resolve the file
+    PROGRESSIVE = os.getenv('AURA_PROGRESSIVE', '1') != '0'
+    THUMB_SIZE = int(os.getenv('AURA_THUMB_SIZE', '1600'))   # px, longest side
+
+    # Cheap recipe for speculative straggler copies: reduced decode, capped size, no layout learning
+    FAST_SIDE = 1600                    # px, longest side
+    FAST_REDUCE_BYTES = 2 * 1024 * 1024 # payloads above this decode at half resolution
+    DOWNLOAD_CHUNK = 1024 * 1024        # the download budget is checked between chunks
+
+    # Decode guard: images above this many pixels (read from the header) decode at 1/2, 1/4 or 1/8
+    MAX_DECODE_PIXELS = int(float(os.getenv('AURA_MAX_DECODE_MP', '40')) * 1e6)
+    DECODE_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                    4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+    def __init__(self, doc_threshold: Optional[float] = None):
+        self._drive = None
+        self.doc_threshold = self.DOC_SKIP_THRESHOLD if doc_threshold is None else doc_threshold
+        self.layouts = get_layout_recognizer()
+        self.extractor = get_default_engine()
+        self.scratch = ScratchBuffers()
+        self.budget = get_memory_budget()
+        # Small reads (field crops, small pages) share tesseract calls across workers; None = off
+        self.mosaic = get_mosaic_ocr()
+        self.progressive = self.PROGRESSIVE
+        self._thumb_http = None
         if os.path.exists('/opt/homebrew/bin/tesseract'):
             pytesseract.pytesseract.tesseract_cmd = '/opt/homebrew/bin/tesseract'
 
-    def download_file_to_memory(self, file_id: str) -> Optional[np.ndarray]:
+    @property
+    def drive(self) -> DriveManager:
+        """Built on first use: workers fed by the DriveIOEngine only touch Drive for fallbacks."""
+        if self._drive is None:
+            self._drive = DriveManager()
+        return self._drive
+
+    def download_bytes(self, file_id: str) -> Optional[bytes]:
+        """Full-resolution original. Abandoned (None) once it runs past the download budget."""
         try:
             print(f"   [...] Downloading file ID: {file_id}...")
-            request = self.drive.service.files().get_media(fileId=file_id)
-            file_buffer = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_buffer, request)
-            done = False
-            while done is False: status, done = downloader.next_chunk()
-            file_buffer.seek(0)
-            file_bytes = np.asarray(bytearray(file_buffer.read()), dtype=np.uint8)
-            img = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-            return img
+            with DOWNLOAD_SECONDS.time('original'):
+                request = self.drive.service.files().get_media(fileId=file_id)
+                file_buffer = io.BytesIO()
+                downloader = MediaIoBaseDownload(file_buffer, request, chunksize=self.DOWNLOAD_CHUNK)
+                deadline = time.perf_counter() + STAGE_BUDGETS['download']
+                done = False
+                while done is False:
+                    if time.perf_counter() > deadline:
+                        STAGE_OVERRUNS.inc('download')
+                        print(f"   [TIMEOUT] Download of {file_id} passed {STAGE_BUDGETS['download']:.0f}s, abandoned.")
+                        return None
+                    status, done = downloader.next_chunk()
+            DRIVE_REQUESTS.inc('get_media', 'ok')
+            return file_buffer.getvalue()
         except Exception as e:
+            DRIVE_REQUESTS.inc('get_media', 'error')
             print(f"[ERROR] Download failed: {e}")
             return None
 
-    def preprocess_image(self, image: np.ndarray) -> Dict[str, np.ndarray]:
-        if image is None: return {}
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        scale_percent = 200 
-        width = int(gray.shape[1] * scale_percent / 100)
-        height = int(gray.shape[0] * scale_percent / 100)
-        upscaled = cv2.resize(gray, (width, height), interpolation = cv2.INTER_AREA)
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
-        binary = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-        inverted = cv2.bitwise_not(binary)
-        return {'original': image, 'upscaled': upscaled, 'binary': binary, 'inverted': inverted}
-
-    def run_ocr(self, processed_images: Dict[str, np.ndarray]) -> str:
-        full_text = ""
+    def download_file_to_memory(self, file_id: str) -> Optional[np.ndarray]:
+        payload = self.download_bytes(file_id)
+        return self.decode_image(payload) if payload else None
+
+    @classmethod
+    def thumbnail_url(cls, thumbnail_link: str) -> str:
+        """Drive thumbnail links end in '=s220'; ask for a receipt-readable size instead."""
+        base = re.sub(r'=s\d+(-[a-z0-9-]+)?$', '', thumbnail_link)
+        return f"{base}=s{cls.THUMB_SIZE}"
+
+    def download_thumbnail(self, file_id: str, thumbnail_link: str = None) -> Optional[bytes]:
+        """Drive-rendered rendition (JPEG, longest side THUMB_SIZE). None when Drive has none."""
+        try:
+            if not thumbnail_link:
+                meta = self.drive.service.files().get(fileId=file_id, fields='thumbnailLink').execute()
+                thumbnail_link = meta.get('thumbnailLink')
+            if not thumbnail_link: return None
+            if self._thumb_http is None:
+                self._thumb_http = AuthorizedHttp(self.drive.creds, http=httplib2.Http(timeout=STAGE_BUDGETS['download']))
+            with DOWNLOAD_SECONDS.time('thumbnail'):
+                resp, content = self._thumb_http.request(self.thumbnail_url(thumbnail_link), 'GET')
+            DRIVE_REQUESTS.inc('thumbnail', 'ok' if resp.status == 200 else str(resp.status))
+            return content if resp.status == 200 and content else None
+        except Exception as e:
+            DRIVE_REQUESTS.inc('thumbnail', 'error')
+            print(f"   [WARN] Thumbnail fetch failed, using original: {e}")
+            return None
+
+    def classify_document(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Cheap 'is this a payment receipt?' gate (~2-5 ms on a 320px copy).
+        Receipts are screenshots: portrait, a large flat background, many
+        short horizontal text lines, little colour. Photos are the opposite.
+        Returns {'score': 0..1, 'is_receipt': bool, 'features': {...}}.
+        """
+        h, w = image.shape[:2]
+        scale = self.CLASSIFIER_SIDE / max(h, w)
+        small = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA) if scale < 1 else image
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        # 1. Aspect ratio (phone screenshots are tall)
+        aspect = h / float(w)
+
+        # 2. Background flatness: share of pixels in the dominant luminance bin
+        hist = cv2.calcHist([gray], [0], None, [32], [0, 256]).ravel()
+        flatness = float(hist.max() / hist.sum())
+
+        # 3. Colourfulness: mean saturation
+        saturation = float(cv2.cvtColor(small, cv2.COLOR_BGR2HSV)[:, :, 1].mean() / 255.0)
+
+        # 4. Edge density (text ~ 5-20%, noisy photos higher, blank images ~0)
+        edges = cv2.Canny(gray, 80, 200)
+        edge_density = float(np.count_nonzero(edges) / edges.size)
+
+        # 5. Text-line density: smear edges horizontally, count line-shaped blobs
+        lines = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+        n, _, stats, _ = cv2.connectedComponentsWithStats(lines, connectivity=8)
+        bw, bh = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+        text_lines = int(np.count_nonzero((bw > 2 * bh) & (bh >= 3) & (bh <= gray.shape[0] * 0.08)))
+
+        score = (
+            0.20 * min(max((aspect - 0.9) / 0.9, 0.0), 1.0) +
+            0.25 * min(flatness / 0.35, 1.0) +
+            0.20 * (1.0 - min(saturation / 0.45, 1.0)) +
+            0.10 * (1.0 if 0.01 <= edge_density <= 0.25 else 0.0) +
+            0.25 * min(text_lines / 12.0, 1.0)
+        )
+        return {
+            'score': round(score, 3),
+            'is_receipt': score >= self.doc_threshold,
+            'features': {
+                'aspect': round(aspect, 2), 'flatness': round(flatness, 3), 'saturation': round(saturation, 3),
+                'edge_density': round(edge_density, 3), 'text_lines': text_lines,
+            },
+        }
+
+    def triage_image(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Picks ONE preprocessing recipe from cheap stats on a downsampled copy:
+          luminance  mean gray            -> dark-mode vs light-mode screenshot
+          contrast   gap between the text and background means (Otsu split)
+                                         -> washed-out photos of screens
+          sharpness  Laplacian variance   -> blur (too low = unreadable, skip OCR)
+          moire      peak / median of the mid-high FFT band -> screen pixel grid
+                     (only off a flat background: on a clean screenshot the band
+                     is near empty and regular text rows alone make a peak)
+        Returns {'recipe': 'light' | 'dark' | 'photo', 'unreadable': bool, ...stats}.
+        """
+        h, w = image.shape[:2]
+        scale = min(1.0, self.TRIAGE_SIDE / max(h, w))
+        small = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA) if scale < 1 else image
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        luminance = float(gray.mean() / 255.0)
+        # Not the gray std: on a sparse screenshot that is mostly background and reads as washed out
+        split, _ = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        dark, light = gray[gray <= split], gray[gray > split]
+        contrast = float(light.mean() - dark.mean()) / 255.0 if dark.size and light.size else 0.0
+        sharpness = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+        # Moire: a photographed screen adds sharp, isolated high-frequency peaks
+        fft_in = cv2.resize(gray, (128, 128), interpolation=cv2.INTER_AREA).astype(np.float32)
+        spectrum = np.abs(np.fft.fftshift(np.fft.fft2(fft_in - fft_in.mean())))
+        yy, xx = np.ogrid[-64:64, -64:64]
+        radius = np.hypot(yy, xx) / 64.0
+        band = spectrum[(radius > 0.35) & (radius < 0.95)]
+        moire = float(band.max() / (np.median(band) + 1e-6))
+        hist = np.bincount(gray.ravel(), minlength=256)
+        peak = int(hist.argmax())
+        flat = float(hist[max(0, peak - 2):peak + 3].sum() / gray.size)
+
+        if (moire > self.MOIRE_PEAK and flat < self.FLAT_BACKGROUND) or contrast < self.LOW_CONTRAST or sharpness < self.SOFT_BLUR:
+            recipe = 'photo'
+        elif luminance < self.DARK_LUMINANCE:
+            recipe = 'dark'
+        else:
+            recipe = 'light'
+        return {
+            'recipe': recipe, 'unreadable': sharpness < self.BLUR_REJECT,
+            'luminance': round(luminance, 3), 'contrast': round(contrast, 3),
+            'sharpness': round(sharpness, 1), 'moire': round(moire, 1), 'flat': round(flat, 3),
+        }
+
+    def preprocess_passes(self, image: np.ndarray, recipe: str = 'light'):
+        """
+        Yields the single (name, pixels) OCR pass for the triaged recipe, built
+        in this worker's scratch buffers (valid until the next call):
+          light: 2x grayscale (dark text on a light screenshot)
+          dark:  Otsu binary of the blurred gray, inverted in place (dark mode)
+          photo: 2x, light blur against moire, adaptive threshold in place;
+                 inverted first when the photo is of a dark-mode screen
+        Peak extra memory is gray + 4x gray.
+        """
+        if image is None: return
+        h, w = image.shape[:2]
+        gray = self.scratch.get('gray', (h, w))
+        cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=gray)
+
+        if recipe == 'dark':
+            work = self.scratch.get('pass', (h, w))
+            cv2.GaussianBlur(gray, (5, 5), 0, dst=work)
+            cv2.threshold(work, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=work)
+            cv2.bitwise_not(work, dst=work)
+            yield 'inverted', work
+            return
+
+        upscaled = self.scratch.get('pass', (h * 2, w * 2))
+        if recipe == 'photo':
+            if gray.mean() < 255 * self.DARK_LUMINANCE:
+                cv2.bitwise_not(gray, dst=gray)
+            cv2.resize(gray, (w * 2, h * 2), dst=upscaled, interpolation=cv2.INTER_CUBIC)
+            cv2.GaussianBlur(upscaled, (3, 3), 0, dst=upscaled)
+            cv2.adaptiveThreshold(upscaled, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10, dst=upscaled)
+            yield 'adaptive', upscaled
+            return
+
+        cv2.resize(gray, (w * 2, h * 2), dst=upscaled, interpolation=cv2.INTER_AREA)
+        yield 'upscaled', upscaled
+
+    def run_ocr(self, image: np.ndarray, recipe: str = 'light'):
+        """Returns (text, pixels handed to tesseract). Each call is killed past the OCR budget (RuntimeError)."""
+        full_text, pixels = "", 0
         cfg = r'--oem 3 --psm 6'
-        if 'upscaled' in processed_images:
-            full_text += pytesseract.image_to_string(processed_images['upscaled'], lang='eng', config=cfg) + "\n"
-        if 'inverted' in processed_images:
-            full_text += pytesseract.image_to_string(processed_images['inverted'], lang='eng', config=cfg) + "\n"
-        return full_text
+        for _, version in self.preprocess_passes(image, recipe):
+            if self.mosaic and version.size <= self.mosaic.SMALL_PAGE_PIXELS:
+                full_text += self.mosaic.read(version, cfg) + "\n"
+            else:
+                with OCR_SECONDS.time('full'):
+                    full_text += pytesseract.image_to_string(version, lang='eng', config=cfg,
+                                                             timeout=STAGE_BUDGETS['ocr']) + "\n"
+            pixels += version.size
+        return full_text, pixels
+
+    def warm_up(self):
+        """One tiny OCR so the tesseract binary and eng.traineddata are paged in before the first real file."""
+        try:
+            pytesseract.image_to_string(np.full((32, 96), 255, np.uint8), lang='eng', config=r'--oem 3 --psm 6')
+        except Exception as e:
+            print(f"   [WARN] Tesseract warm-up failed: {e}")
 
     def validate_amount(self, val: float) -> bool:
         """GLOBAL SAFETY CHECK: Rejects improbable donation amounts."""
-        # 1. Must be positive
-        # 2. Must be <= 2,00,000 (2 Lakhs)
-        # 3. Must not look like a year (2025, 2026)
-        if val <= 0: return False
-        if val > 200000: return False 
-        if val in [2024, 2025, 2026, 2027]: return False
-        return True
+        return validate_amount(val)
 
     def extract_financials(self, text: str) -> Dict[str, Any]:
-        data = { 'amount': 0.0, 'utr': None, 'timestamp': None, 'extracted_text': text }
-        
-        # --- 1. SANITIZATION (The Nuclear Option) ---
-        # Remove "Transaction ID T..." patterns BEFORE processing money
-        # matches 'T' followed by 8+ digits
-        clean_text = re.sub(r'T\d{8,}', ' ', text)
-
-        # --- 2. UTR EXTRACTION ---
-        utr_match = re.search(self.PATTERNS['upi_labeled'], text) # Use original text for UTR
-        if utr_match:
-            raw_id = utr_match.group(1)
-            data['utr'] = re.sub(r'[^A-Za-z0-9]', '', raw_id)
-        else:
-            all_long_digits = re.findall(self.PATTERNS['upi_standalone'], text)
-            if all_long_digits: data['utr'] = all_long_digits[0]
+        """Runs the precompiled rule plan (plus any AURA_RULE_PACKS) over the OCR text."""
+        return self.extractor.extract(text)
 
-        # --- 3. AMOUNT EXTRACTION (Using Clean Text + Validation) ---
-        found_amount = False
+    def analyze_file(self, file_id: str, thumbnail_link: str = None, fast: bool = False,
+                     cancel: threading.Event = None,
+                     on_payload: Callable[[bytes, str], None] = None) -> Dict[str, Any]:
+        """
+        Progressive fetch: the Drive thumbnail first, the original only when
+        the thumbnail does not resolve the file (see resolved_on_thumbnail).
+        fast=True uses the cheap recipe (see FAST_SIDE) for speculative re-runs.
+        on_payload(bytes, fidelity) sees every fetched payload (a twin reuses it);
+        once `cancel` is set the file stops at the next stage boundary.
+        """
+        io_seconds = [0.0]
+        def timed(fetch, fidelity):
+            def run():
+                t = time.perf_counter()
+                try:
+                    payload = fetch()
+                finally:
+                    io_seconds[0] += time.perf_counter() - t
+                if payload and on_payload: on_payload(payload, fidelity)
+                return payload
+            return run
+        fetch_original = timed(lambda: self.download_bytes(file_id), 'original')
+
+        start = time.perf_counter()
+        # Backpressure: wait here while too many decoded images are in flight
+        with self.budget.reserve() as ticket:
+            payload, fidelity = None, 'original'
+            if self.progressive:
+                payload = timed(lambda: self.download_thumbnail(file_id, thumbnail_link), 'thumbnail')()
+                if payload: fidelity = 'thumbnail'
+            if not payload and not self.cancelled(cancel):
+                payload = fetch_original()
+            if self.cancelled(cancel):
+                data = self.abandoned()
+            elif not payload:
+                data = {'status': 'FAILED', 'reason': 'Download Error'}
+            else:
+                data = self._analyze_progressive(payload, fidelity, fetch_original, ticket, fast, cancel)
+        # Stage timings feed the ResourceGovernor's pool sizing (I/O vs CPU share)
+        data['timings'] = {'io': io_seconds[0], 'cpu': time.perf_counter() - start - io_seconds[0]}
+        return data
 
-        # Priority 1: Strict (₹500)
-        strict_matches = re.findall(self.PATTERNS['amount_strict'], clean_text)
-        clean_strict = []
-        for a in strict_matches:
+    def analyze_bytes(self, payload: bytes, download_seconds: float = 0.0, fidelity: str = 'original',
+                      fetch_original=None, fast: bool = False, cancel: threading.Event = None) -> Dict[str, Any]:
+        """
+        Same as analyze_file for bytes already fetched (by the async DriveIOEngine,
+        or by the first copy of a straggler). That download happened off this
+        thread; only a fallback fetch of the original blocks here, and it is
+        counted as I/O, not CPU.
+        """
+        io_seconds = [0.0]
+        def timed_original():
+            t = time.perf_counter()
             try:
-                val = float(a.replace(',', ''))
-                if self.validate_amount(val): clean_strict.append(val)
-            except: pass
-        
-        if clean_strict:
-            data['amount'] = max(clean_strict)
-            found_amount = True
-
-        # Priority 2: Fuzzy (<8)
-        if not found_amount:
-            fuzzy_matches = re.findall(self.PATTERNS['amount_fuzzy'], clean_text)
-            clean_fuzzy = []
-            for a in fuzzy_matches:
-                try:
-                    val = float(a.replace(',', ''))
-                    if self.validate_amount(val): clean_fuzzy.append(val)
-                except: pass
-            
-            if clean_fuzzy:
-                data['amount'] = max(clean_fuzzy)
-                found_amount = True
-
-        # Priority 3: Fallback (Generic)
-        if not found_amount:
-            generic_matches = re.findall(r'\b(\d{1,6}(?:,\d{3})*(?:\.\d{2})?)\b', clean_text)
-            clean_generic = []
-            for a in generic_matches:
-                try:
-                    val = float(a.replace(',', ''))
-                    if self.validate_amount(val): clean_generic.append(val)
-                except: pass
-            
-            if clean_generic:
-                data['amount'] = max(clean_generic)
-
-        # --- 4. DATE ---
-        date_match = re.search(self.PATTERNS['date_text'], text)
-        if date_match:
-            groups = date_match.groups()
-            day, month, year = groups[-3], groups[-2], groups[-1]
-            data['timestamp'] = f"{day} {month} {year}"
-        
-        # Validation Status
-        if data['utr'] and data['amount'] > 0:
-            data['status'] = 'SUCCESS'
-        elif data['amount'] > 0:
-            data['status'] = 'MANUAL_REVIEW'
-        elif data['utr']:
-            data['status'] = 'PARTIAL_FAIL'
-        else:
-            data['status'] = 'FAILED'
+                return fetch_original()
+            finally:
+                io_seconds[0] += time.perf_counter() - t
+
+        start = time.perf_counter()
+        with self.budget.reserve() as ticket:
+            data = self._analyze_progressive(payload, fidelity, timed_original if fetch_original else None,
+                                             ticket, fast, cancel)
+        data['timings'] = {'io': io_seconds[0], 'cpu': time.perf_counter() - start - io_seconds[0],
+                           'download': download_seconds}
+        return data
 
+    @staticmethod
+    def cancelled(cancel: Optional[threading.Event]) -> bool:
+        return cancel is not None and cancel.is_set()
+
+    @staticmethod
+    def abandoned() -> Dict[str, Any]:
+        """Result of a copy stopped at a stage boundary (its file was settled or given up on)."""
+        return {'status': 'FAILED', 'reason': 'Abandoned', 'amount': 0.0, 'utr': None, 'overrun': 'abandoned'}
+
+    @staticmethod
+    def resolved_on_thumbnail(data: Dict[str, Any]) -> bool:
+        """A clean read or a confident 'not a receipt' needs no more pixels; anything else does."""
+        return data.get('status') in ('SUCCESS', 'SKIPPED') or bool(data.get('overrun'))
+
+    def _analyze_progressive(self, payload: bytes, fidelity: str, fetch_original, ticket,
+                             fast: bool = False, cancel: threading.Event = None) -> Dict[str, Any]:
+        data = self._analyze_payload(payload, ticket, fast, cancel)
+        data['fidelity'], data['bytes_fetched'] = fidelity, len(payload)
+        if fidelity == 'thumbnail' and fetch_original and not self.resolved_on_thumbnail(data):
+            spent = len(payload)
+            original = fetch_original()
+            if original:
+                data = self._analyze_payload(original, ticket, fast, cancel)
+                data['fidelity'], data['bytes_fetched'] = 'original', spent + len(original)
+                payload = original
+        # The bytes the verdict came from, for the review blob store (not for non-receipts)
+        if data.get('status') != 'SKIPPED':
+            data['payload'] = payload
         return data
 
-    def analyze_file(self, file_id: str) -> Dict[str, Any]:
-        img = self.download_file_to_memory(file_id)
-        if img is None: return {'status': 'FAILED', 'reason': 'Download Error'}
-        versions = self.preprocess_image(img)
-        raw_text = self.run_ocr(versions)
-        return self.extract_financials(raw_text)
\ No newline at end of file
+    def _analyze_payload(self, payload: bytes, ticket, fast: bool = False,
+                         cancel: threading.Event = None) -> Dict[str, Any]:
+        if self.cancelled(cancel): return self.abandoned()
+        img, seconds = self._decode(payload, reduced=fast and len(payload) > self.FAST_REDUCE_BYTES)
+        if img is None: return {'status': 'FAILED', 'reason': 'Decode Error'}
+        if self.cancelled(cancel): return self.abandoned()
+        if seconds > STAGE_BUDGETS['decode']:
+            # The decode itself could not be stopped; the budget holds from here: no OCR on top of it
+            return {'status': 'MANUAL_REVIEW', 'reason': f"Decode exceeded its {STAGE_BUDGETS['decode']:.0f}s budget",
+                    'amount': 0.0, 'utr': None, 'overrun': 'decode'}
+        if fast:
+            h, w = img.shape[:2]
+            scale = self.FAST_SIDE / max(h, w)
+            if scale < 1:
+                img = cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        return self._analyze_decoded(img, ticket, fast)
+
+    @classmethod
+    def decode_image(cls, payload, reduced: bool = False) -> Optional[np.ndarray]:
+        return cls._decode(payload, reduced)[0]
+
+    @classmethod
+    def decode_scale(cls, payload, reduced: bool = False) -> int:
+        """
+        Smallest decode scale (1, 2, 4, 8) that keeps the image under MAX_DECODE_PIXELS.
+        Only the header is read; libjpeg scales while decoding, so a huge panorama
+        costs a fraction of a full decode.
+        """
+        scale = 2 if reduced else 1
+        try:
+            w, h = Image.open(io.BytesIO(payload)).size
+        except Exception:
+            return scale   # cv2 may still read what PIL can't
+        while scale < 8 and (w // scale) * (h // scale) > cls.MAX_DECODE_PIXELS:
+            scale *= 2
+        return scale
+
+    @classmethod
+    def _decode(cls, payload, reduced: bool = False) -> Tuple[Optional[np.ndarray], float]:
+        """
+        (image, seconds). reduced=True decodes at half resolution at least. A decode
+        can't be interrupted, so an overrun is enforced by the caller (no OCR on it).
+        """
+        try:
+            start = time.perf_counter()
+            img = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8),
+                               cls.DECODE_FLAGS[cls.decode_scale(payload, reduced)])
+            elapsed = time.perf_counter() - start
+            DECODE_SECONDS.observe(elapsed)
+            if elapsed > STAGE_BUDGETS['decode']:
+                STAGE_OVERRUNS.inc('decode')
+                print(f"   [TIMEOUT] Decode took {elapsed:.1f}s (budget {STAGE_BUDGETS['decode']:.0f}s); sent to review.")
+            return img, elapsed
+        except Exception as e:
+            print(f"[ERROR] Decode failed: {e}")
+            return None, 0.0
+
+    def _analyze_decoded(self, img: np.ndarray, ticket, fast: bool = False) -> Dict[str, Any]:
+        ticket.charge(self.working_set_bytes(img))
+        try:
+            return self.analyze_image(img, learn=not fast)
+        except RuntimeError as e:
+            if not is_ocr_timeout(e): raise
+            # tesseract was killed: a human looks at it rather than the run waiting on it
+            STAGE_OVERRUNS.inc('ocr')
+            return {'status': 'MANUAL_REVIEW', 'reason': f"OCR exceeded its {STAGE_BUDGETS['ocr']:.0f}s budget",
+                    'amount': 0.0, 'utr': None, 'overrun': 'ocr'}
+        finally:
+            self.scratch.trim()
+
+    @staticmethod
+    def working_set_bytes(image: np.ndarray) -> int:
+        """Decoded BGR + gray + the 2x upscale (the largest OCR pass)."""
+        h, w = image.shape[:2]
+        return h * w * (3 + 1 + 4)
+
+    def analyze_image(self, img: np.ndarray, learn: bool = True) -> Dict[str, Any]:
+        doc = self.classify_document(img)
+        if not doc['is_receipt']:
+            return {'status': 'SKIPPED', 'reason': 'Not a receipt', 'doc_score': doc['score']}
+
+        # Quality triage: hopeless blur goes to a human without spending OCR on it
+        triage = self.triage_image(img)
+        if triage['unreadable']:
+            return {'status': 'MANUAL_REVIEW', 'reason': f"Too blurry to read (sharpness {triage['sharpness']})",
+                    'amount': 0.0, 'utr': None, 'ocr_mode': 'none', 'ocr_pixels': 0, 'triage': triage}
+
+        # Fast path: known app layout -> OCR only the amount / UTR / date boxes
+        template = self.layouts.match(img)
+        if template:
+            data = self.extract_with_template(img, template)
+            self.layouts.record_result(template, data['status'] == 'SUCCESS')
+            if data['status'] == 'SUCCESS': return data
+
+        raw_text, pixels = self.run_ocr(img, triage['recipe'])
+        data = self.extract_financials(raw_text)
+        data['ocr_mode'] = 'full'
+        data['ocr_pixels'] = pixels
+        data['triage'] = triage
+
+        # Unknown layout (or the template missed): teach the layout store
+        if learn and data['status'] == 'SUCCESS' and self.layouts.wants_sample(template):
+            try:
+                self.layouts.learn(img, data, template)
+            except Exception as e:
+                print(f"   [WARN] Layout learning skipped: {e}")
+        return data
+
+    def extract_with_template(self, image: np.ndarray, template: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Region-of-interest OCR. The per-field reads are stitched into a tiny
+        labelled text so the normal extract_financials rules still decide.
+        """
+        fields = self.layouts.read_fields(image, template, self.mosaic.read if self.mosaic else None)
+        texts = fields['texts']
+        utr = texts.get('utr', '')
+        if sum(c.isdigit() for c in utr) < self.ROI_UTR_MIN_DIGITS: utr = ''
+        synthetic = "\n".join([
+            f"UTR: {utr}",
+            f"₹ {texts.get('amount', '')}",
+            texts.get('date', ''),
+        ])
+        data = self.extract_financials(synthetic)
+        data['ocr_mode'] = 'roi'
+        data['layout'] = template['app']
+        data['ocr_pixels'] = fields['ocr_pixels']
+        return data
+
+
+if __name__ == "__main__":
+    import tempfile
+    from src.services.layout_templates import LayoutRecognizer
+    print("--- VISION ENGINE DIAGNOSTICS ---")
+
+    def receipt(w: int = 720, h: int = 1280) -> np.ndarray:
+        """A light-mode payment screenshot: white page, dark text lines."""
+        img = np.full((h, w, 3), 250, np.uint8)
+        lines = [("Payment Successful", 1.1), ("Paid to SRI RAMA STORES", 0.9), ("Rs. 1,250.00", 1.4),
+                 ("UTR: 412345678901", 0.9), ("12 Jan 2026, 10:42 AM", 0.9), ("From: State Bank of India", 0.8)]
+        for n, (text, size) in enumerate(lines):
+            cv2.putText(img, text, (40, 260 + 110 * n), cv2.FONT_HERSHEY_SIMPLEX, size, (20, 20, 20), 2, cv2.LINE_AA)
+        return img
+
+    def statement(w: int = 720, h: int = 1280) -> np.ndarray:
+        """Bank-statement screenshot: identical rows at a fixed pitch (a regular pattern, but no screen grid)."""
+        img = np.full((h, w, 3), 250, np.uint8)
+        rows = ["Rs. 1,250.00", "UTR: 412345678901", "12 Jan 2026"] + ["UPI/412345678901/DR 1,250.00"] * 8
+        for n, text in enumerate(rows):
+            cv2.putText(img, text, (40, 120 + 90 * n), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (20, 20, 20), 2, cv2.LINE_AA)
+        return img
+
+    def photographed(img: np.ndarray) -> np.ndarray:
+        """Phone photo of a screen: soft, washed out, with a faint pixel grid."""
+        out = cv2.GaussianBlur(img, (5, 5), 0).astype(np.float32) * 0.35 + 120
+        grid = 12 * np.sin(np.arange(img.shape[1]) * 2.6)[None, :, None]
+        return np.clip(out + grid, 0, 255).astype(np.uint8)
+
+    def png(img: np.ndarray) -> bytes:
+        return cv2.imencode('.png', img)[1].tobytes()
+
+    engine = VisionEngine()
+    # Diagnostics must not touch the real layout store
+    engine.layouts = LayoutRecognizer(store_path=os.path.join(tempfile.mkdtemp(), 'layouts.json'))
+    base = receipt()
+
+    # 1. Scratch buffers and the decode budget
+    print("\n1. Scratch buffers + memory budget:")
+    engine.analyze_bytes(png(base))
+    held = {k: b.ctypes.data for k, b in engine.scratch._flat.items()}
+    size = engine.scratch.nbytes
+    engine.analyze_bytes(png(255 - base))
+    reused = held == {k: b.ctypes.data for k, b in engine.scratch._flat.items()}
+    print(f"   second file reused the same buffers: {reused} ({size / 1e6:.1f} MB per worker)")
+    print(f"   budget charged back to zero after each file: {engine.budget.used_bytes == 0}")
+    huge = np.full((6000, 9000, 3), 250, np.uint8)
+    print(f"   9000x6000 header -> decode scale 1/{engine.decode_scale(cv2.imencode('.jpg', huge)[1].tobytes())}")
+    for _ in engine.preprocess_passes(huge[:4000, :4000]): pass
+    grown = engine.scratch.nbytes
+    engine.scratch.trim()
+    print(f"   4000x4000 pass grew scratch to {grown / 1e6:.0f} MB, trim() keeps {engine.scratch.nbytes / 1e6:.0f} MB")
+
+    # 2. Quality triage: one recipe per image
+    print("\n2. Triage + analysis:")
+    rng = np.random.default_rng(7)
+    samples = {
+        'light': base,
+        'dark': 255 - base,
+        'statement': statement(),
+        'photo': photographed(base),
+        'blurred': cv2.GaussianBlur(base, (0, 0), 12),
+        'holiday': cv2.resize(rng.integers(0, 255, (90, 160, 3), dtype=np.uint8), (1280, 720)),
+    }
+    for name, img in samples.items():
+        t = time.perf_counter()
+        tri = engine.triage_image(img)
+        data = engine.analyze_image(img, learn=False)
+        print(f"   {name:<9} recipe={tri['recipe']:<5} unreadable={tri['unreadable']!s:<5} -> {data['status']:<13} "
+              f"{data.get('ocr_mode', '-'):<4} amount={data.get('amount')} utr={data.get('utr')} "
+              f"({time.perf_counter() - t:.2f}s)")
+
+    # 3. Progressive fetch: thumbnail first, original only when needed
+    print("\n3. Progressive fetch:")
+    print(f"   {VisionEngine.thumbnail_url('https://lh3.googleusercontent.com/abc=s220')}")
+    original = png(base)
+    for label, thumb in (('sharp thumbnail', cv2.imencode('.jpg', base, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tobytes()),
+                         ('tiny thumbnail', cv2.imencode('.jpg', cv2.resize(base, (90, 160)))[1].tobytes())):
+        fetched = []
+        data = engine.analyze_bytes(thumb, fidelity='thumbnail',
+                                    fetch_original=lambda: fetched.append(1) or original)
+        print(f"   {label:<15} -> {data['status']:<13} fidelity={data['fidelity']:<9} "
+              f"original fetched={bool(fetched)!s:<5} bytes={data['bytes_fetched']:,}")
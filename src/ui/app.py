@@ -3,6 +3,8 @@ import sys
 import os
 from src.ui.styles import *
 from src.ui.views.audit_view import AuditView  # IMPORT THE NEW VIEW
+from src.ui.views.dashboard_view import DashboardView
+from src.ui.views.review_view import ReviewView
 
 class AuraApp(ctk.CTk):
     def __init__(self):
@@ -33,7 +35,7 @@ class AuraApp(ctk.CTk):
         """Creates the left-hand navigation panel."""
         self.sidebar_frame = ctk.CTkFrame(self, width=d_SIDEBAR_W, corner_radius=0, fg_color=c_SURFACE)
         self.sidebar_frame.grid(row=0, column=0, sticky="nsew")
-        self.sidebar_frame.grid_rowconfigure(4, weight=1) # Spacer
+        self.sidebar_frame.grid_rowconfigure(5, weight=1) # Spacer
 
         # App Logo
         self.logo_label = ctk.CTkLabel(
@@ -54,7 +56,8 @@ class AuraApp(ctk.CTk):
         # Navigation Buttons (Saved as attributes so we can highlight them)
         self.btn_dashboard = self.create_nav_button("Dashboard", 2)
         self.btn_audit = self.create_nav_button("New Audit", 3)
-        self.btn_history = self.create_nav_button("History", 4)
+        self.btn_review = self.create_nav_button("Review", 4)
+        self.btn_history = self.create_nav_button("History", 5)
         
         # Status Badge
         self.status_badge = ctk.CTkButton(
@@ -66,7 +69,7 @@ class AuraApp(ctk.CTk):
             height=25,
             font=ctk.CTkFont(size=10, weight="bold")
         )
-        self.status_badge.grid(row=5, column=0, padx=20, pady=20, sticky="s")
+        self.status_badge.grid(row=6, column=0, padx=20, pady=20, sticky="s")
 
     def create_nav_button(self, text, row):
         btn = ctk.CTkButton(
@@ -95,20 +98,17 @@ class AuraApp(ctk.CTk):
         self.main_container.grid_columnconfigure(0, weight=1)
 
         # --- VIEW 1: DASHBOARD (Home) ---
-        self.view_dashboard = ctk.CTkFrame(self.main_container, fg_color=c_BACKGROUND)
-        
-        # Dashboard Content (Placeholder for now)
-        lbl_dash_title = ctk.CTkLabel(self.view_dashboard, text="Dashboard Overview", font=ctk.CTkFont(size=28, weight="bold"))
-        lbl_dash_title.place(x=30, y=30)
-        
-        lbl_dash_info = ctk.CTkLabel(self.view_dashboard, text="Welcome to Project AURA.\nSelect 'New Audit' in the sidebar to begin scanning.", font=ctk.CTkFont(size=16), text_color=c_TEXT_SECONDARY, justify="left")
-        lbl_dash_info.place(x=30, y=80)
+        # Live totals & trends read from the SessionManager rollups
+        self.view_dashboard = DashboardView(self.main_container)
 
         # --- VIEW 2: AUDIT (The Live Terminal) ---
         # We use the class we created in src/ui/views/audit_view.py
         self.view_audit = AuditView(self.main_container)
 
-        # --- VIEW 3: HISTORY (Placeholder) ---
+        # --- VIEW 3: REVIEW (Flagged receipts, keyboard-driven) ---
+        self.view_review = ReviewView(self.main_container)
+
+        # --- VIEW 4: HISTORY (Placeholder) ---
         self.view_history = ctk.CTkFrame(self.main_container, fg_color=c_BACKGROUND)
         ctk.CTkLabel(self.view_history, text="Audit History Log", font=ctk.CTkFont(size=28, weight="bold")).place(x=30, y=30)
 
@@ -120,24 +120,34 @@ class AuraApp(ctk.CTk):
         """Swaps the visible frame in the main area."""
         
         # 1. Hide all views
+        self.view_dashboard.stop_live_refresh()
         self.view_dashboard.grid_forget()
         self.view_audit.grid_forget()
+        self.view_review.stop_review()
+        self.view_review.grid_forget()
         self.view_history.grid_forget()
 
         # 2. Reset Button Styles (remove "Active" highlight)
         self.btn_dashboard.configure(fg_color="transparent")
         self.btn_audit.configure(fg_color="transparent")
+        self.btn_review.configure(fg_color="transparent")
         self.btn_history.configure(fg_color="transparent")
 
         # 3. Show the selected view and Highlight the button
         if view_name == "Dashboard":
             self.view_dashboard.grid(row=0, column=0, sticky="nsew")
+            self.view_dashboard.start_live_refresh()
             self.btn_dashboard.configure(fg_color="#404040")
             
         elif view_name == "New Audit":
             self.view_audit.grid(row=0, column=0, sticky="nsew")
             self.btn_audit.configure(fg_color="#404040") # Active Color
             
+        elif view_name == "Review":
+            self.view_review.grid(row=0, column=0, sticky="nsew")
+            self.view_review.start_review()
+            self.btn_review.configure(fg_color="#404040")
+
         elif view_name == "History":
             self.view_history.grid(row=0, column=0, sticky="nsew")
             self.btn_history.configure(fg_color="#404040")
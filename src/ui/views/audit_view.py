@@ -85,6 +85,15 @@ class AuditView(ctk.CTkFrame):
             self.log_to_terminal("[ERROR] No link provided.")
             return
 
+        # No AURA_SHEET_ID: ask for the Master Ledger like the CLI does (kept for this app session)
+        sheet_id = None
+        if not self.audit_manager.sheet_id:
+            dialog = ctk.CTkInputDialog(text="Enter Master Ledger Sheet ID:", title="Master Ledger")
+            sheet_id = (dialog.get_input() or '').strip()
+            if not sheet_id:
+                self.log_to_terminal("[ERROR] No Master Ledger Sheet ID provided.")
+                return
+
         self.btn_start.configure(state="disabled", text="SCANNING...")
         self.link_entry.configure(state="disabled")
         
@@ -93,7 +102,7 @@ class AuditView(ctk.CTkFrame):
         self.terminal.configure(state="disabled")
         
         # Start Background Thread
-        self.audit_manager.start_audit(link)
+        self.audit_manager.start_audit(link, sheet_id)
 
     def on_audit_finished(self):
         # Re-enable UI (Must be done via queue/main thread, but CTk is lenient here)
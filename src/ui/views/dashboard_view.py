@@ -0,0 +1,124 @@
+import customtkinter as ctk
+import datetime
+from src.ui.styles import *
+from src.services.session_manager import SessionManager
+
+class DashboardView(ctk.CTkFrame):
+    """
+    Live overview backed by SessionManager's materialized rollups.
+    Every refresh is O(days), so it is safe to poll while an audit is running.
+    """
+    REFRESH_MS = 5000
+    TREND_DAYS = 14
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.configure(fg_color=c_BACKGROUND)
+        self.recorder = SessionManager()
+        self._refresh_job = None
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.grid_columnconfigure((0, 1, 2, 3), weight=1)
+        self.grid_rowconfigure(3, weight=1)
+
+        # 1. Header
+        self.header = ctk.CTkLabel(
+            self,
+            text="Dashboard Overview",
+            font=ctk.CTkFont(family=f_FAMILY, size=28, weight="bold"),
+            text_color=c_TEXT_PRIMARY,
+            anchor="w"
+        )
+        self.header.grid(row=0, column=0, columnspan=4, padx=30, pady=(30, 5), sticky="w")
+
+        self.subtitle = ctk.CTkLabel(
+            self,
+            text="Welcome to Project AURA. Select 'New Audit' in the sidebar to begin scanning.",
+            font=ctk.CTkFont(size=14),
+            text_color=c_TEXT_SECONDARY,
+            anchor="w"
+        )
+        self.subtitle.grid(row=1, column=0, columnspan=4, padx=30, pady=(0, 20), sticky="w")
+
+        # 2. Stat Cards
+        self.card_verified = self.create_stat_card("Total Verified", c_SUCCESS, 0)
+        self.card_files = self.create_stat_card("Files Scanned", c_ACCENT, 1)
+        self.card_dups = self.create_stat_card("Duplicates", c_ERROR, 2)
+        self.card_fails = self.create_stat_card("Failures", c_WARNING, 3)
+
+        # 3. Trend Panel (text bars keep it dependency-free)
+        self.trend_box = ctk.CTkTextbox(
+            self,
+            fg_color=c_SURFACE,
+            text_color=c_TEXT_PRIMARY,
+            font=ctk.CTkFont(family=f_MONO, size=f_TERMINAL_SIZE),
+            activate_scrollbars=True
+        )
+        self.trend_box.grid(row=3, column=0, columnspan=4, padx=30, pady=(20, 30), sticky="nsew")
+        self.trend_box.configure(state="disabled")
+
+    def create_stat_card(self, title, accent, column):
+        card = ctk.CTkFrame(self, fg_color=c_SURFACE, corner_radius=8)
+        card.grid(row=2, column=column, padx=(30 if column == 0 else 8, 30 if column == 3 else 8), sticky="ew")
+
+        ctk.CTkLabel(
+            card, text=title, text_color=c_TEXT_SECONDARY, font=ctk.CTkFont(size=f_BODY_SIZE)
+        ).pack(padx=15, pady=(12, 0), anchor="w")
+
+        value = ctk.CTkLabel(
+            card, text="--", text_color=accent,
+            font=ctk.CTkFont(family=f_FAMILY, size=f_HEADER_SIZE, weight="bold")
+        )
+        value.pack(padx=15, pady=(0, 12), anchor="w")
+        return value
+
+    # --- Logic ---
+
+    def start_live_refresh(self):
+        """Called when the view becomes visible."""
+        self.stop_live_refresh()
+        self.refresh()
+
+    def stop_live_refresh(self):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+
+    def refresh(self):
+        try:
+            totals = self.recorder.get_dashboard_totals()
+            trend = self.recorder.get_daily_trend(self.TREND_DAYS)
+            self.render(totals, trend)
+        except Exception as e:
+            self.subtitle.configure(text=f"[ERROR] Could not read audit database: {e}")
+
+        self._refresh_job = self.after(self.REFRESH_MS, self.refresh)
+
+    def render(self, totals, trend):
+        self.card_verified.configure(text=f"₹{totals['verified_amt']:,.2f}")
+        self.card_files.configure(text=f"{totals['files']:,}")
+        self.card_dups.configure(text=f"{totals['duplicates']:,}")
+        self.card_fails.configure(text=f"{totals['failures']:,}")
+
+        # Fill gaps so idle days still show up in the trend
+        by_day = {row['day']: row for row in trend}
+        today = datetime.date.today()
+        days = [(today - datetime.timedelta(days=i)).isoformat() for i in range(self.TREND_DAYS - 1, -1, -1)]
+        peak = max([row['files'] for row in trend] + [1])
+
+        lines = [f"LAST {self.TREND_DAYS} DAYS", ""]
+        lines.append(f"{'DAY':<12}{'FILES':>7}{'VERIFIED':>14}{'DUP':>6}{'FAIL':>6}   ACTIVITY")
+        for day in days:
+            row = by_day.get(day, {'files': 0, 'verified_amt': 0.0, 'duplicates': 0, 'failures': 0})
+            bar = "█" * int(round(row['files'] / peak * 30))
+            lines.append(
+                f"{day:<12}{row['files']:>7}{'₹' + format(row['verified_amt'], ',.0f'):>14}"
+                f"{row['duplicates']:>6}{row['failures']:>6}   {bar}"
+            )
+
+        self.trend_box.configure(state="normal")
+        self.trend_box.delete("0.0", "end")
+        self.trend_box.insert("0.0", "\n".join(lines))
+        self.trend_box.configure(state="disabled")
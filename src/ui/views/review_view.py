@@ -0,0 +1,286 @@
+import customtkinter as ctk
+import io
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+from src.ui.styles import *
+from src.services.session_manager import SessionManager
+from src.services.blob_store import BlobStore
+
+class ReviewView(ctk.CTkFrame):
+    """
+    Manual-review workstation for MANUAL_REVIEW / PARTIAL_FAIL / DUPLICATE files.
+    Images come from the local BlobStore (the bytes the audit already downloaded;
+    Drive only on a cache miss). The next PREFETCH items are read and decoded on
+    background threads, so the next receipt is on screen the moment a key is pressed.
+    Decisions are written back through SessionManager in batches.
+
+    Keys: A / Enter approve, R / Backspace reject, S / Right skip, Left back.
+    """
+    PREFETCH = 8            # items read + decoded ahead of the one on screen
+    PAGE = 100              # queue rows fetched per read
+    WRITE_BATCH = 20        # decisions per SessionManager transaction
+    FLUSH_MS = 3000         # ... or after this long without a new decision
+    PREVIEW_W, PREVIEW_H = 760, 520
+
+    KEYS = {
+        '<KeyPress-a>': 'APPROVED', '<Return>': 'APPROVED',
+        '<KeyPress-r>': 'REJECTED', '<BackSpace>': 'REJECTED',
+    }
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.configure(fg_color=c_BACKGROUND)
+        self.recorder = SessionManager()
+        self.blobs = BlobStore()
+        self.loader = ThreadPoolExecutor(max_workers=2, thread_name_prefix='aura-review')
+        # Decision writes (and blob pruning) get their own thread: a slow flush never holds up a decode
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='aura-review-write')
+        self._drive = threading.local()
+
+        self.items = []          # open review items, queue order
+        self.pos = 0             # index of the item on screen
+        self._decoded = {}       # item id -> Future[PIL.Image | None]
+        self._decisions = {}     # item id -> decision, not written yet
+        self._saving = set()     # item ids of the batch being written (UI thread only)
+        self._exhausted = False
+        self._flush_job = None
+        self._bindings = []
+        # Background threads never touch Tk or view state: they report back through this queue (see check_queue)
+        self.event_queue = queue.Queue()
+
+        self.setup_ui()
+        self.check_queue()
+
+    def setup_ui(self):
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(2, weight=1)
+
+        # 1. Header
+        self.header = ctk.CTkLabel(
+            self,
+            text="Manual Review",
+            font=ctk.CTkFont(family=f_FAMILY, size=f_HEADER_SIZE, weight="bold"),
+            text_color=c_TEXT_PRIMARY,
+            anchor="w"
+        )
+        self.header.grid(row=0, column=0, padx=30, pady=(30, 5), sticky="w")
+
+        self.subtitle = ctk.CTkLabel(
+            self,
+            text="A / Enter approve   ·   R / Backspace reject   ·   S / → skip   ·   ← back",
+            font=ctk.CTkFont(size=f_BODY_SIZE),
+            text_color=c_TEXT_SECONDARY,
+            anchor="w"
+        )
+        self.subtitle.grid(row=1, column=0, padx=30, pady=(0, 15), sticky="w")
+
+        # 2. Receipt Image
+        self.image_frame = ctk.CTkFrame(self, fg_color=c_TERMINAL_BG, corner_radius=6)
+        self.image_frame.grid(row=2, column=0, padx=30, pady=(0, 15), sticky="nsew")
+        self.image_frame.grid_rowconfigure(0, weight=1)
+        self.image_frame.grid_columnconfigure(0, weight=1)
+
+        self.image_label = ctk.CTkLabel(self.image_frame, text="", text_color=c_TEXT_SECONDARY)
+        self.image_label.grid(row=0, column=0, sticky="nsew")
+
+        # 3. Item Details
+        self.details = ctk.CTkLabel(
+            self,
+            text="",
+            font=ctk.CTkFont(family=f_MONO, size=f_TERMINAL_SIZE),
+            text_color=c_TEXT_PRIMARY,
+            justify="left",
+            anchor="w"
+        )
+        self.details.grid(row=3, column=0, padx=30, pady=(0, 30), sticky="ew")
+
+    # --- Lifecycle (called by AuraApp when the view is shown / hidden) ---
+
+    def start_review(self):
+        root = self.winfo_toplevel()
+        for sequence, decision in self.KEYS.items():
+            self._bindings.append((sequence, root.bind(sequence, lambda e, d=decision: self.decide(d))))
+        for sequence, handler in (('<KeyPress-s>', self.skip), ('<Right>', self.skip), ('<Left>', self.back)):
+            self._bindings.append((sequence, root.bind(sequence, lambda e, h=handler: h())))
+
+        self.items, self.pos, self._decoded, self._exhausted = [], 0, {}, False
+        self._load_more()
+        self.show_current()
+        # Images of decided items are no longer needed
+        self.writer.submit(lambda: self.blobs.prune(self.recorder.get_review_blob_refs()))
+
+    def stop_review(self):
+        root = self.winfo_toplevel()
+        for sequence, funcid in self._bindings:
+            root.unbind(sequence, funcid)
+        self._bindings = []
+        self.flush_decisions()
+
+    # --- Queue & Prefetch ---
+
+    def _load_more(self):
+        if self._exhausted: return
+        after_id = self.items[-1]['id'] if self.items else 0
+        page = self.recorder.get_review_queue(self.PAGE, after_id)
+        # Decided but not yet written: don't serve them again
+        self.items.extend(i for i in page if i['id'] not in self._decisions and i['id'] not in self._saving)
+        self._exhausted = len(page) < self.PAGE
+
+    def _prefetch(self):
+        if len(self.items) - self.pos <= self.PREFETCH:
+            self._load_more()
+        ahead = self.items[self.pos:self.pos + self.PREFETCH + 1]
+        wanted = {i['id'] for i in ahead} | {i['id'] for i in self.items[max(0, self.pos - 1):self.pos]}
+        for item in ahead:
+            if item['id'] not in self._decoded:
+                self._decoded[item['id']] = self.loader.submit(self._decode, item)
+        # Drop decoded images that fell out of the window
+        for item_id in [k for k in self._decoded if k not in wanted]:
+            del self._decoded[item_id]
+
+    def _decode(self, item):
+        """Background: bytes from the blob store (Drive on a miss), decoded + downscaled for display."""
+        payload = self.blobs.get(item['blob']) if item.get('blob') else None
+        if payload is None and item.get('file_id'):
+            payload = self._download(item['file_id'])
+            if payload: item['blob'] = self.blobs.put(payload)
+        if not payload: return None
+        try:
+            image = ImageOps.exif_transpose(Image.open(io.BytesIO(payload)))
+            image.thumbnail((self.PREVIEW_W, self.PREVIEW_H))
+            return image.convert('RGB')
+        except Exception:
+            return None
+
+    def _download(self, file_id):
+        # httplib2 isn't thread-safe: one Drive client per loader thread
+        try:
+            if not hasattr(self._drive, 'manager'):
+                from src.services.drive_manager import DriveManager
+                self._drive.manager = DriveManager()
+            return self._drive.manager.service.files().get_media(fileId=file_id).execute()
+        except Exception as e:
+            print(f"   [REVIEW] Drive fetch failed for {file_id}: {e}")
+            return None
+
+    # --- Display ---
+
+    def show_current(self):
+        self._prefetch()
+        if self.pos >= len(self.items):
+            self.image_label.configure(image=None, text="Review queue is empty. 🎉")
+            self.details.configure(text="")
+            return
+
+        item = self.items[self.pos]
+        future = self._decoded[item['id']]
+        if not future.done():
+            # Still decoding (only right after opening the view): check back shortly
+            self.image_label.configure(image=None, text="Loading…")
+            self.after(30, lambda i=item['id']: self._show_when_ready(i))
+        else:
+            self._render_image(future.result())
+
+        status_color = {'DUPLICATE': c_ERROR, 'PARTIAL_FAIL': c_WARNING}.get(item['status'], c_ACCENT)
+        decided = self._decisions.get(item['id'])
+        remaining = len(self.items) - self.pos
+        self.details.configure(
+            text_color=status_color,
+            text=(f"{item['status']:<14} {item['file_name']}\n"
+                  f"Reason: {item['reason'] or '-'}\n"
+                  f"UTR: {item['utr'] or 'N/A':<18} Amount: ₹{item['amount'] or 0:,.2f}   "
+                  f"Intern: {item['intern_name'] or '-'}\n"
+                  f"{'Decision: ' + decided if decided else ''}"
+                  f"   [{remaining}{'+' if not self._exhausted else ''} left, {len(self._decisions)} unsaved]")
+        )
+
+    def _show_when_ready(self, item_id):
+        if self.pos < len(self.items) and self.items[self.pos]['id'] == item_id:
+            future = self._decoded.get(item_id)
+            if future is None: return
+            if future.done():
+                self._render_image(future.result())
+            else:
+                self.after(30, lambda: self._show_when_ready(item_id))
+
+    def _render_image(self, image):
+        if image is None:
+            self.image_label.configure(image=None, text="Image unavailable (not cached, Drive fetch failed).")
+            return
+        # CTkImage builds the Tk photo on the main thread; the pixels are already decoded
+        self._photo = ctk.CTkImage(light_image=image, dark_image=image, size=image.size)
+        self.image_label.configure(image=self._photo, text="")
+
+    # --- Decisions ---
+
+    def decide(self, decision):
+        if self.pos >= len(self.items): return
+        self._decisions[self.items[self.pos]['id']] = decision
+        self.pos += 1
+        self.show_current()
+        if len(self._decisions) >= self.WRITE_BATCH:
+            self.flush_decisions()
+        else:
+            self._schedule_flush()
+
+    def skip(self):
+        if self.pos < len(self.items):
+            self.pos += 1
+            self.show_current()
+
+    def back(self):
+        if self.pos > 0:
+            self.pos -= 1
+            self.show_current()
+
+    def _schedule_flush(self):
+        if self._flush_job is not None:
+            self.after_cancel(self._flush_job)
+        self._flush_job = self.after(self.FLUSH_MS, self.flush_decisions)
+
+    def flush_decisions(self):
+        """Hands the unsaved decisions to SessionManager (one transaction) off the UI thread."""
+        if self._flush_job is not None:
+            self.after_cancel(self._flush_job)
+            self._flush_job = None
+        batch = list(self._decisions.items())
+        if not batch: return
+        self._decisions = {}
+        self._saving.update(item_id for item_id, _ in batch)
+
+        def write():
+            try:
+                counts = self.recorder.apply_review_decisions(batch)
+            except Exception as e:
+                # Handed to the UI thread, which puts them back so the next flush retries
+                self.event_queue.put(("SAVE_FAILED", (batch, e)))
+                return
+            self.event_queue.put(("SAVED", (batch, counts)))
+        self.writer.submit(write)
+
+    def check_queue(self):
+        """Runs on the main thread every 100ms: results from the writer thread."""
+        try:
+            while True:
+                msg_type, content = self.event_queue.get_nowait()
+                if msg_type == "SAVED":
+                    self._saved(*content)
+                elif msg_type == "SAVE_FAILED":
+                    self._restore(*content)
+        except queue.Empty:
+            pass
+        self.after(100, self.check_queue)
+
+    def _saved(self, batch, counts):
+        self._saving.difference_update(item_id for item_id, _ in batch)
+        print(f"   [REVIEW] Saved {len(batch)} decisions: {counts['approved']} approved "
+              f"({counts['promoted']} verified + queued for the ledger), {counts['rejected']} rejected.")
+
+    def _restore(self, batch, error):
+        for item_id, decision in batch:
+            self._decisions.setdefault(item_id, decision)
+        self._saving.difference_update(item_id for item_id, _ in batch)
+        self.subtitle.configure(text=f"[ERROR] Could not save decisions: {error}", text_color=c_ERROR)
+        self._schedule_flush()